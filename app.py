@@ -30,6 +30,50 @@ def create_app():
     app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
     app.config["UPLOAD_FOLDER"] = "static/uploads"
     app.config["MAX_CONTENT_LENGTH"] = 16 * 1024 * 1024  # 16MB max file size
+    app.config["ASSETS_BUILD_ON_STARTUP"] = os.environ.get("ASSETS_BUILD_ON_STARTUP", "true").lower() == "true"  # otherwise run assets.py at deploy
+    app.config["UPLOAD_STORAGE"] = os.environ.get("UPLOAD_STORAGE", "filesystem")  # filesystem (UPLOAD_FOLDER) or s3 (any S3-compatible object store)
+    app.config["S3_ENDPOINT_URL"] = os.environ.get("S3_ENDPOINT_URL", "http://127.0.0.1:9000")  # path-style endpoint, e.g. MinIO or fake_s3.py
+    app.config["S3_BUCKET"] = os.environ.get("S3_BUCKET", "barterhub-uploads")
+    app.config["S3_REGION"] = os.environ.get("S3_REGION", "us-east-1")
+    app.config["S3_ACCESS_KEY_ID"] = os.environ.get("S3_ACCESS_KEY_ID")
+    app.config["S3_SECRET_ACCESS_KEY"] = os.environ.get("S3_SECRET_ACCESS_KEY")
+    app.config["S3_PREFIX"] = os.environ.get("S3_PREFIX", "")  # prepended to every object key
+    app.config["S3_PART_SIZE"] = int(os.environ.get("S3_PART_SIZE", 8 * 1024 * 1024))  # bytes, larger files use parallel multipart upload (min 5MB)
+    app.config["S3_UPLOAD_WORKERS"] = int(os.environ.get("S3_UPLOAD_WORKERS", 4))  # parts uploaded concurrently per process
+    app.config["S3_URL_EXPIRES"] = int(os.environ.get("S3_URL_EXPIRES", 3600))  # seconds a pre-signed media URL stays valid
+    app.config["UPLOAD_SENDFILE"] = os.environ.get("UPLOAD_SENDFILE", "")  # "", "x-sendfile" (Apache/lighttpd) or "x-accel-redirect" (nginx)
+    app.config["UPLOAD_ACCEL_PREFIX"] = os.environ.get("UPLOAD_ACCEL_PREFIX", "/_uploads/")  # internal nginx location aliasing UPLOAD_FOLDER
+    app.config["IMAGE_WORKERS"] = int(os.environ.get("IMAGE_WORKERS", 2))  # rendition threads, also the cap on concurrent decodes per process
+    app.config["IMAGE_MAX_PIXELS"] = int(os.environ.get("IMAGE_MAX_PIXELS", 50_000_000))  # uploads above this pixel count are rejected before decoding
+    app.config["IMAGE_WEBP_QUALITY"] = int(os.environ.get("IMAGE_WEBP_QUALITY", 80))
+    app.config["UPLOAD_RELEASE_GRACE"] = int(os.environ.get("UPLOAD_RELEASE_GRACE", 3600))  # seconds a freshly re-uploaded file is kept after its last reference is deleted
+    app.config["SEARCH_TS_CONFIG"] = os.environ.get("SEARCH_TS_CONFIG", "indonesian")
+    app.config["EVENT_BROKER"] = os.environ.get("EVENT_BROKER", "auto")  # auto, postgres, local
+    app.config["EVENT_STREAM_ENABLED"] = os.environ.get("EVENT_STREAM_ENABLED", "false").lower() == "true"  # SSE chat stream; only with a threaded/async worker class (gthread, gevent), see README
+    app.config["EVENT_STREAM_HEARTBEAT"] = int(os.environ.get("EVENT_STREAM_HEARTBEAT", 15))  # seconds between keep-alive pings
+    app.config["EVENT_STREAM_MAX_AGE"] = int(os.environ.get("EVENT_STREAM_MAX_AGE", 45))  # seconds before a stream closes and the browser reconnects
+    app.config["TRACKING_CACHE_TTL"] = int(os.environ.get("TRACKING_CACHE_TTL", 900))  # seconds
+    app.config["TRACKING_NEGATIVE_TTL"] = int(os.environ.get("TRACKING_NEGATIVE_TTL", 120))  # seconds after a failed lookup
+    app.config["TRACKING_REFRESH_WORKERS"] = int(os.environ.get("TRACKING_REFRESH_WORKERS", 4))
+    app.config["TRACKING_LOOKUP_WORKERS"] = int(os.environ.get("TRACKING_LOOKUP_WORKERS", 8))
+    app.config["TRACKING_REQUEST_DEADLINE"] = float(os.environ.get("TRACKING_REQUEST_DEADLINE", 3))  # seconds per request
+    app.config["COURIER_CONNECT_TIMEOUT"] = float(os.environ.get("COURIER_CONNECT_TIMEOUT", 3))  # seconds
+    app.config["COURIER_READ_TIMEOUT"] = float(os.environ.get("COURIER_READ_TIMEOUT", 5))  # seconds
+    app.config["COURIER_MAX_RETRIES"] = int(os.environ.get("COURIER_MAX_RETRIES", 2))
+    app.config["COURIER_RETRY_BACKOFF"] = float(os.environ.get("COURIER_RETRY_BACKOFF", 0.2))  # seconds, doubled per attempt
+    app.config["COURIER_POOL_SIZE"] = int(os.environ.get("COURIER_POOL_SIZE", 10))  # keep-alive connections per courier
+    app.config["COURIER_BREAKER_THRESHOLD"] = int(os.environ.get("COURIER_BREAKER_THRESHOLD", 5))  # consecutive failures
+    app.config["COURIER_BREAKER_COOLDOWN"] = int(os.environ.get("COURIER_BREAKER_COOLDOWN", 60))  # seconds before a probe
+    app.config["COURIER_JT_BASE_URL"] = os.environ.get("COURIER_JT_BASE_URL", "https://www.jet.co.id")
+    app.config["COURIER_SICEPAT_BASE_URL"] = os.environ.get("COURIER_SICEPAT_BASE_URL", "https://api.sicepat.com")
+    app.config["COURIER_WEBHOOK_SECRET"] = os.environ.get("COURIER_WEBHOOK_SECRET")  # HMAC key, webhooks rejected when unset
+    app.config["ADMIN_STATS_ROLLUP"] = os.environ.get("ADMIN_STATS_ROLLUP", "false").lower() == "true"  # dashboard reads admin_stats instead of aggregating
+    app.config["EXPORT_BATCH_SIZE"] = int(os.environ.get("EXPORT_BATCH_SIZE", 1000))  # rows fetched per server-side cursor batch
+    app.config["IDEMPOTENCY_CLAIM_LEASE"] = int(os.environ.get("IDEMPOTENCY_CLAIM_LEASE", 120))  # seconds before an unfinished claim (crashed worker) may be retried; keep above the worker timeout
+    app.config["IDEMPOTENCY_KEY_TTL"] = int(os.environ.get("IDEMPOTENCY_KEY_TTL", 86400))  # seconds, purged by the sweeper
+    app.config["SWEEPER_INTERVAL"] = int(os.environ.get("SWEEPER_INTERVAL", 0))  # seconds, 0 = run sweeper.py from cron instead
+    app.config["SWEEPER_CHUNK_SIZE"] = int(os.environ.get("SWEEPER_CHUNK_SIZE", 200))
+    app.config["SWEEPER_TRACKING_DEADLINE"] = float(os.environ.get("SWEEPER_TRACKING_DEADLINE", 30))  # seconds per chunk
     
     # Apply proxy fix for proper URL generation
     app.wsgi_app = ProxyFix(app.wsgi_app, x_proto=1, x_host=1)
@@ -59,16 +103,40 @@ def create_app():
         import models  # noqa: F401
         db.create_all()
         logging.info("Database tables created")
+
+        # Full-text search index for products
+        from search import init_search_index
+        init_search_index()
+
+        # Pub/sub broker for the chat event stream
+        from events import init_event_broker
+        init_event_broker(app, db.engine)
     app.register_blueprint(main)
     app.register_blueprint(auth, url_prefix='/auth')
     app.register_blueprint(products, url_prefix='/products')
     app.register_blueprint(chat, url_prefix='/chat')
     app.register_blueprint(transactions, url_prefix='/transactions')
     app.register_blueprint(admin, url_prefix='/admin')
+
+    # Fingerprinted, precompressed static assets and sendfile for uploads
+    from assets import init_assets
+    init_assets(app)
+
+    # Image rendition helpers for templates (src/srcset)
+    from images import image_url, image_srcset
+    app.jinja_env.globals.update(image_url=image_url, image_srcset=image_srcset)
+
+    # Courier webhooks are authenticated by HMAC signature instead of a CSRF token
+    from routes import courier_webhook
+    csrf.exempt(courier_webhook)
     
     # Initialize default data within the app context
     with app.app_context():
         init_db()
+
+    # Optional in-process auto-confirm / auto-cancel sweeper
+    from sweeper import start_sweeper
+    start_sweeper(app)
     
     return app
 
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Fingerprint dan precompress asset statis (CSS/JS/gambar UI) di folder static/.
+
+    python assets.py            # build saat deploy (juga dijalankan saat startup jika
+                                # ASSETS_BUILD_ON_STARTUP aktif)
+
+Setiap file mendapat salinan <nama>.<hash>.<ext> yang di-cache immutable setahun, ditambah
+sibling .gz (dan .br jika modul brotli terpasang) untuk file teks. url_for('static', ...)
+otomatis menunjuk ke nama ber-hash lewat manifest, jadi template tidak perlu diubah.
+
+Contoh nginx (UPLOAD_SENDFILE=x-accel-redirect):
+
+    location /static/   { alias /srv/barterhub/static/; gzip_static on; }
+    location /_uploads/ { internal; alias /srv/barterhub/static/uploads/; }
+"""
+
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+from flask import request, send_from_directory
+from storage import get_storage
+
+try:
+    import brotli
+except ImportError:  # brotli opsional; tanpa modul ini hanya gzip yang dibuat
+    brotli = None
+
+MANIFEST_NAME = 'manifest.json'
+FINGERPRINTED = re.compile(r'\.[0-9a-f]{12}\.[^.]+$')
+COMPRESSIBLE = {'.css', '.js', '.svg', '.json', '.map', '.txt', '.html'}
+# Direktori di bawah static/ yang bukan asset build (upload user)
+SKIPPED_DIRS = {'uploads'}
+IMMUTABLE_MAX_AGE = 31536000
+# (ekstensi sibling, nama di Accept-Encoding), urutan = preferensi
+ENCODINGS = (('.br', 'br'), ('.gz', 'gzip'))
+
+def _write_atomic(path, data):
+    if os.path.exists(path):
+        return False
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+    return True
+
+def _source_files(static_folder):
+    for root, dirs, files in os.walk(static_folder):
+        if root == static_folder:
+            dirs[:] = [d for d in dirs if d not in SKIPPED_DIRS]
+        for name in files:
+            if name == MANIFEST_NAME or name.endswith(('.gz', '.br', '.tmp')) or FINGERPRINTED.search(name):
+                continue
+            yield os.path.join(root, name)
+
+def build_assets(static_folder):
+    """Tulis salinan ber-hash dan sibling terkompresi yang belum ada; kembalikan manifest"""
+    manifest = {}
+    written = 0
+    for path in _source_files(static_folder):
+        with open(path, 'rb') as f:
+            data = f.read()
+        stem, ext = os.path.splitext(path)
+        fingerprinted = f'{stem}.{hashlib.sha256(data).hexdigest()[:12]}{ext}'
+        written += _write_atomic(fingerprinted, data)
+        if ext in COMPRESSIBLE:
+            written += _write_atomic(fingerprinted + '.gz', gzip.compress(data, 9, mtime=0))
+            if brotli is not None:
+                written += _write_atomic(fingerprinted + '.br', brotli.compress(data))
+        relative = os.path.relpath(path, static_folder).replace(os.sep, '/')
+        manifest[relative] = os.path.relpath(fingerprinted, static_folder).replace(os.sep, '/')
+
+    manifest_data = json.dumps(manifest, indent=2, sort_keys=True).encode('utf-8')
+    manifest_path = os.path.join(static_folder, MANIFEST_NAME)
+    tmp_path = f'{manifest_path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(manifest_data)
+    os.replace(tmp_path, manifest_path)
+    print(f"Assets: {len(manifest)} fingerprinted, {written} files written")
+    return manifest
+
+def load_manifest(static_folder):
+    try:
+        with open(os.path.join(static_folder, MANIFEST_NAME)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _precompressed(path):
+    """Sibling .br/.gz terbaik yang diterima browser, atau (None, None)"""
+    accepted = request.accept_encodings
+    for suffix, encoding in ENCODINGS:
+        if accepted[encoding] and os.path.isfile(path + suffix):
+            return path + suffix, encoding
+    return None, None
+
+def init_assets(app):
+    """Build (opsional), muat manifest dan pasang url_for fingerprint + view static baru"""
+    static_folder = app.static_folder
+    upload_root = os.path.abspath(app.config['UPLOAD_FOLDER'])
+    if app.config.get('ASSETS_BUILD_ON_STARTUP', True):
+        manifest = build_assets(static_folder)
+    else:
+        manifest = load_manifest(static_folder)
+    fingerprinted = set(manifest.values())
+
+    @app.url_defaults
+    def fingerprint_static_url(endpoint, values):
+        if endpoint == 'static' and values.get('filename') in manifest:
+            values['filename'] = manifest[values['filename']]
+
+    def static(filename):
+        path = os.path.join(static_folder, filename)
+        if os.path.abspath(path).startswith(upload_root + os.sep):
+            # URL lama /static/uploads/... dilayani dari backend storage upload
+            key = os.path.relpath(os.path.abspath(path), upload_root).replace(os.sep, '/')
+            return get_storage().send(key, max_age=app.get_send_file_max_age(filename))
+        if filename not in fingerprinted:
+            return app.send_static_file(filename)
+
+        compressed, encoding = _precompressed(path)
+        if compressed:
+            response = send_from_directory(static_folder, os.path.relpath(compressed, static_folder),
+                                           mimetype=mimetypes.guess_type(filename)[0], max_age=IMMUTABLE_MAX_AGE)
+            response.headers['Content-Encoding'] = encoding
+        else:
+            response = send_from_directory(static_folder, filename, max_age=IMMUTABLE_MAX_AGE)
+        response.cache_control.immutable = True
+        response.vary.add('Accept-Encoding')
+        return response
+
+    app.view_functions['static'] = static
+    return manifest
+
+if __name__ == '__main__':
+    build_assets(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static'))
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Benchmark memori pemrosesan upload gambar: peak RSS per upload.
+
+Setiap kasus dijalankan di proses baru (spawn) dan diukur dari VmHWM (Linux) supaya
+peak RSS hanya mencerminkan kasus itu. Mode yang dibandingkan:
+
+    full     decode penuh pada resolusi asli lalu thumbnail (tanpa draft mode)
+    bounded  jalur images.decode_for_renditions (draft mode JPEG) + semua rendition
+    upload   jalur request upload: baca header, tolak bomb, strip EXIF (tanpa decode)
+
+Contoh:
+    python bench_images.py --megapixels 12 24 40
+    python bench_images.py --megapixels 40 --concurrent 4 --slots 2
+"""
+
+import argparse
+import io
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+def make_jpeg(path, megapixels):
+    """Foto sintetis 4:3 berisi noise (ukuran file mirip foto kamera ponsel)"""
+    from PIL import Image
+    width = int((megapixels * 1_000_000 * 4 / 3) ** 0.5)
+    height = int(width * 3 / 4)
+    noise = Image.effect_noise((width, height), 48)
+    Image.merge('RGB', (noise, noise.rotate(180), noise.transpose(Image.Transpose.FLIP_LEFT_RIGHT))) \
+        .save(path, 'JPEG', quality=90)
+    return width, height
+
+def _process(mode, path, slots, max_pixels):
+    from PIL import Image
+    from images import RENDITIONS, decode_for_renditions, inspect_image, strip_metadata
+    sizes = sorted(RENDITIONS.values(), reverse=True)
+
+    if mode == 'upload':
+        copy = f'{path}.{threading.get_ident()}'
+        shutil.copyfile(path, copy)
+        fmt, orientation = inspect_image(copy, max_pixels)
+        strip_metadata(copy, fmt, orientation)
+        os.remove(copy)
+        return
+
+    with slots, Image.open(path) as original:
+        if mode == 'full':
+            original.load()
+            img = original.copy()
+        else:
+            img = decode_for_renditions(original, sizes[0], max_pixels)
+        for max_side in sizes:
+            img.thumbnail((max_side, max_side), Image.Resampling.LANCZOS)
+            img.save(io.BytesIO(), 'WEBP', quality=80, method=4)
+
+def peak_rss_mb():
+    """VmHWM proses ini; berbeda dengan ru_maxrss, tidak mewarisi peak proses induk"""
+    with open('/proc/self/status') as status:
+        for line in status:
+            if line.startswith('VmHWM:'):
+                return int(line.split()[1]) / 1024
+
+def _measure(mode, path, concurrent, slots, max_pixels, results):
+    import images  # noqa: F401  (biaya import tidak ikut diukur)
+    baseline = peak_rss_mb()
+    semaphore = threading.BoundedSemaphore(slots if mode == 'bounded' else concurrent)
+    threads = [threading.Thread(target=_process, args=(mode, path, semaphore, max_pixels))
+               for _ in range(concurrent)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    results.put((peak_rss_mb() - baseline, elapsed))
+
+def measure(mode, path, concurrent, slots, max_pixels):
+    context = multiprocessing.get_context('spawn')
+    results = context.Queue()
+    process = context.Process(target=_measure, args=(mode, path, concurrent, slots, max_pixels, results))
+    process.start()
+    result = results.get()
+    process.join()
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description='Peak RSS per upload gambar (full decode vs bounded)')
+    parser.add_argument('--megapixels', type=float, nargs='+', default=[12, 24, 40])
+    parser.add_argument('--concurrent', type=int, default=1, help='upload yang diproses bersamaan')
+    parser.add_argument('--slots', type=int, default=2, help='batas decode bersamaan (IMAGE_WORKERS)')
+    parser.add_argument('--max-pixels', type=int, default=50_000_000)
+    parser.add_argument('--modes', nargs='+', default=['full', 'bounded', 'upload'])
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='bench-images-')
+    try:
+        print(f"{'image':<22}{'mode':<10}{'peak RSS MB':>13}{'per upload':>12}{'time s':>9}")
+        for megapixels in args.megapixels:
+            path = os.path.join(workdir, f'{megapixels:g}mp.jpg')
+            width, height = make_jpeg(path, megapixels)
+            label = f'{width}x{height} {os.path.getsize(path) / 1e6:.1f}MB'
+            for mode in args.modes:
+                peak, elapsed = measure(mode, path, args.concurrent, args.slots, args.max_pixels)
+                print(f"{label:<22}{mode:<10}{peak:>13.1f}{peak / args.concurrent:>12.1f}{elapsed:>9.2f}")
+    finally:
+        shutil.rmtree(workdir)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Benchmark jalur tracking (transactions.tracking dan auto_confirm_check) terhadap fake_courier.py.
+
+Menjalankan server kurir palsu in-process, membuat transaksi 'shipped' khusus benchmark,
+lalu menembak kedua endpoint dari beberapa thread (mensimulasikan worker gunicorn) dan
+melaporkan p50/p95/p99, okupansi worker, dan jumlah panggilan ke kurir.
+
+Contoh:
+    python bench_tracking.py --transactions 50 --requests 500 --workers 8 --latency 300 --error-rate 0.2
+    python bench_tracking.py --cold --timeout-rate 0.1   # kosongkan cache/event dulu
+    python bench_tracking.py --sweep                     # ukur juga satu putaran sweeper
+    python bench_tracking.py --cleanup                   # hapus data benchmark
+"""
+
+import argparse
+import os
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+from fake_courier import start_fake_courier, add_fault_arguments, profile_from_args
+
+BENCH_SELLER = 'bench_seller'
+BENCH_BUYER = 'bench_buyer'
+BENCH_PASSWORD = 'bench-password'
+BENCH_PRODUCT_TITLE = 'Benchmark tracking product'
+
+def percentile(values, pct):
+    if not values:
+        return 0
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[index]
+
+def bench_numbers(index):
+    # Format J&T (JP + 10 digit) dan SiCepat (000 + 9 digit) supaya detect_courier memilih API-nya
+    return f'JP9{index:09d}', f'000{index + 900000000:09d}'
+
+def get_or_create_user(db, User, username):
+    user = User.query.filter_by(username=username).first()
+    if not user:
+        user = User(username=username, email=f'{username}@bench.local', full_name=username.replace('_', ' ').title(),
+                    role='penjual', phone='081200000000', address='Jl. Benchmark No. 1, Jakarta')
+        user.set_password(BENCH_PASSWORD)
+        db.session.add(user)
+        db.session.flush()
+    return user
+
+def seed_transactions(count, hours_ago):
+    """Siapkan transaksi benchmark dan kembalikan id-nya; status di-reset ke 'shipped' setiap run"""
+    from models import db, User, Category, Product, Transaction
+    seller = get_or_create_user(db, User, BENCH_SELLER)
+    buyer = get_or_create_user(db, User, BENCH_BUYER)
+    category = Category.query.first()
+
+    product = Product.query.filter_by(user_id=seller.id, title=BENCH_PRODUCT_TITLE).first()
+    if not product:
+        product = Product(user_id=seller.id, category_id=category.id, title=BENCH_PRODUCT_TITLE,
+                          description='Data benchmark', condition='Good', desired_items='-')
+        db.session.add(product)
+        db.session.flush()
+
+    shipped_at = datetime.utcnow() - timedelta(hours=hours_ago)
+    existing = {t.seller_tracking_number: t for t in Transaction.query.filter_by(seller_id=seller.id).all()}
+    ids = []
+    for index in range(count):
+        seller_number, buyer_number = bench_numbers(index)
+        transaction = existing.get(seller_number)
+        if not transaction:
+            transaction = Transaction(seller_id=seller.id, buyer_id=buyer.id, product_id=product.id,
+                                      seller_tracking_number=seller_number, buyer_tracking_number=buyer_number,
+                                      notes='')
+            db.session.add(transaction)
+        transaction.status = 'shipped'
+        transaction.seller_shipped_at = transaction.buyer_shipped_at = shipped_at
+        transaction.seller_received_at = transaction.buyer_received_at = None
+        db.session.flush()
+        ids.append(transaction.id)
+    db.session.commit()
+    return ids
+
+def clear_tracking(count):
+    from models import db, TrackingCache, TrackingEvent
+    numbers = [number for index in range(count) for number in bench_numbers(index)]
+    TrackingEvent.query.filter(TrackingEvent.tracking_number.in_(numbers)).delete(synchronize_session=False)
+    TrackingCache.query.filter(TrackingCache.tracking_number.in_(numbers)).delete(synchronize_session=False)
+    db.session.commit()
+
+def cleanup():
+    from models import db, User, Product, Transaction
+    seller = User.query.filter_by(username=BENCH_SELLER).first()
+    if seller:
+        count = Transaction.query.filter_by(seller_id=seller.id).count()
+        clear_tracking(count)
+        Transaction.query.filter_by(seller_id=seller.id).delete(synchronize_session=False)
+        Product.query.filter_by(user_id=seller.id, title=BENCH_PRODUCT_TITLE).delete(synchronize_session=False)
+    User.query.filter(User.username.in_([BENCH_SELLER, BENCH_BUYER])).delete(synchronize_session=False)
+    db.session.commit()
+    print("Benchmark data removed")
+
+def run_load(app, transaction_ids, total_requests, workers):
+    """Tembak endpoint dari `workers` thread; kembalikan latency per endpoint dan waktu total"""
+    latencies = {'tracking': [], 'auto_confirm': []}
+    errors = []
+    lock = threading.Lock()
+    counter = iter(range(total_requests))
+
+    def worker():
+        client = app.test_client()
+        client.post('/auth/login', data={'username': BENCH_SELLER, 'password': BENCH_PASSWORD})
+        rng = random.Random()
+        while True:
+            with lock:
+                if next(counter, None) is None:
+                    return
+            transaction_id = rng.choice(transaction_ids)
+            endpoint = rng.choice(('tracking', 'auto_confirm'))
+            started = time.perf_counter()
+            response = client.get(f'/transactions/{transaction_id}/{endpoint}')
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies[endpoint].append(elapsed)
+                if response.status_code != 200:
+                    errors.append(response.status_code)
+
+    threads = [threading.Thread(target=worker) for _ in range(workers)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, errors, time.perf_counter() - started
+
+def report(latencies, errors, wall, workers, courier_calls):
+    print(f"\n{'endpoint':<14}{'n':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    busy = 0
+    for endpoint, values in latencies.items():
+        busy += sum(values)
+        print(f"{endpoint:<14}{len(values):>6}"
+              f"{percentile(values, 50) * 1000:>10.1f}{percentile(values, 95) * 1000:>10.1f}"
+              f"{percentile(values, 99) * 1000:>10.1f}{max(values, default=0) * 1000:>10.1f}")
+    total = sum(len(values) for values in latencies.values())
+    print(f"\nwall time        : {wall:.2f} s ({total / wall:.1f} req/s)")
+    print(f"worker occupancy : {busy / (wall * workers) * 100:.1f}% of {workers} workers")
+    print(f"courier calls    : {courier_calls}")
+    print(f"non-200 responses: {len(errors)}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark tracking/auto-confirm terhadap server kurir palsu')
+    parser.add_argument('--transactions', type=int, default=50)
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--workers', type=int, default=8, help='jumlah thread, mensimulasikan worker gunicorn')
+    parser.add_argument('--hours-ago', type=float, default=12, help='umur pengiriman transaksi benchmark')
+    parser.add_argument('--cold', action='store_true', help='hapus cache/event tracking benchmark sebelum mulai')
+    parser.add_argument('--sweep', action='store_true', help='ukur juga satu putaran sweeper setelah load')
+    parser.add_argument('--cleanup', action='store_true', help='hapus data benchmark lalu keluar')
+    add_fault_arguments(parser)
+    args = parser.parse_args()
+
+    # Server kurir palsu harus jalan sebelum app dibuat supaya base URL-nya terpakai
+    profile = profile_from_args(args)
+    server, base_url = start_fake_courier(profile=profile)
+    os.environ['COURIER_JT_BASE_URL'] = base_url
+    os.environ['COURIER_SICEPAT_BASE_URL'] = base_url
+
+    from app import app
+    app.config['WTF_CSRF_ENABLED'] = False
+
+    with app.app_context():
+        if args.cleanup:
+            cleanup()
+            return
+        transaction_ids = seed_transactions(args.transactions, args.hours_ago)
+        if args.cold:
+            clear_tracking(args.transactions)
+
+    print(f"Fake courier at {base_url}; {len(transaction_ids)} transactions, "
+          f"{args.requests} requests over {args.workers} workers")
+    calls_before = profile.requests
+    latencies, errors, wall = run_load(app, transaction_ids, args.requests, args.workers)
+    report(latencies, errors, wall, args.workers, profile.requests - calls_before)
+
+    if args.sweep:
+        from sweeper import run_sweep
+        with app.app_context():
+            calls_before = profile.requests
+            started = time.perf_counter()
+            stats = run_sweep()
+            print(f"\nsweep            : {stats} in {time.perf_counter() - started:.2f} s, "
+                  f"{profile.requests - calls_before} courier calls")
+
+    server.shutdown()
+
+if __name__ == '__main__':
+    main()
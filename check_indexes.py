@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Cek bahwa query-query panas memakai index (EXPLAIN), bukan full table scan.
+
+    python check_indexes.py
+
+Di PostgreSQL seq scan dimatikan selama pengecekan (SET LOCAL enable_seqscan = off)
+supaya hasilnya tidak tergantung jumlah data: yang diuji adalah apakah index yang
+cocok *tersedia* untuk planner. Keluar dengan kode 1 jika ada query yang gagal.
+"""
+
+import json
+import sys
+from sqlalchemy import text
+from models import db, User, Product, ChatRoom, ChatMessage, Transaction, Report, involved_transactions
+
+def hot_queries(user_id=1, product_id=1, room_id=1, category_id=1):
+    """Query yang dipakai route paling sering, dengan nilai parameter contoh"""
+    user_transaction = involved_transactions(user_id)
+    return {
+        'profile / list_transactions (UNION ALL)': db.session.query(user_transaction)
+            .order_by(user_transaction.created_at.desc(), user_transaction.id.desc()).limit(11),
+        'products.list_products': Product.query.filter_by(is_available=True)
+            .order_by(Product.created_at.desc(), Product.id.desc()).limit(13),
+        'products.list_products (kategori)': Product.query.filter_by(is_available=True, category_id=category_id)
+            .order_by(Product.created_at.desc(), Product.id.desc()).limit(13),
+        'profile (produk user)': Product.query.filter_by(user_id=user_id, is_available=True),
+        'chat inbox (room per user)': ChatRoom.query.filter(
+            (ChatRoom.user1_id == user_id) | (ChatRoom.user2_id == user_id)),
+        'chat.room (inbox penjual)': ChatRoom.query.filter_by(product_id=product_id)
+            .order_by(ChatRoom.created_at.desc(), ChatRoom.id.desc()).limit(21),
+        'chat.get_messages (window)': ChatMessage.query.filter(ChatMessage.room_id == room_id)
+            .order_by(ChatMessage.id.desc()).limit(51),
+        'admin.transactions (status)': Transaction.query.filter_by(status='shipped')
+            .order_by(Transaction.created_at.desc(), Transaction.id.desc()).limit(21),
+        'admin.dashboard (top pelanggar)': User.query.filter(User.violation_count > 0)
+            .order_by(User.violation_count.desc(), User.id.desc()).limit(5),
+        'admin.reports': Report.query.order_by(Report.created_at.desc(), Report.id.desc()).limit(21),
+    }
+
+def explain(query):
+    """Kembalikan (baris rencana, pakai_index) untuk satu query ORM"""
+    compiled = query.statement.compile(dialect=db.engine.dialect, compile_kwargs={'literal_binds': True})
+    connection = db.session.connection()
+
+    if db.engine.dialect.name == 'postgresql':
+        connection.execute(text("SET LOCAL enable_seqscan = off"))
+        plan = connection.exec_driver_sql('EXPLAIN (FORMAT JSON) ' + str(compiled)).scalar()
+        lines = _postgres_nodes(plan[0]['Plan'])
+        uses_index = all('Seq Scan' not in line for line in lines) and any('Index' in line for line in lines)
+        return lines, uses_index
+
+    rows = connection.exec_driver_sql('EXPLAIN QUERY PLAN ' + str(compiled)).fetchall()
+    lines = [row[-1] for row in rows]
+    scans = [line for line in lines if line.startswith(('SCAN', 'SEARCH'))]
+    uses_index = bool(scans) and all('USING' in line for line in scans)
+    return lines, uses_index
+
+def _postgres_nodes(node, depth=0):
+    label = node['Node Type']
+    if node.get('Index Name'):
+        label += f" using {node['Index Name']}"
+    if node.get('Relation Name'):
+        label += f" on {node['Relation Name']}"
+    lines = ['  ' * depth + label]
+    for child in node.get('Plans', []):
+        lines += _postgres_nodes(child, depth + 1)
+    return lines
+
+def check_indexes(verbose=False):
+    failures = []
+    for name, query in hot_queries().items():
+        try:
+            lines, uses_index = explain(query)
+        finally:
+            db.session.rollback()
+        print(f"[{'OK' if uses_index else 'FAIL'}] {name}")
+        if verbose or not uses_index:
+            for line in lines:
+                print(f"       {line}")
+        if not uses_index:
+            failures.append(name)
+    return failures
+
+if __name__ == '__main__':
+    from app import app
+    with app.app_context():
+        failed = check_indexes(verbose='-v' in sys.argv)
+    if failed:
+        print(f"\n{len(failed)} query tanpa index: {json.dumps(failed)}")
+        sys.exit(1)
+    print("\nSemua query panas memakai index.")
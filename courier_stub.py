@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Kurir tiruan lokal untuk menguji webhook tracking tanpa akun API ekspedisi.
+
+Mengirim event tracking bertanda tangan HMAC ke /transactions/tracking/webhook/<kurir>,
+satu per satu seperti kurir sungguhan yang memperbarui status paket.
+
+Contoh:
+    COURIER_WEBHOOK_SECRET=rahasia python courier_stub.py JP1234567890
+    python courier_stub.py 000123456789 --secret rahasia --steps 3 --interval 2
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+import requests
+from tracking import detect_courier, webhook_signature
+
+STUB_STATUSES = [
+    ('Paket diterima oleh kurir', 'Jakarta'),
+    ('Paket tiba di hub asal', 'Jakarta'),
+    ('Paket dalam perjalanan ke kota tujuan', 'Bandung'),
+    ('Paket tiba di hub tujuan', 'Bandung'),
+    ('Paket dalam perjalanan untuk pengiriman', 'Bandung'),
+    ('Paket berhasil diterima', 'Bandung'),
+]
+
+def build_event(tracking_number, index, occurred_at):
+    status, location = STUB_STATUSES[index]
+    return {
+        'id': f'stub-{tracking_number}-{index}',
+        'status': status,
+        'time': occurred_at.isoformat(timespec='seconds'),
+        'location': location,
+        'delivered': index == len(STUB_STATUSES) - 1
+    }
+
+def push_event(base_url, courier, secret, tracking_number, event):
+    body = json.dumps({'tracking_number': tracking_number, 'events': [event]}).encode('utf-8')
+    response = requests.post(
+        f"{base_url.rstrip('/')}/transactions/tracking/webhook/{courier}",
+        data=body,
+        headers={'Content-Type': 'application/json', 'X-Courier-Signature': webhook_signature(body, secret)},
+        timeout=10
+    )
+    return response.status_code, response.text
+
+def main():
+    parser = argparse.ArgumentParser(description='Kirim event tracking tiruan ke webhook BarterHub')
+    parser.add_argument('tracking_number')
+    parser.add_argument('--url', default='http://localhost:5000', help='base URL aplikasi')
+    parser.add_argument('--courier', help='kode kurir (default: dideteksi dari nomor resi)')
+    parser.add_argument('--secret', default=os.environ.get('COURIER_WEBHOOK_SECRET'))
+    parser.add_argument('--steps', type=int, default=len(STUB_STATUSES), help='jumlah event yang dikirim')
+    parser.add_argument('--interval', type=float, default=0, help='jeda antar event dalam detik')
+    args = parser.parse_args()
+
+    if not args.secret:
+        sys.exit('COURIER_WEBHOOK_SECRET atau --secret wajib diisi')
+
+    tracking_number = args.tracking_number.upper().replace(' ', '')
+    courier = (args.courier or detect_courier(tracking_number)).upper()
+    steps = max(1, min(args.steps, len(STUB_STATUSES)))
+    started = datetime.utcnow() - timedelta(hours=steps)
+
+    for index in range(steps):
+        event = build_event(tracking_number, index, started + timedelta(hours=index))
+        status_code, text = push_event(args.url, courier, args.secret, tracking_number, event)
+        print(f"[{status_code}] {event['status']}: {text.strip()}")
+        if args.interval and index < steps - 1:
+            time.sleep(args.interval)
+
+if __name__ == '__main__':
+    main()
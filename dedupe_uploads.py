@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Ubah upload lama (nama_<uuid8>.ext) menjadi content-addressed (<sha256>.ext) dan gabungkan duplikat.
+
+    python dedupe_uploads.py --dry-run          # lihat apa yang akan berubah
+    python dedupe_uploads.py                    # rename, gabungkan, update product_images
+    python dedupe_uploads.py --purge-orphans    # hapus juga file hash yang tidak dipakai ProductImage
+
+Rendition yang sudah ada ikut dipindah ke nama baru. Jalankan saat traffic sepi:
+upload baru selama proses berjalan sudah content-addressed dan tidak disentuh.
+Hanya untuk UPLOAD_STORAGE=filesystem (upload lama hanya pernah ada di disk lokal).
+"""
+
+import argparse
+import os
+import re
+from collections import defaultdict
+
+CONTENT_NAME = re.compile(r'^[0-9a-f]{64}\.[a-z0-9]+$')
+
+def plan_renames(directory):
+    """Kembalikan {nama lama: nama content-addressed} untuk semua upload di direktori"""
+    from utils import allowed_file, content_filename, file_digest
+    renames = {}
+    for name in sorted(os.listdir(directory)):
+        path = os.path.join(directory, name)
+        if not os.path.isfile(path) or not allowed_file(name) or CONTENT_NAME.match(name):
+            continue
+        renames[name] = content_filename(file_digest(path), name.rsplit('.', 1)[1])
+    return renames
+
+def local_storage():
+    from storage import FilesystemStorage, get_storage
+    storage = get_storage()
+    if not isinstance(storage, FilesystemStorage):
+        raise SystemExit("dedupe_uploads hanya mendukung UPLOAD_STORAGE=filesystem")
+    return storage
+
+def move_renditions(subfolder, old_name, new_name, dry_run):
+    from images import RENDITIONS, rendition_key
+    storage = local_storage()
+    for size in RENDITIONS:
+        old_path = storage.path(rendition_key(subfolder, size, old_name))
+        new_path = storage.path(rendition_key(subfolder, size, new_name))
+        if not os.path.exists(old_path) or dry_run:
+            continue
+        if os.path.exists(new_path):
+            os.remove(old_path)
+        else:
+            os.replace(old_path, new_path)
+
+def dedupe(subfolder='products', dry_run=False):
+    from sqlalchemy import text
+    from models import db, ProductImage, REFRESH_MAIN_IMAGE_SQL
+
+    directory = local_storage().path(subfolder)
+    renames = plan_renames(directory)
+    groups = defaultdict(list)
+    for old_name, new_name in renames.items():
+        groups[new_name].append(old_name)
+
+    removed = 0
+    for new_name, old_names in groups.items():
+        new_path = os.path.join(directory, new_name)
+        exists = os.path.exists(new_path)
+        for old_name in old_names:
+            duplicate = exists
+            print(f"{'drop' if duplicate else 'move'} {old_name} -> {new_name}")
+            if not dry_run:
+                if duplicate:
+                    os.remove(os.path.join(directory, old_name))
+                else:
+                    os.replace(os.path.join(directory, old_name), new_path)
+            move_renditions(subfolder, old_name, new_name, dry_run)
+            removed += duplicate
+            exists = True
+
+    updated = 0
+    if renames and not dry_run:
+        # Update referensi lalu sinkronkan Product.main_image (bulk update melewati event ORM)
+        product_ids = set()
+        for old_name, new_name in renames.items():
+            rows = ProductImage.query.filter_by(filename=old_name)
+            product_ids.update(product_id for product_id, in rows.with_entities(ProductImage.product_id))
+            updated += rows.update({ProductImage.filename: new_name}, synchronize_session=False)
+        if product_ids:
+            db.session.execute(text(REFRESH_MAIN_IMAGE_SQL + " WHERE id IN :ids")
+                               .bindparams(db.bindparam('ids', expanding=True)), {'ids': list(product_ids)})
+        db.session.commit()
+
+    print(f"{len(renames)} files renamed to {len(groups)} content hashes, "
+          f"{removed} duplicates removed, {updated} product images updated"
+          + (" (dry run)" if dry_run else ""))
+
+def purge_orphans(subfolder='products', dry_run=False):
+    """Hapus file content-addressed yang tidak dipakai ProductImage mana pun"""
+    from images import release_upload
+    from models import ProductImage
+    directory = local_storage().path(subfolder)
+    referenced = {filename for filename, in ProductImage.query.with_entities(ProductImage.filename).distinct()}
+    purged = 0
+    for name in sorted(os.listdir(directory)):
+        if CONTENT_NAME.match(name) and name not in referenced:
+            print(f"purge {name}")
+            if dry_run or release_upload(name, subfolder, grace=0):
+                purged += 1
+    print(f"{purged} orphaned uploads purged" + (" (dry run)" if dry_run else ""))
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Dedupe upload produk ke penyimpanan content-addressed')
+    parser.add_argument('--subfolder', default='products')
+    parser.add_argument('--dry-run', action='store_true', help='tampilkan rencana tanpa mengubah apa pun')
+    parser.add_argument('--purge-orphans', action='store_true', help='hapus file hash yang tidak dipakai')
+    args = parser.parse_args()
+
+    from app import app
+    with app.app_context():
+        dedupe(args.subfolder, args.dry_run)
+        if args.purge_orphans:
+            purge_orphans(args.subfolder, args.dry_run)
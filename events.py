@@ -0,0 +1,141 @@
+import json
+import queue
+import select
+import threading
+import time
+from collections import defaultdict
+from flask import current_app
+from sqlalchemy import text
+
+# Nama channel PostgreSQL LISTEN/NOTIFY yang dipakai bersama oleh semua worker
+PG_CHANNEL = 'barterhub_events'
+# Batas payload NOTIFY PostgreSQL adalah 8000 byte
+PG_PAYLOAD_LIMIT = 7900
+
+class LocalBroker:
+    """Pub/sub in-process: setiap subscriber mendapat queue sendiri per channel"""
+
+    def __init__(self, max_queue_size=100):
+        self.max_queue_size = max_queue_size
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscribe(self, channel):
+        q = queue.Queue(maxsize=self.max_queue_size)
+        with self._lock:
+            self._subscribers[channel].add(q)
+        return q
+
+    def unsubscribe(self, channel, q):
+        with self._lock:
+            self._subscribers[channel].discard(q)
+            if not self._subscribers[channel]:
+                del self._subscribers[channel]
+
+    def publish(self, channel, event, data):
+        self._deliver(channel, {'event': event, 'data': data})
+
+    def _deliver(self, channel, payload):
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for q in subscribers:
+            try:
+                q.put_nowait(payload)
+            except queue.Full:
+                # Client terlalu lambat; event dibuang, client akan sinkron ulang saat reconnect
+                pass
+
+class PostgresBroker(LocalBroker):
+    """Pub/sub lintas worker gunicorn memakai PostgreSQL LISTEN/NOTIFY.
+
+    Publish mengirim NOTIFY; setiap worker punya satu thread listener yang
+    meneruskan notifikasi ke subscriber lokalnya. Thread baru dijalankan saat
+    subscriber pertama muncul, jadi aman dipakai bersama gunicorn --preload.
+    """
+
+    def __init__(self, engine, max_queue_size=100):
+        super().__init__(max_queue_size)
+        self.engine = engine
+        self._listener = None
+        self._listener_lock = threading.Lock()
+
+    def subscribe(self, channel):
+        self._ensure_listener()
+        return super().subscribe(channel)
+
+    def publish(self, channel, event, data):
+        payload = json.dumps({'channel': channel, 'event': event, 'data': data})
+        if len(payload.encode('utf-8')) > PG_PAYLOAD_LIMIT:
+            print(f"Event payload too large for NOTIFY, dropped: {event}")
+            return
+        with self.engine.connect() as conn:
+            conn.execute(text("SELECT pg_notify(:channel, :payload)"),
+                         {'channel': PG_CHANNEL, 'payload': payload})
+            conn.commit()
+
+    def _ensure_listener(self):
+        with self._listener_lock:
+            if self._listener is None or not self._listener.is_alive():
+                self._listener = threading.Thread(target=self._listen_forever, daemon=True,
+                                                  name='event-broker-listener')
+                self._listener.start()
+
+    def _listen_forever(self):
+        while True:
+            try:
+                self._listen()
+            except Exception as e:
+                print(f"Event listener error, reconnecting: {e}")
+                time.sleep(2)
+
+    def _listen(self):
+        raw = self.engine.raw_connection()
+        # Koneksi LISTEN tidak boleh dikembalikan ke pool
+        raw.detach()
+        try:
+            conn = raw.driver_connection
+            conn.autocommit = True
+            with conn.cursor() as cursor:
+                cursor.execute(f"LISTEN {PG_CHANNEL}")
+            while True:
+                if select.select([conn], [], [], 30) == ([], [], []):
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    notify = conn.notifies.pop(0)
+                    try:
+                        payload = json.loads(notify.payload)
+                    except ValueError:
+                        continue
+                    self._deliver(payload['channel'], {'event': payload['event'], 'data': payload['data']})
+        finally:
+            raw.close()
+
+def init_event_broker(app, engine):
+    """Pilih broker sesuai EVENT_BROKER ('auto', 'postgres' atau 'local')"""
+    backend = app.config.get('EVENT_BROKER', 'auto')
+    if backend == 'auto':
+        backend = 'postgres' if engine.dialect.name == 'postgresql' else 'local'
+
+    if backend == 'postgres':
+        broker = PostgresBroker(engine)
+    else:
+        broker = LocalBroker()
+    app.extensions['event_broker'] = broker
+    return broker
+
+def get_event_broker():
+    return current_app.extensions['event_broker']
+
+def user_channel(user_id):
+    return f'user:{user_id}'
+
+def publish_user_event(user_id, event, data):
+    """Kirim event ke semua tab browser milik user; error publish tidak boleh menggagalkan request"""
+    try:
+        get_event_broker().publish(user_channel(user_id), event, data)
+    except Exception as e:
+        print(f"Error publishing event {event}: {e}")
+
+def format_sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
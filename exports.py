@@ -0,0 +1,108 @@
+import csv
+import io
+import json
+from datetime import datetime
+from flask import Response, current_app, stream_with_context
+from sqlalchemy.orm import aliased
+from models import db, User, Product, Transaction, Report
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+# Awalan sel yang dianggap formula oleh spreadsheet (CSV injection)
+CSV_FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+def users_export(filters):
+    return db.select(
+        User.id, User.username, User.email, User.full_name, User.role, User.phone, User.kode_pos,
+        User.is_active, User.is_banned, User.ban_reason, User.banned_at, User.violation_count, User.created_at
+    ).order_by(User.id)
+
+def reports_export(filters):
+    reporter = aliased(User)
+    reported = aliased(User)
+    query = db.select(
+        Report.id, Report.report_type, Report.status, Report.subject, Report.description,
+        reporter.username.label('reporter'), reported.username.label('reported_user'),
+        Report.product_id, Report.transaction_id, Report.admin_response, Report.resolved_at, Report.created_at
+    ).join(reporter, Report.reporter_id == reporter.id) \
+     .join(reported, Report.reported_user_id == reported.id) \
+     .order_by(Report.id)
+    if filters.get('status'):
+        query = query.where(Report.status == filters['status'])
+    if filters.get('type'):
+        query = query.where(Report.report_type == filters['type'])
+    return query
+
+def transactions_export(filters):
+    seller = aliased(User)
+    buyer = aliased(User)
+    query = db.select(
+        Transaction.id, Transaction.status, Product.title.label('product'),
+        seller.username.label('seller'), buyer.username.label('buyer'),
+        Transaction.total_seller_points, Transaction.total_buyer_points,
+        Transaction.seller_tracking_number, Transaction.buyer_tracking_number,
+        Transaction.seller_shipped_at, Transaction.buyer_shipped_at,
+        Transaction.seller_received_at, Transaction.buyer_received_at,
+        Transaction.created_at, Transaction.updated_at
+    ).join(Product, Transaction.product_id == Product.id) \
+     .join(seller, Transaction.seller_id == seller.id) \
+     .join(buyer, Transaction.buyer_id == buyer.id) \
+     .order_by(Transaction.id)
+    if filters.get('status'):
+        query = query.where(Transaction.status == filters['status'])
+    return query
+
+# Nama export -> pembuat query (filter sama dengan halaman admin-nya)
+EXPORTS = {
+    'users': users_export,
+    'reports': reports_export,
+    'transactions': transactions_export,
+}
+
+def _value(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+def _csv_cell(value):
+    """Teks dari user yang diawali karakter formula diberi prefix ' supaya tidak dieksekusi Excel/Sheets"""
+    value = _value(value)
+    if isinstance(value, str) and value.startswith(CSV_FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+def _csv_chunk(rows, header=None):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(header)
+    writer.writerows([_csv_cell(value) for value in row] for row in rows)
+    return buffer.getvalue()
+
+def _ndjson_chunk(rows, keys):
+    return ''.join(json.dumps(dict(zip(keys, map(_value, row))), ensure_ascii=False) + '\n' for row in rows)
+
+def generate_export(query, fmt, batch_size):
+    """Generator baris export; yield_per memakai server-side cursor (PostgreSQL) sehingga
+    memori konstan, satu chunk output per batch"""
+    result = db.session.execute(query.execution_options(yield_per=batch_size))
+    keys = list(result.keys())
+    if fmt == 'csv':
+        yield _csv_chunk([], header=keys)
+    for rows in result.partitions():
+        yield _csv_chunk(rows) if fmt == 'csv' else _ndjson_chunk(rows, keys)
+
+def export_response(name, fmt, filters):
+    """Response streaming untuk export `name`; None jika nama/format tidak dikenal"""
+    if name not in EXPORTS or fmt not in EXPORT_FORMATS:
+        return None
+    query = EXPORTS[name](filters)
+    batch_size = current_app.config.get('EXPORT_BATCH_SIZE', 1000)
+    filename = f"{name}-{datetime.utcnow():%Y%m%d-%H%M%S}.{fmt}"
+    response = Response(stream_with_context(generate_export(query, fmt, batch_size)),
+                        mimetype=EXPORT_FORMATS[fmt])
+    response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    # Jangan dibuffer reverse proxy supaya download langsung mengalir
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
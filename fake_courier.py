@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Server kurir palsu lokal untuk load test jalur tracking (J&T dan SiCepat).
+
+Meniru endpoint API yang dipakai tracking.py dan bisa menyuntikkan latency,
+timeout, error 5xx dan payload rusak. Arahkan aplikasi ke server ini dengan:
+
+    python fake_courier.py --port 8099 --latency 200 --error-rate 0.1
+    COURIER_JT_BASE_URL=http://127.0.0.1:8099 COURIER_SICEPAT_BASE_URL=http://127.0.0.1:8099 python main.py
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+FAKE_STATUSES = [
+    ('Paket diterima oleh kurir', 'Jakarta'),
+    ('Paket tiba di hub asal', 'Jakarta'),
+    ('Paket dalam perjalanan ke kota tujuan', 'Semarang'),
+    ('Paket tiba di hub tujuan', 'Surabaya'),
+    ('Paket berhasil diterima', 'Surabaya'),
+]
+
+class FaultProfile:
+    """Pengaturan gangguan yang disuntikkan ke setiap request"""
+
+    def __init__(self, latency=0, jitter=0, timeout_rate=0, timeout_seconds=30,
+                 error_rate=0, malformed_rate=0, seed=None):
+        self.latency = latency / 1000
+        self.jitter = jitter / 1000
+        self.timeout_rate = timeout_rate
+        self.timeout_seconds = timeout_seconds
+        self.error_rate = error_rate
+        self.malformed_rate = malformed_rate
+        self.random = random.Random(seed)
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def roll(self):
+        """Tentukan nasib satu request: (delay detik, jenis gangguan atau None)"""
+        with self._lock:
+            self.requests += 1
+            delay = max(0, self.latency + self.random.uniform(-self.jitter, self.jitter))
+            chance = self.random.random()
+        if chance < self.timeout_rate:
+            return self.timeout_seconds, 'timeout'
+        chance -= self.timeout_rate
+        if chance < self.error_rate:
+            return delay, 'error'
+        chance -= self.error_rate
+        if chance < self.malformed_rate:
+            return delay, 'malformed'
+        return delay, None
+
+def fake_timeline(tracking_number):
+    """Timeline deterministik per nomor resi; sebagian resi sudah diterima"""
+    digest = int(hashlib.sha1(tracking_number.encode('utf-8')).hexdigest(), 16)
+    steps = 2 + digest % (len(FAKE_STATUSES) - 1)
+    start = datetime.now() - timedelta(hours=steps * 6)
+    return [
+        (status, location, (start + timedelta(hours=i * 6)).strftime('%Y-%m-%d %H:%M:%S'))
+        for i, (status, location) in enumerate(FAKE_STATUSES[:steps])
+    ]
+
+def jt_payload(tracking_number):
+    timeline = fake_timeline(tracking_number)
+    return {
+        'success': True,
+        'data': {
+            'last_status': timeline[-1][0],
+            'details': [{'desc': status, 'date': date, 'city': city} for status, city, date in timeline]
+        }
+    }
+
+def sicepat_payload(tracking_number):
+    timeline = fake_timeline(tracking_number)
+    return {
+        'sicepat': {
+            'status': {'code': 200},
+            'result': {
+                'waybill_number': tracking_number,
+                'last_status': timeline[-1][0],
+                'status': 'DELIVERED' if len(timeline) == len(FAKE_STATUSES) else 'ON PROCESS',
+                'track_history': [{'status': status, 'date_time': date, 'city': city}
+                                  for status, city, date in timeline]
+            }
+        }
+    }
+
+class FakeCourierHandler(BaseHTTPRequestHandler):
+    profile = FaultProfile()
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        # J&T: GET /api/track/<resi>
+        if self.path.startswith('/api/track/'):
+            self._respond(jt_payload, self.path.rsplit('/', 1)[-1])
+        else:
+            self._send(404, b'{"error": "not found"}')
+
+    def do_POST(self):
+        # SiCepat: POST /customer/waybill {"waybill": ...}
+        length = int(self.headers.get('Content-Length', 0))
+        body = self.rfile.read(length) if length else b''
+        if self.path != '/customer/waybill':
+            self._send(404, b'{"error": "not found"}')
+            return
+        try:
+            waybill = json.loads(body or b'{}').get('waybill', '')
+        except ValueError:
+            self._send(400, b'{"error": "invalid json"}')
+            return
+        self._respond(sicepat_payload, waybill)
+
+    def _respond(self, build_payload, tracking_number):
+        delay, fault = self.profile.roll()
+        time.sleep(delay)
+        if fault == 'timeout':
+            # Tutup tanpa respons setelah menahan koneksi, seperti upstream yang hang
+            self.close_connection = True
+            return
+        if fault == 'error':
+            self._send(503, b'{"error": "service unavailable"}')
+        elif fault == 'malformed':
+            self._send(200, b'{"success": true, "data": {"details": [')
+        else:
+            self._send(200, json.dumps(build_payload(tracking_number)).encode('utf-8'))
+
+    def _send(self, status, body):
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def start_fake_courier(host='127.0.0.1', port=0, profile=None):
+    """Jalankan server di thread daemon; kembalikan (server, base_url). Port 0 = port bebas."""
+    handler = type('ProfiledFakeCourierHandler', (FakeCourierHandler,), {'profile': profile or FaultProfile()})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True, name='fake-courier').start()
+    return server, f'http://{host}:{server.server_address[1]}'
+
+def add_fault_arguments(parser):
+    parser.add_argument('--latency', type=float, default=0, help='latency rata-rata dalam ms')
+    parser.add_argument('--jitter', type=float, default=0, help='variasi latency +/- dalam ms')
+    parser.add_argument('--timeout-rate', type=float, default=0, help='porsi request yang menggantung')
+    parser.add_argument('--timeout-seconds', type=float, default=30, help='lama request menggantung')
+    parser.add_argument('--error-rate', type=float, default=0, help='porsi request yang dijawab 503')
+    parser.add_argument('--malformed-rate', type=float, default=0, help='porsi request dengan JSON rusak')
+    parser.add_argument('--seed', type=int, help='seed random supaya gangguan bisa diulang')
+
+def profile_from_args(args):
+    return FaultProfile(args.latency, args.jitter, args.timeout_rate, args.timeout_seconds,
+                        args.error_rate, args.malformed_rate, args.seed)
+
+def main():
+    parser = argparse.ArgumentParser(description='Server kurir palsu (J&T / SiCepat) untuk load test')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8099)
+    add_fault_arguments(parser)
+    args = parser.parse_args()
+
+    server, base_url = start_fake_courier(args.host, args.port, profile_from_args(args))
+    print(f"Fake courier listening on {base_url} (Ctrl+C untuk berhenti)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == '__main__':
+    main()
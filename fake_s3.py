@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+Object store S3-compatible palsu lokal untuk mencoba UPLOAD_STORAGE=s3 tanpa MinIO/AWS.
+
+Mendukung subset yang dipakai storage.py: PUT/GET/HEAD/DELETE objek, copy, multipart
+upload dan URL pre-signed (tanda tangan SigV4 dan masa berlaku diperiksa). Objek
+disimpan di memori; bucket dibuat otomatis saat objek pertama ditulis.
+
+    python fake_s3.py --port 9000 --latency 20
+    UPLOAD_STORAGE=s3 S3_ENDPOINT_URL=http://127.0.0.1:9000 S3_ACCESS_KEY_ID=fake \\
+        S3_SECRET_ACCESS_KEY=fake-secret python main.py
+"""
+
+import argparse
+import hashlib
+import hmac
+import random
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, quote, unquote, urlsplit
+from xml.etree import ElementTree
+
+class FakeBucketStore:
+    """Isi semua bucket plus multipart upload yang sedang berjalan"""
+
+    def __init__(self, access_key='fake', secret_key='fake-secret', latency=0, error_rate=0, seed=None):
+        self.access_key = access_key
+        self.secret_key = secret_key
+        self.latency = latency / 1000
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.objects = {}  # (bucket, key) -> (data, content_type, last_modified)
+        self.uploads = {}  # upload_id -> (bucket, key, content_type, {part_number: data})
+        self.requests = Counter()  # (method, operasi) -> jumlah, untuk assert di test/benchmark
+        self.lock = threading.Lock()
+
+    def put(self, bucket, key, data, content_type):
+        with self.lock:
+            self.objects[(bucket, key)] = (data, content_type, time.time())
+
+def _signing_key(secret_key, date, region):
+    key = ('AWS4' + secret_key).encode('utf-8')
+    for part in (date, region, 's3', 'aws4_request'):
+        key = hmac.new(key, part.encode('utf-8'), hashlib.sha256).digest()
+    return key
+
+def _etag(data):
+    return '"' + hashlib.md5(data).hexdigest() + '"'
+
+class FakeS3Handler(BaseHTTPRequestHandler):
+    store = FakeBucketStore()
+    protocol_version = 'HTTP/1.1'
+
+    # --- verifikasi SigV4 (dibangun ulang dari request mentah, independen dari storage.py) ---
+
+    def _authorized(self, body):
+        split = urlsplit(self.path)
+        pairs = parse_qsl(split.query, keep_blank_values=True)
+        query = dict(pairs)
+        if 'X-Amz-Signature' in query:
+            credential = query['X-Amz-Credential']
+            signed_headers = query['X-Amz-SignedHeaders']
+            signature = query['X-Amz-Signature']
+            amz_date = query['X-Amz-Date']
+            payload_hash = 'UNSIGNED-PAYLOAD'
+            expires_at = datetime.strptime(amz_date, '%Y%m%dT%H%M%SZ').replace(tzinfo=timezone.utc) + \
+                timedelta(seconds=int(query['X-Amz-Expires']))
+            if datetime.now(timezone.utc) > expires_at:
+                return False, 'AccessDenied', 'Request has expired'
+            pairs = [(k, v) for k, v in pairs if k != 'X-Amz-Signature']
+        else:
+            authorization = self.headers.get('Authorization', '')
+            if not authorization.startswith('AWS4-HMAC-SHA256 '):
+                return False, 'AccessDenied', 'Missing SigV4 authorization'
+            fields = dict(item.strip().split('=', 1) for item in authorization[len('AWS4-HMAC-SHA256 '):].split(','))
+            credential, signed_headers, signature = fields['Credential'], fields['SignedHeaders'], fields['Signature']
+            amz_date = self.headers.get('x-amz-date', '')
+            payload_hash = self.headers.get('x-amz-content-sha256', '')
+            if payload_hash != 'UNSIGNED-PAYLOAD' and payload_hash != hashlib.sha256(body).hexdigest():
+                return False, 'XAmzContentSHA256Mismatch', 'Payload hash mismatch'
+
+        access_key, date, region, _, _ = credential.split('/')
+        if access_key != self.store.access_key:
+            return False, 'InvalidAccessKeyId', 'Unknown access key'
+        canonical_query = '&'.join(f"{quote(k, safe='-_.~')}={quote(v, safe='-_.~')}" for k, v in sorted(pairs))
+        canonical_headers = ''.join(f"{name}:{' '.join(self.headers.get(name, '').split())}\n"
+                                    for name in signed_headers.split(';'))
+        canonical_request = '\n'.join([self.command, split.path, canonical_query, canonical_headers,
+                                       signed_headers, payload_hash])
+        string_to_sign = '\n'.join(['AWS4-HMAC-SHA256', amz_date, f'{date}/{region}/s3/aws4_request',
+                                    hashlib.sha256(canonical_request.encode('utf-8')).hexdigest()])
+        expected = hmac.new(_signing_key(self.store.secret_key, date, region), string_to_sign.encode('utf-8'),
+                            hashlib.sha256).hexdigest()
+        if not hmac.compare_digest(expected, signature):
+            return False, 'SignatureDoesNotMatch', 'Signature mismatch'
+        return True, None, None
+
+    # --- routing ---
+
+    def do_PUT(self):
+        self._handle()
+
+    def do_GET(self):
+        self._handle()
+
+    def do_HEAD(self):
+        self._handle()
+
+    def do_DELETE(self):
+        self._handle()
+
+    def do_POST(self):
+        self._handle()
+
+    def _handle(self):
+        length = int(self.headers.get('Content-Length', 0))
+        body = self.rfile.read(length) if length else b''
+        store = self.store
+        time.sleep(store.latency)
+        with store.lock:
+            fail = store.random.random() < store.error_rate
+        if fail:
+            return self._error(503, 'SlowDown', 'Please reduce your request rate')
+        ok, code, message = self._authorized(body)
+        if not ok:
+            return self._error(403, code, message)
+
+        split = urlsplit(self.path)
+        bucket, _, key = unquote(split.path).lstrip('/').partition('/')
+        query = dict(parse_qsl(split.query, keep_blank_values=True))
+        if not bucket or not key:
+            return self._error(400, 'InvalidRequest', 'Path-style /<bucket>/<key> required')
+        operation = self._dispatch(bucket, key, query, body)
+        with store.lock:
+            store.requests[(self.command, operation)] += 1
+
+    def _dispatch(self, bucket, key, query, body):
+        store = self.store
+        if self.command == 'POST' and 'uploads' in query:
+            upload_id = uuid.uuid4().hex
+            with store.lock:
+                store.uploads[upload_id] = (bucket, key, self.headers.get('Content-Type'), {})
+            self._xml(200, f'<InitiateMultipartUploadResult><Bucket>{bucket}</Bucket><Key>{key}</Key>'
+                           f'<UploadId>{upload_id}</UploadId></InitiateMultipartUploadResult>')
+            return 'create_multipart'
+        if 'uploadId' in query:
+            return self._multipart(bucket, key, query, body)
+        if self.command == 'PUT' and self.headers.get('x-amz-copy-source'):
+            source_bucket, _, source_key = unquote(self.headers['x-amz-copy-source']).lstrip('/').partition('/')
+            with store.lock:
+                source = store.objects.get((source_bucket, source_key))
+            if source is None:
+                self._error(404, 'NoSuchKey', 'Copy source not found')
+            else:
+                content_type = self.headers.get('Content-Type') or source[1]
+                store.put(bucket, key, source[0], content_type)
+                self._xml(200, f'<CopyObjectResult><ETag>{_etag(source[0])}</ETag></CopyObjectResult>')
+            return 'copy'
+        if self.command == 'PUT':
+            store.put(bucket, key, body, self.headers.get('Content-Type', 'application/octet-stream'))
+            self._send(200, b'', {'ETag': _etag(body)})
+            return 'put'
+        if self.command == 'DELETE':
+            with store.lock:
+                store.objects.pop((bucket, key), None)
+            self._send(204, b'')
+            return 'delete'
+
+        with store.lock:
+            found = store.objects.get((bucket, key))
+        if found is None:
+            self._error(404, 'NoSuchKey', 'The specified key does not exist')
+        else:
+            data, content_type, last_modified = found
+            self._send(200, data, {
+                'Content-Type': content_type,
+                'ETag': _etag(data),
+                'Last-Modified': formatdate(last_modified, usegmt=True),
+            })
+        return self.command.lower()
+
+    def _multipart(self, bucket, key, query, body):
+        store = self.store
+        upload_id = query['uploadId']
+        with store.lock:
+            upload = store.uploads.get(upload_id)
+        if upload is None:
+            self._error(404, 'NoSuchUpload', 'The specified upload does not exist')
+            return 'multipart'
+        if self.command == 'PUT':
+            with store.lock:
+                upload[3][int(query['partNumber'])] = body
+            self._send(200, b'', {'ETag': _etag(body)})
+            return 'upload_part'
+        if self.command == 'DELETE':
+            with store.lock:
+                store.uploads.pop(upload_id, None)
+            self._send(204, b'')
+            return 'abort_multipart'
+
+        # CompleteMultipartUpload: gabungkan part sesuai urutan dan ETag di body
+        parts = []
+        for part in ElementTree.fromstring(body).iter('Part'):
+            number, etag = int(part.findtext('PartNumber')), part.findtext('ETag')
+            data = upload[3].get(number)
+            if data is None or _etag(data) != etag:
+                # Seperti S3: status 200 dengan <Error> di body
+                self._xml(200, '<Error><Code>InvalidPart</Code><Message>Part missing or ETag mismatch</Message></Error>')
+                return 'complete_multipart'
+            parts.append((number, data))
+        data = b''.join(data for _, data in sorted(parts))
+        store.put(bucket, key, data, upload[2] or 'application/octet-stream')
+        with store.lock:
+            store.uploads.pop(upload_id, None)
+        self._xml(200, f'<CompleteMultipartUploadResult><Key>{key}</Key><ETag>{_etag(data)}</ETag>'
+                       f'</CompleteMultipartUploadResult>')
+        return 'complete_multipart'
+
+    def _error(self, status, code, message):
+        self._xml(status, f'<Error><Code>{code}</Code><Message>{message}</Message></Error>')
+
+    def _xml(self, status, text):
+        self._send(status, text.encode('utf-8'), {'Content-Type': 'application/xml'})
+
+    def _send(self, status, body, headers=None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def start_fake_s3(host='127.0.0.1', port=0, store=None):
+    """Jalankan server di thread daemon; kembalikan (server, endpoint_url). Port 0 = port bebas."""
+    handler = type('StoredFakeS3Handler', (FakeS3Handler,), {'store': store or FakeBucketStore()})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True, name='fake-s3').start()
+    return server, f'http://{host}:{server.server_address[1]}'
+
+def main():
+    parser = argparse.ArgumentParser(description='Object store S3-compatible palsu untuk UPLOAD_STORAGE=s3')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=9000)
+    parser.add_argument('--access-key', default='fake')
+    parser.add_argument('--secret-key', default='fake-secret')
+    parser.add_argument('--latency', type=float, default=0, help='latency per request dalam ms')
+    parser.add_argument('--error-rate', type=float, default=0, help='porsi request yang dijawab 503 SlowDown')
+    parser.add_argument('--seed', type=int, help='seed random supaya gangguan bisa diulang')
+    args = parser.parse_args()
+
+    store = FakeBucketStore(args.access_key, args.secret_key, args.latency, args.error_rate, args.seed)
+    server, endpoint = start_fake_s3(args.host, args.port, store)
+    print(f"Fake S3 listening on {endpoint} (Ctrl+C untuk berhenti)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == '__main__':
+    main()
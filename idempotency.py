@@ -0,0 +1,133 @@
+import hashlib
+import json
+import uuid
+from datetime import datetime, timedelta
+from functools import wraps
+from flask import current_app, jsonify, make_response, redirect, request
+from flask_login import current_user
+from sqlalchemy.exc import IntegrityError
+from models import db, IdempotencyKey
+
+# Field form yang bukan bagian dari isi request (tidak ikut dibandingkan)
+IGNORED_FIELDS = ('csrf_token', 'idempotency_key')
+MAX_KEY_LENGTH = 64
+
+def new_idempotency_key():
+    """Token untuk hidden input form; dibuat sekali saat form dirender"""
+    return uuid.uuid4().hex
+
+def _request_key():
+    return request.headers.get('Idempotency-Key') or request.form.get('idempotency_key')
+
+def _request_hash():
+    """Hash isi request (form/JSON) supaya key yang dipakai ulang untuk request lain bisa ditolak"""
+    form = sorted((k, v) for k, v in request.form.items(multi=True) if k not in IGNORED_FIELDS)
+    payload = json.dumps([request.path, form, request.get_json(silent=True)], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+def _replay(entry):
+    if entry.response_location:
+        response = redirect(entry.response_location, code=entry.status_code)
+    else:
+        response = make_response(entry.response_body or '', entry.status_code)
+        response.mimetype = entry.response_mimetype or 'text/html'
+    response.headers['Idempotent-Replayed'] = 'true'
+    return response
+
+def _claim(key, request_hash):
+    """Daftarkan key di transaksi terpisah; None jika berhasil, entri lama jika key sudah dipakai"""
+    table = IdempotencyKey.__table__
+    now = datetime.utcnow()
+    try:
+        with db.engine.begin() as conn:
+            conn.execute(table.insert().values(
+                user_id=current_user.id, endpoint=request.endpoint, key=key,
+                request_hash=request_hash, created_at=now, claimed_at=now
+            ))
+        return None
+    except IntegrityError:
+        existing = IdempotencyKey.query.filter_by(user_id=current_user.id, endpoint=request.endpoint, key=key) \
+            .execution_options(populate_existing=True).first()
+    if existing is None or existing.status_code is not None or existing.request_hash != request_hash:
+        return existing
+    # Worker yang crash/timeout setelah klaim meninggalkan baris tanpa respons; setelah
+    # lease habis klaim diambil alih (compare-and-swap, hanya satu retry yang menang)
+    lease = current_app.config.get('IDEMPOTENCY_CLAIM_LEASE', 120)
+    claimed_at = existing.claimed_at or existing.created_at
+    if claimed_at is None or claimed_at > now - timedelta(seconds=lease):
+        return existing
+    with db.engine.begin() as conn:
+        taken = conn.execute(table.update().where(
+            table.c.id == existing.id,
+            table.c.status_code.is_(None),
+            db.func.coalesce(table.c.claimed_at, table.c.created_at) == claimed_at
+        ).values(claimed_at=now)).rowcount
+    return None if taken else existing
+
+def _release(key):
+    with db.engine.begin() as conn:
+        conn.execute(IdempotencyKey.__table__.delete().where(
+            IdempotencyKey.user_id == current_user.id,
+            IdempotencyKey.endpoint == request.endpoint,
+            IdempotencyKey.key == key
+        ))
+
+def _store(key, response):
+    location = response.headers.get('Location') if 300 <= response.status_code < 400 else None
+    with db.engine.begin() as conn:
+        conn.execute(IdempotencyKey.__table__.update().where(
+            IdempotencyKey.user_id == current_user.id,
+            IdempotencyKey.endpoint == request.endpoint,
+            IdempotencyKey.key == key
+        ).values(
+            status_code=response.status_code,
+            response_body=None if location else response.get_data(as_text=True),
+            response_mimetype=response.mimetype,
+            response_location=location
+        ))
+
+def idempotent(view):
+    """Request POST dengan Idempotency-Key (header atau field form idempotency_key) hanya dijalankan sekali.
+
+    Duplikat dengan isi yang sama mendapat respons tersimpan; key yang sama dengan isi
+    berbeda ditolak 422, dan duplikat yang datang saat request pertama masih berjalan 409
+    (sampai IDEMPOTENCY_CLAIM_LEASE habis, setelah itu klaim yang ditinggalkan diambil alih).
+    Respons 5xx/exception tidak disimpan sehingga klien boleh mencoba lagi dengan key yang sama.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        key = _request_key()
+        if request.method != 'POST' or not key:
+            return view(*args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return jsonify({'success': False, 'error': 'Idempotency-Key terlalu panjang'}), 400
+
+        request_hash = _request_hash()
+        existing = _claim(key, request_hash)
+        if existing is not None:
+            if existing.request_hash != request_hash:
+                return jsonify({'success': False, 'error': 'Idempotency-Key sudah dipakai untuk request lain'}), 422
+            if existing.status_code is None:
+                return jsonify({'success': False, 'error': 'Request yang sama sedang diproses'}), 409
+            return _replay(existing)
+
+        try:
+            response = make_response(view(*args, **kwargs))
+        except Exception:
+            _release(key)
+            raise
+        if response.status_code >= 500:
+            _release(key)
+        else:
+            _store(key, response)
+        return response
+    return wrapper
+
+def purge_idempotency_keys():
+    """Hapus key yang lebih tua dari IDEMPOTENCY_KEY_TTL (dipanggil sweeper)"""
+    ttl = current_app.config.get('IDEMPOTENCY_KEY_TTL', 86400)
+    deleted = IdempotencyKey.query.filter(
+        IdempotencyKey.created_at < datetime.utcnow() - timedelta(seconds=ttl)
+    ).delete(synchronize_session=False)
+    db.session.commit()
+    return deleted
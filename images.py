@@ -0,0 +1,282 @@
+import io
+import os
+import shutil
+import struct
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image, ImageOps
+from flask import current_app, url_for
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+from models import db, ProductImage
+from storage import get_storage
+
+# Ukuran sisi terpanjang per rendition (px), dipakai di template lewat image_url/image_srcset
+RENDITIONS = {
+    'thumb': 160,
+    'card': 480,
+    'detail': 960,
+}
+RENDITION_FORMAT = 'webp'
+
+# Format yang diterima (hasil deteksi isi, bukan ekstensi nama file) -> ekstensi simpan
+UPLOAD_FORMATS = {'JPEG': 'jpg', 'PNG': 'png', 'GIF': 'gif'}
+ORIENTATION_TAG = 0x0112
+# Segmen JPEG berisi metadata: APP1 (EXIF/XMP, termasuk GPS), APP13 (IPTC), COM
+STRIPPED_JPEG_MARKERS = {0xE1, 0xED, 0xFE}
+JPEG_SOS = 0xDA
+# Chunk PNG berisi metadata teks/EXIF
+STRIPPED_PNG_CHUNKS = {b'eXIf', b'tEXt', b'zTXt', b'iTXt', b'tIME'}
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+_executor = None
+_executor_lock = threading.Lock()
+_decode_slots = None
+_processing = set()
+_processing_lock = threading.Lock()
+# Rendition yang sudah pasti ada di storage (content-addressed, isinya tidak pernah berubah);
+# menghemat HEAD ke object store di setiap request media
+_known_renditions = set()
+KNOWN_RENDITIONS_LIMIT = 100_000
+
+def upload_key(subfolder, filename):
+    """Key storage original: <subfolder>/<nama>"""
+    return f'{subfolder}/{filename}'
+
+def rendition_key(subfolder, size, filename):
+    """Key storage rendition: <subfolder>/<size>/<nama tanpa ekstensi>.webp"""
+    stem = os.path.splitext(filename)[0]
+    return f'{subfolder}/{size}/{stem}.{RENDITION_FORMAT}'
+
+def rendition_exists(key):
+    if key in _known_renditions:
+        return True
+    if not get_storage().exists(key):
+        return False
+    if len(_known_renditions) >= KNOWN_RENDITIONS_LIMIT:
+        _known_renditions.clear()
+    _known_renditions.add(key)
+    return True
+
+def renditions_ready(subfolder, filename):
+    return all(rendition_exists(rendition_key(subfolder, size, filename)) for size in RENDITIONS)
+
+def upload_ref_count(connection, filename):
+    """Jumlah ProductImage yang memakai file ini (file dipakai bersama karena content-addressed)"""
+    return connection.execute(
+        db.select(db.func.count()).select_from(ProductImage).where(ProductImage.filename == filename)
+    ).scalar()
+
+def upload_keys(subfolder, filename):
+    """Original beserta semua rendition-nya"""
+    return [upload_key(subfolder, filename)] + \
+        [rendition_key(subfolder, size, filename) for size in RENDITIONS]
+
+def release_upload(filename, subfolder='products', grace=None):
+    """Hapus file upload jika tidak ada lagi ProductImage yang memakainya.
+
+    File yang baru saja di-upload ulang (mtime < grace detik) dibiarkan, karena
+    baris ProductImage pengunggahnya mungkin belum di-commit.
+    """
+    if grace is None:
+        grace = current_app.config.get('UPLOAD_RELEASE_GRACE', 3600)
+    with db.engine.connect() as connection:
+        if upload_ref_count(connection, filename):
+            return False
+    storage = get_storage()
+    modified_at = storage.modified_at(upload_key(subfolder, filename))
+    if modified_at is not None and time.time() - modified_at < grace:
+        return False
+    # Isi yang sama dengan ekstensi lain memakai rendition yang sama
+    stem, ext = os.path.splitext(filename)
+    shared = any(storage.exists(upload_key(subfolder, f'{stem}.{other}'))
+                 for other in set(UPLOAD_FORMATS.values()) if f'.{other}' != ext)
+    for key in upload_keys(subfolder, filename)[:1 if shared else None]:
+        _known_renditions.discard(key)
+        storage.delete(key)
+    return True
+
+@event.listens_for(ProductImage, 'after_delete')
+def collect_released_upload(mapper, connection, target):
+    """Catat file yang mungkin tidak terpakai lagi; baru dihapus setelah commit berhasil"""
+    object_session(target).info.setdefault('released_uploads', set()).add(target.filename)
+
+@event.listens_for(Session, 'after_commit')
+def release_uploads_after_commit(session):
+    for filename in session.info.pop('released_uploads', ()):
+        try:
+            release_upload(filename)
+        except Exception as e:
+            print(f"Error releasing upload {filename}: {e}")
+
+@event.listens_for(Session, 'after_rollback')
+def forget_released_uploads(session):
+    session.info.pop('released_uploads', None)
+
+class ImageRejected(Exception):
+    """Upload bukan gambar yang didukung atau terlalu besar untuk di-decode"""
+
+def inspect_image(path, max_pixels):
+    """Baca header saja (tanpa decode piksel): format, ukuran dan orientasi EXIF.
+
+    Decompression bomb ditolak di sini berdasarkan jumlah piksel, sebelum ada decode.
+    """
+    try:
+        with Image.open(path) as img:
+            fmt, (width, height) = img.format, img.size
+            orientation = img.getexif().get(ORIENTATION_TAG, 1)
+    except (OSError, Image.DecompressionBombError) as e:
+        raise ImageRejected(f"bukan gambar yang valid ({e})")
+    if fmt not in UPLOAD_FORMATS:
+        raise ImageRejected(f"format {fmt} tidak didukung")
+    if width * height > max_pixels:
+        raise ImageRejected(f"{width}x{height} melebihi batas {max_pixels} piksel")
+    return fmt, orientation
+
+def _strip_jpeg(src, dst, orientation):
+    if src.read(2) != b'\xff\xd8':
+        raise ImageRejected("JPEG rusak")
+    dst.write(b'\xff\xd8')
+    if orientation != 1:
+        # Orientasi tetap disimpan (EXIF minimal) supaya foto tidak tampil miring
+        exif = Image.Exif()
+        exif[ORIENTATION_TAG] = orientation
+        payload = exif.tobytes()
+        dst.write(b'\xff\xe1' + struct.pack('>H', len(payload) + 2) + payload)
+    while True:
+        marker = src.read(2)
+        while len(marker) == 2 and marker == b'\xff\xff':
+            marker = b'\xff' + src.read(1)  # fill byte sebelum marker
+        if len(marker) < 2 or marker[0] != 0xFF:
+            raise ImageRejected("JPEG rusak")
+        if marker[1] == JPEG_SOS:
+            # Data gambar terkompresi disalin apa adanya (lossless, tanpa decode)
+            dst.write(marker)
+            shutil.copyfileobj(src, dst)
+            return
+        length = src.read(2)
+        if len(length) < 2:
+            raise ImageRejected("JPEG rusak")
+        segment = src.read(struct.unpack('>H', length)[0] - 2)
+        if marker[1] not in STRIPPED_JPEG_MARKERS:
+            dst.write(marker + length + segment)
+
+def _strip_png(src, dst):
+    if src.read(8) != PNG_SIGNATURE:
+        raise ImageRejected("PNG rusak")
+    dst.write(PNG_SIGNATURE)
+    while True:
+        header = src.read(8)
+        if len(header) < 8:
+            return
+        length, chunk_type = struct.unpack('>I4s', header)
+        body = src.read(length + 4)  # data + CRC
+        if chunk_type not in STRIPPED_PNG_CHUNKS:
+            dst.write(header + body)
+        if chunk_type == b'IEND':
+            return
+
+def strip_metadata(path, fmt, orientation=1):
+    """Buang EXIF/XMP/IPTC (lokasi GPS, kamera) dari file upload tanpa decode ulang"""
+    if fmt not in ('JPEG', 'PNG'):
+        return
+    tmp_path = f'{path}.strip'
+    try:
+        with open(path, 'rb') as src, open(tmp_path, 'wb') as dst:
+            if fmt == 'JPEG':
+                _strip_jpeg(src, dst, orientation)
+            else:
+                _strip_png(src, dst)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+def _get_decode_slots():
+    """Batas decode gambar bersamaan per proses (IMAGE_WORKERS), juga untuk pemanggil di luar pool"""
+    global _decode_slots
+    with _executor_lock:
+        if _decode_slots is None:
+            _decode_slots = threading.BoundedSemaphore(current_app.config.get('IMAGE_WORKERS', 2))
+        return _decode_slots
+
+def _get_executor():
+    """Thread pool pemrosesan gambar, dibuat saat pertama dipakai (setelah fork gunicorn)"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=current_app.config.get('IMAGE_WORKERS', 2),
+                thread_name_prefix='images'
+            )
+        return _executor
+
+def schedule_image_processing(filename, subfolder='products'):
+    """Buat rendition di background; satu proses per file dalam satu waktu"""
+    key = (subfolder, filename)
+    with _processing_lock:
+        if key in _processing:
+            return
+        _processing.add(key)
+
+    app = current_app._get_current_object()
+    _get_executor().submit(_background_process, app, subfolder, filename)
+
+def _background_process(app, subfolder, filename):
+    try:
+        with app.app_context():
+            generate_renditions(subfolder, filename)
+    except Exception as e:
+        print(f"Error processing image {filename}: {e}")
+    finally:
+        with _processing_lock:
+            _processing.discard((subfolder, filename))
+
+def decode_for_renditions(img, max_side, max_pixels):
+    """Decode seminimal mungkin untuk rendition sebesar max_side.
+
+    JPEG memakai draft mode: libjpeg langsung men-decode pada skala 1/2, 1/4 atau 1/8
+    yang masih >= max_side, jadi foto 40 MP tidak pernah ada penuh di memori.
+    Hasilnya sudah diputar sesuai EXIF, dalam mode yang didukung WebP, tanpa metadata.
+    """
+    width, height = img.size
+    if width * height > max_pixels:
+        raise ImageRejected(f"{width}x{height} melebihi batas {max_pixels} piksel")
+    if img.format == 'JPEG':
+        img.draft('RGB', (max_side, max_side))
+    img = ImageOps.exif_transpose(img)
+    if img.mode not in ('RGB', 'RGBA'):
+        has_alpha = img.mode in ('LA', 'PA') or 'transparency' in img.info
+        img = img.convert('RGBA' if has_alpha else 'RGB')
+    img.info.clear()
+    return img
+
+def generate_renditions(subfolder, filename):
+    """Decode original sekali lalu turunkan dari rendition terbesar ke terkecil.
+
+    Setiap rendition di-encode ke memori lalu disimpan utuh ke storage, sehingga route
+    media tidak pernah mengirim file setengah jadi.
+    """
+    storage = get_storage()
+    quality = current_app.config.get('IMAGE_WEBP_QUALITY', 80)
+    max_pixels = current_app.config.get('IMAGE_MAX_PIXELS', 50_000_000)
+    with _get_decode_slots(), storage.open(upload_key(subfolder, filename)) as source, \
+            Image.open(source) as original:
+        img = decode_for_renditions(original, max(RENDITIONS.values()), max_pixels)
+        if img is original:
+            img = img.copy()
+        for size, max_side in sorted(RENDITIONS.items(), key=lambda item: -item[1]):
+            img.thumbnail((max_side, max_side), Image.Resampling.LANCZOS)
+            buffer = io.BytesIO()
+            img.save(buffer, RENDITION_FORMAT.upper(), quality=quality, method=4)
+            buffer.seek(0)
+            storage.save(rendition_key(subfolder, size, filename), buffer)
+
+def image_url(filename, size='card', subfolder='products'):
+    return url_for('main.media', subfolder=subfolder, size=size, filename=filename)
+
+def image_srcset(filename, subfolder='products'):
+    """Nilai srcset semua rendition supaya browser memilih ukuran sesuai layout"""
+    return ', '.join(f'{image_url(filename, size, subfolder)} {width}w'
+                     for size, width in sorted(RENDITIONS.items(), key=lambda item: item[1]))
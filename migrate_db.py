@@ -1,7 +1,7 @@
 import os
-from app import create_app, db
+from app import create_app
 from sqlalchemy import text
-from app.models import User # Assuming User model is in app.models
+from models import db, User, REFRESH_MAIN_IMAGE_SQL, rebuild_admin_stats
 
 def migrate_database():
     """Update database schema"""
@@ -11,7 +11,7 @@ def migrate_database():
         # Add any new columns that might be missing
         try:
             # Add violation_count to users if it doesn't exist
-            if not hasattr(User, 'violation_count') or not db.engine.dialect.has_table(db.engine, 'users'):
+            if not hasattr(User, 'violation_count') or not db.inspect(db.engine).has_table('users'):
                 print("Adding violation_count column to users table...")
                 # Using IF NOT EXISTS for broader compatibility, though some dialects might not support it directly in ALTER TABLE.
                 # For robustness, one might query information_schema first.
@@ -23,7 +23,7 @@ def migrate_database():
 
             # Add status to chat_rooms if it doesn't exist
             # First, check if the table exists
-            if db.engine.dialect.has_table(db.engine, 'chat_rooms'):
+            if db.inspect(db.engine).has_table('chat_rooms'):
                 # Check if the column exists
                 result = db.session.execute(text("""
                     SELECT column_name 
@@ -42,7 +42,7 @@ def migrate_database():
 
 
             # Check if is_read column exists
-            if db.engine.dialect.has_table(db.engine, 'chat_messages'):
+            if db.inspect(db.engine).has_table('chat_messages'):
                 result = db.session.execute(text("""
                     SELECT column_name 
                     FROM information_schema.columns 
@@ -98,6 +98,144 @@ def migrate_database():
             else:
                 print("chat_messages table not found, skipping related column additions.")
 
+            # Add denormalized main_image to products and backfill it from product_images
+            if db.inspect(db.engine).has_table('products'):
+                result = db.session.execute(text("""
+                    SELECT column_name 
+                    FROM information_schema.columns 
+                    WHERE table_name = 'products' AND column_name = 'main_image'
+                """))
+
+                if not result.fetchone():
+                    print("Adding main_image column to products table...")
+                    db.session.execute(text("ALTER TABLE products ADD COLUMN main_image VARCHAR(255)"))
+                    db.session.execute(text(REFRESH_MAIN_IMAGE_SQL))
+                    db.session.commit()
+                    print("Successfully added and backfilled main_image column!")
+                else:
+                    print("main_image column already exists.")
+            else:
+                print("products table not found, skipping main_image column addition.")
+
+            # Unread counts are derived from the watermark; drop the old counter column
+            inspector = db.inspect(db.engine)
+            if inspector.has_table('chat_read_states') and \
+                    'unread_count' in {column['name'] for column in inspector.get_columns('chat_read_states')}:
+                print("Dropping unread_count column from chat_read_states table...")
+                db.session.execute(text("ALTER TABLE chat_read_states DROP COLUMN unread_count"))
+                db.session.commit()
+                print("Successfully dropped unread_count column!")
+
+            # Backfill chat read watermarks from the legacy per-message is_read flags
+            if db.inspect(db.engine).has_table('chat_read_states'):
+                print("Backfilling chat_read_states from chat_messages.is_read...")
+                result = db.session.execute(text("""
+                    INSERT INTO chat_read_states (room_id, user_id, last_read_message_id, updated_at)
+                    SELECT p.room_id, p.user_id,
+                        COALESCE(
+                            (SELECT MIN(m.id) - 1 FROM chat_messages m
+                             WHERE m.room_id = p.room_id AND m.sender_id != p.user_id
+                               AND COALESCE(m.is_read, FALSE) = FALSE),
+                            (SELECT MAX(m.id) FROM chat_messages m WHERE m.room_id = p.room_id),
+                            0),
+                        CURRENT_TIMESTAMP
+                    FROM (
+                        SELECT id AS room_id, user1_id AS user_id FROM chat_rooms
+                        UNION
+                        SELECT id AS room_id, user2_id AS user_id FROM chat_rooms
+                    ) p
+                    WHERE NOT EXISTS (
+                        SELECT 1 FROM chat_read_states s
+                        WHERE s.room_id = p.room_id AND s.user_id = p.user_id
+                    )
+                """))
+                db.session.commit()
+                print(f"Successfully backfilled {result.rowcount} chat read states!")
+            else:
+                print("chat_read_states table not found, skipping read watermark backfill.")
+
+            # Optimistic locking version for transactions
+            if db.inspect(db.engine).has_table('transactions'):
+                print("Adding version column to transactions table...")
+                db.session.execute(text("ALTER TABLE transactions ADD COLUMN IF NOT EXISTS version INTEGER NOT NULL DEFAULT 1"))
+                db.session.commit()
+                print("Successfully added version column!")
+
+            # One transaction per accepted chat offer
+            inspector = db.inspect(db.engine)
+            if not inspector.has_table('transactions'):
+                print("transactions table not found, skipping offer_message_id column addition.")
+            elif 'offer_message_id' in {column['name'] for column in inspector.get_columns('transactions')}:
+                print("offer_message_id column already exists.")
+            else:
+                print("Adding offer_message_id column to transactions table...")
+                db.session.execute(text("ALTER TABLE transactions ADD COLUMN offer_message_id INTEGER REFERENCES chat_messages(id)"))
+                db.session.execute(text("CREATE UNIQUE INDEX IF NOT EXISTS transactions_offer_message_id_key ON transactions (offer_message_id)"))
+                db.session.commit()
+                print("Successfully added offer_message_id column!")
+
+            # Lease for in-flight idempotency claims
+            inspector = db.inspect(db.engine)
+            if not inspector.has_table('idempotency_keys'):
+                print("idempotency_keys table not found, skipping claimed_at column addition.")
+            elif 'claimed_at' in {column['name'] for column in inspector.get_columns('idempotency_keys')}:
+                print("claimed_at column already exists.")
+            else:
+                print("Adding claimed_at column to idempotency_keys table...")
+                db.session.execute(text("ALTER TABLE idempotency_keys ADD COLUMN claimed_at TIMESTAMP"))
+                db.session.execute(text("UPDATE idempotency_keys SET claimed_at = created_at"))
+                db.session.commit()
+                print("Successfully added claimed_at column!")
+
+            # Nomor resi disimpan dalam bentuk kanonik (huruf besar, tanpa spasi), sama dengan kunci event/cache tracking
+            if db.inspect(db.engine).has_table('transactions'):
+                print("Normalizing tracking numbers on transactions table...")
+                total = 0
+                for column in ('seller_tracking_number', 'buyer_tracking_number'):
+                    result = db.session.execute(text(f"""
+                        UPDATE transactions SET {column} = UPPER(REPLACE({column}, ' ', ''))
+                        WHERE {column} IS NOT NULL AND {column} <> UPPER(REPLACE({column}, ' ', ''))
+                    """))
+                    total += result.rowcount
+                db.session.commit()
+                print(f"Successfully normalized {total} tracking numbers!")
+
+            # Reservasi produk yang sedang ditawarkan di transaksi aktif
+            if db.inspect(db.engine).has_table('products'):
+                print("Adding is_reserved column to products table...")
+                db.session.execute(text("ALTER TABLE products ADD COLUMN IF NOT EXISTS is_reserved BOOLEAN NOT NULL DEFAULT FALSE"))
+                result = db.session.execute(text("""
+                    UPDATE products SET is_reserved = TRUE
+                    WHERE id IN (
+                        SELECT o.product_id FROM transaction_offers o
+                        JOIN transactions t ON t.id = o.transaction_id
+                        WHERE t.status IN ('pending', 'agreed', 'shipped', 'dispute')
+                    )
+                """))
+                db.session.commit()
+                print(f"Successfully reserved {result.rowcount} offered products!")
+
+            # Rollup counter dashboard admin
+            if db.inspect(db.engine).has_table('admin_stats'):
+                print("Rebuilding admin_stats rollup...")
+                stats = rebuild_admin_stats(db.session.connection())
+                db.session.commit()
+                print(f"Successfully rebuilt admin stats: {stats}")
+
+            # Composite indexes declared on the models (create_all skips existing tables)
+            created = 0
+            inspector = db.inspect(db.engine)
+            for table in db.metadata.sorted_tables:
+                if not inspector.has_table(table.name):
+                    continue
+                existing = {index['name'] for index in inspector.get_indexes(table.name)}
+                for index in table.indexes:
+                    if index.name not in existing:
+                        print(f"Creating index {index.name}...")
+                        index.create(bind=db.engine)
+                        created += 1
+            print(f"Successfully created {created} missing indexes!" if created else "All model indexes already exist.")
+
         except Exception as e:
             print(f"Migration error: {e}")
             db.session.rollback()
@@ -1,6 +1,8 @@
 from datetime import datetime
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
+from sqlalchemy import event, text, union_all
+from sqlalchemy.orm import aliased
 from werkzeug.security import generate_password_hash, check_password_hash
 
 # Create a db instance that will be initialized later
@@ -8,6 +10,10 @@ db = SQLAlchemy()
 
 class User(UserMixin, db.Model):
     __tablename__ = 'users'
+    # Top pelanggar di dashboard admin
+    __table_args__ = (
+        db.Index('ix_users_violation_count', 'violation_count', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False)
@@ -84,6 +90,13 @@ class Category(db.Model):
 
 class Product(db.Model):
     __tablename__ = 'products'
+    # Index sesuai filter + urutan route yang sering dipakai (listing, kategori, produk milik user)
+    __table_args__ = (
+        db.Index('ix_products_available_created', 'is_available', 'created_at', 'id'),
+        db.Index('ix_products_category_available_created', 'category_id', 'is_available', 'created_at', 'id'),
+        db.Index('ix_products_user_available', 'user_id', 'is_available'),
+        db.Index('ix_products_created', 'created_at', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -104,6 +117,10 @@ class Product(db.Model):
     total_points = db.Column(db.Integer, default=0)
     
     is_available = db.Column(db.Boolean, default=True)
+    # Sedang ditawarkan di transaksi aktif (lihat reserve_products / release_offered_products)
+    is_reserved = db.Column(db.Boolean, nullable=False, default=False, server_default=db.false())
+    # Denormalisasi nama file foto utama, dijaga oleh event ProductImage di bawah
+    main_image = db.Column(db.String(255))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
@@ -132,14 +149,16 @@ class Product(db.Model):
         return self.total_points
     
     def get_main_image(self):
-        """Get the main product image"""
-        image = self.images.filter_by(is_main=True).first()
-        if not image:
-            image = self.images.first()
-        return image.filename if image else 'default-product.jpg'
+        """Get the main product image (tanpa query, dari kolom main_image)"""
+        return self.main_image or 'default-product.jpg'
 
 class ProductImage(db.Model):
     __tablename__ = 'product_images'
+    __table_args__ = (
+        db.Index('ix_product_images_product', 'product_id', 'is_main'),
+        # Reference count file upload (nama file = hash isi, dipakai bersama)
+        db.Index('ix_product_images_filename', 'filename'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False)
@@ -147,8 +166,32 @@ class ProductImage(db.Model):
     is_main = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+# Foto utama = foto dengan is_main, jika tidak ada pakai foto pertama
+REFRESH_MAIN_IMAGE_SQL = """
+    UPDATE products SET main_image = (
+        SELECT filename FROM product_images
+        WHERE product_images.product_id = products.id
+        ORDER BY CASE WHEN is_main THEN 0 ELSE 1 END, id
+        LIMIT 1
+    )
+"""
+
+@event.listens_for(ProductImage, 'after_insert')
+@event.listens_for(ProductImage, 'after_update')
+@event.listens_for(ProductImage, 'after_delete')
+def refresh_product_main_image(mapper, connection, target):
+    """Sinkronkan Product.main_image setiap kali foto ditambah, dihapus atau dijadikan utama"""
+    connection.execute(text(REFRESH_MAIN_IMAGE_SQL + " WHERE id = :product_id"),
+                       {'product_id': target.product_id})
+
 class ChatRoom(db.Model):
     __tablename__ = 'chat_rooms'
+    # Room per user (inbox) dan per produk (inbox penjual, cari room pembeli)
+    __table_args__ = (
+        db.Index('ix_chat_rooms_user1', 'user1_id', 'id'),
+        db.Index('ix_chat_rooms_user2', 'user2_id', 'id'),
+        db.Index('ix_chat_rooms_product_created', 'product_id', 'created_at', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user1_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -165,26 +208,137 @@ class ChatRoom(db.Model):
 
 class ChatMessage(db.Model):
     __tablename__ = 'chat_messages'
+    # Window pesan per room diurutkan id; pesan terakhir per room diurutkan created_at
+    __table_args__ = (
+        db.Index('ix_chat_messages_room_id', 'room_id', 'id'),
+        db.Index('ix_chat_messages_room_created', 'room_id', 'created_at', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     room_id = db.Column(db.Integer, db.ForeignKey('chat_rooms.id'), nullable=False)
     sender_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     message = db.Column(db.Text, nullable=False)
     message_type = db.Column(db.String(20), default='text')  # text, offer, counter_offer, system
-    is_read = db.Column(db.Boolean, default=False)
+    is_read = db.Column(db.Boolean, default=False)  # Legacy, diganti ChatReadState
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     # Untuk pesan tipe offer/counter_offer
     offered_products_json = db.Column(db.Text)  # JSON array of {product_id, quantity}
     requested_products_json = db.Column(db.Text)  # JSON array of {product_id, quantity}
 
+class ChatReadState(db.Model):
+    """Watermark baca per user per room: pesan dengan id > last_read_message_id belum dibaca"""
+    __tablename__ = 'chat_read_states'
+    __table_args__ = (
+        db.UniqueConstraint('room_id', 'user_id', name='uq_chat_read_states_room_user'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    room_id = db.Column(db.Integer, db.ForeignKey('chat_rooms.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
+    # Jumlah unread diturunkan dari watermark (lihat unread_messages), tidak disimpan sebagai counter
+    last_read_message_id = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+@event.listens_for(ChatRoom, 'after_insert')
+def create_chat_read_states(mapper, connection, target):
+    """Setiap peserta room baru langsung punya watermark baca"""
+    connection.execute(ChatReadState.__table__.insert(), [
+        {'room_id': target.id, 'user_id': user_id, 'last_read_message_id': 0, 'updated_at': datetime.utcnow()}
+        for user_id in {target.user1_id, target.user2_id}
+    ])
+
+def _advance_watermark(read_states, message_id):
+    """Watermark hanya boleh maju; update yang membawa snapshot lama tidak memundurkannya"""
+    column = read_states.c.last_read_message_id
+    return db.case((column < message_id, message_id), else_=column)
+
+def unread_messages(user_id):
+    """Kondisi pesan belum dibaca user: id > watermark room-nya, bukan kiriman user sendiri.
+
+    Dihitung dari index (room_id, id) di chat_messages, jadi selalu konsisten dengan watermark.
+    """
+    return db.and_(
+        ChatReadState.room_id == ChatMessage.room_id,
+        ChatReadState.user_id == user_id,
+        ChatMessage.id > ChatReadState.last_read_message_id,
+        ChatMessage.sender_id != user_id
+    )
+
+@event.listens_for(ChatMessage, 'after_insert')
+def advance_sender_watermark(mapper, connection, target):
+    """Pengirim otomatis sudah membaca pesannya sendiri; peserta lain dipastikan punya watermark"""
+    read_states = ChatReadState.__table__
+    room = connection.execute(
+        db.select(ChatRoom.user1_id, ChatRoom.user2_id).where(ChatRoom.id == target.room_id)
+    ).first()
+    for user_id in {room.user1_id, room.user2_id}:
+        where = (read_states.c.room_id == target.room_id, read_states.c.user_id == user_id)
+        if user_id == target.sender_id:
+            exists = connection.execute(
+                read_states.update().where(*where)
+                .values(last_read_message_id=_advance_watermark(read_states, target.id), updated_at=datetime.utcnow())
+            ).rowcount
+        else:
+            exists = connection.execute(db.select(read_states.c.id).where(*where)).first()
+        if not exists:
+            # Room lama yang belum punya watermark
+            connection.execute(read_states.insert(), {
+                'room_id': target.room_id, 'user_id': user_id,
+                'last_read_message_id': target.id if user_id == target.sender_id else 0,
+                'updated_at': datetime.utcnow()
+            })
+
+def mark_room_read(room_id, user_id):
+    """Tandai seluruh room sudah dibaca user dengan satu UPDATE (geser watermark ke pesan terakhir).
+
+    Pesan yang masuk bersamaan punya id di atas snapshot MAX(id) dan tetap terhitung unread.
+    """
+    read_states = ChatReadState.__table__
+    last_message_id = db.select(db.func.coalesce(db.func.max(ChatMessage.id), 0)) \
+        .where(ChatMessage.room_id == room_id)
+    result = db.session.execute(
+        read_states.update()
+        .where(read_states.c.room_id == room_id, read_states.c.user_id == user_id)
+        .values(last_read_message_id=_advance_watermark(read_states, last_message_id.scalar_subquery()),
+                updated_at=datetime.utcnow())
+    )
+    if result.rowcount == 0:
+        db.session.add(ChatReadState(
+            room_id=room_id,
+            user_id=user_id,
+            last_read_message_id=db.session.scalar(last_message_id)
+        ))
+
+# State machine status transaksi: status -> status tujuan yang sah
+TRANSACTION_TRANSITIONS = {
+    'pending': {'agreed', 'cancelled', 'dispute'},
+    'agreed': {'shipped', 'completed', 'cancelled', 'dispute'},
+    'shipped': {'completed', 'cancelled', 'dispute'},
+    'dispute': {'completed', 'cancelled'},
+    'completed': set(),
+    'cancelled': set(),
+}
+
+class InvalidTransition(ValueError):
+    """Perubahan status transaksi yang tidak diizinkan state machine"""
+
 class Transaction(db.Model):
     __tablename__ = 'transactions'
+    # Daftar transaksi user (dua cabang UNION ALL: sebagai penjual / pembeli) dan filter admin per status
+    __table_args__ = (
+        db.Index('ix_transactions_seller_created', 'seller_id', 'created_at', 'id'),
+        db.Index('ix_transactions_buyer_created', 'buyer_id', 'created_at', 'id'),
+        db.Index('ix_transactions_status_created', 'status', 'created_at', 'id'),
+        db.Index('ix_transactions_created', 'created_at', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     seller_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     buyer_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False)
+    # Pesan penawaran chat yang diterima; unik supaya satu penawaran hanya menghasilkan satu transaksi
+    offer_message_id = db.Column(db.Integer, db.ForeignKey('chat_messages.id'), unique=True)
     
     status = db.Column(db.String(20), default='pending')  # pending, agreed, shipped, completed, cancelled, dispute
     
@@ -216,13 +370,29 @@ class Transaction(db.Model):
     agreement_timestamp = db.Column(db.DateTime)
     
     notes = db.Column(db.Text)
+    # Optimistic locking: setiap UPDATE ORM memakai WHERE version = <versi yang dibaca>
+    # dan gagal dengan StaleDataError jika baris sudah diubah request lain
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    __mapper_args__ = {'version_id_col': version}
+    
     # Relationships
     product = db.relationship('Product')
     offers = db.relationship('TransactionOffer', backref='transaction', lazy='dynamic', cascade='all, delete-orphan')
     
+    def can_transition_to(self, status):
+        return status == self.status or status in TRANSACTION_TRANSITIONS.get(self.status, ())
+    
+    def transition_to(self, status):
+        """Ubah status sesuai TRANSACTION_TRANSITIONS; status yang sama dianggap no-op"""
+        if not self.can_transition_to(status):
+            raise InvalidTransition(f"Transaksi #{self.id} tidak bisa berubah dari {self.status} ke {status}")
+        if status == 'cancelled' and self.status != 'cancelled':
+            release_offered_products([self.id])
+        self.status = status
+    
     def can_proceed_to_shipping(self):
         """Check if both parties agreed in chat and have complete addresses"""
         return (self.chat_agreement_seller and 
@@ -242,7 +412,7 @@ class Transaction(db.Model):
         # If both agreed, set timestamp
         if self.chat_agreement_seller and self.chat_agreement_buyer:
             self.agreement_timestamp = datetime.utcnow()
-            self.status = 'agreed'
+            self.transition_to('agreed')
             
     def generate_confirmation_codes(self):
         """Generate unique confirmation codes for both seller and buyer packages"""
@@ -258,8 +428,120 @@ class Transaction(db.Model):
         if not self.buyer_confirmation_code:
             self.buyer_confirmation_code = ''.join(secrets.choice(alphabet) for _ in range(8))
 
+class ProductsUnavailable(Exception):
+    """Sebagian produk yang ditawarkan sudah dipesan transaksi lain atau tidak tersedia"""
+
+def reserve_products(product_ids, owner_id):
+    """Ambil, kunci dan tandai reserved semua produk yang ditawarkan dalam satu query IN.
+
+    PostgreSQL: SELECT ... FOR UPDATE SKIP LOCKED, produk yang sedang dikunci pembeli
+    lain dilewati (dianggap tidak tersedia) tanpa menunggu. SQLite tidak punya row lock,
+    jadi reservasi memakai UPDATE bersyarat is_reserved = false sebagai compare-and-swap.
+    Semua atau tidak sama sekali: melempar ProductsUnavailable jika ada yang gagal.
+    """
+    product_ids = set(product_ids)
+    query = Product.query.filter(
+        Product.id.in_(product_ids),
+        Product.user_id == owner_id,
+        Product.is_available == True,
+        Product.is_reserved == False
+    )
+
+    if db.engine.dialect.name == 'postgresql':
+        products = query.with_for_update(skip_locked=True, of=Product).all()
+        if len(products) != len(product_ids):
+            raise ProductsUnavailable()
+        for product in products:
+            product.is_reserved = True
+        return products
+
+    products = query.all()
+    if len(products) != len(product_ids):
+        raise ProductsUnavailable()
+    reserved = Product.query.filter(Product.id.in_(product_ids), Product.is_reserved == False) \
+        .update({Product.is_reserved: True}, synchronize_session='evaluate')
+    if reserved != len(product_ids):
+        raise ProductsUnavailable()
+    return products
+
+def release_offered_products(transaction_ids):
+    """Lepas reservasi produk yang ditawarkan di transaksi yang dibatalkan"""
+    offered = db.select(TransactionOffer.product_id).where(TransactionOffer.transaction_id.in_(transaction_ids))
+    return Product.query.filter(Product.id.in_(offered)) \
+        .update({Product.is_reserved: False}, synchronize_session=False)
+
+def involved_transactions(user_id):
+    """Transaksi user sebagai penjual atau pembeli, sebagai entity alias di atas UNION ALL.
+
+    Pengganti filter `seller_id = X OR buyer_id = X`: tiap cabang memakai index
+    (seller_id|buyer_id, created_at, id) sendiri, dan filter/urutan/limit dari luar
+    didorong planner ke masing-masing cabang.
+    """
+    as_seller = db.select(Transaction).where(Transaction.seller_id == user_id)
+    as_buyer = db.select(Transaction).where(Transaction.buyer_id == user_id, Transaction.seller_id != user_id)
+    return aliased(Transaction, union_all(as_seller, as_buyer).subquery('user_transactions'))
+
+class IdempotencyKey(db.Model):
+    """Respons tersimpan per (user, endpoint, Idempotency-Key) untuk memutar ulang request duplikat"""
+    __tablename__ = 'idempotency_keys'
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'endpoint', 'key', name='uq_idempotency_keys_user_endpoint_key'),
+        db.Index('ix_idempotency_keys_created', 'created_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    endpoint = db.Column(db.String(100), nullable=False)
+    key = db.Column(db.String(64), nullable=False)
+    request_hash = db.Column(db.String(64), nullable=False)  # Key yang sama dengan isi request berbeda ditolak
+    status_code = db.Column(db.Integer)  # NULL selama request pertama masih diproses
+    response_body = db.Column(db.Text)
+    response_mimetype = db.Column(db.String(100))
+    response_location = db.Column(db.String(500))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Awal klaim yang sedang berjalan; klaim tanpa respons yang melewati lease dianggap ditinggalkan
+    claimed_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class TrackingCache(db.Model):
+    """Hasil tracking ekspedisi terakhir per (kurir, nomor resi) untuk stale-while-revalidate"""
+    __tablename__ = 'tracking_cache'
+    __table_args__ = (
+        db.UniqueConstraint('courier', 'tracking_number', name='uq_tracking_cache_courier_number'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    courier = db.Column(db.String(20), nullable=False)
+    tracking_number = db.Column(db.String(100), nullable=False)
+    data = db.Column(db.Text)  # JSON hasil tracking yang ditampilkan
+    last_error = db.Column(db.Text)  # Error terakhir saat refresh (negative cache)
+    fetched_at = db.Column(db.DateTime)  # Terakhir kali API ekspedisi berhasil
+    expires_at = db.Column(db.DateTime, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class TrackingEvent(db.Model):
+    """Event tracking ternormalisasi dari webhook kurir atau hasil polling API"""
+    __tablename__ = 'tracking_events'
+    __table_args__ = (
+        db.UniqueConstraint('courier', 'tracking_number', 'event_key', name='uq_tracking_events_key'),
+        db.Index('ix_tracking_events_lookup', 'tracking_number', 'occurred_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    courier = db.Column(db.String(20), nullable=False)
+    tracking_number = db.Column(db.String(100), nullable=False)
+    event_key = db.Column(db.String(64), nullable=False)  # ID event dari kurir atau hash isi event (dedupe)
+    status = db.Column(db.String(255), nullable=False)
+    location = db.Column(db.String(255))
+    occurred_at = db.Column(db.DateTime, nullable=False)
+    is_delivered = db.Column(db.Boolean, default=False)
+    source = db.Column(db.String(20), default='webhook')  # webhook, poll
+    received_at = db.Column(db.DateTime, default=datetime.utcnow)
+
 class TransactionOffer(db.Model):
     __tablename__ = 'transaction_offers'
+    __table_args__ = (
+        db.Index('ix_transaction_offers_transaction', 'transaction_id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     transaction_id = db.Column(db.Integer, db.ForeignKey('transactions.id'), nullable=False)
@@ -274,6 +556,10 @@ class TransactionOffer(db.Model):
 
 class Report(db.Model):
     __tablename__ = 'reports'
+    __table_args__ = (
+        db.Index('ix_reports_created', 'created_at', 'id'),
+        db.Index('ix_reports_status_created', 'status', 'created_at', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     reporter_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -321,3 +607,103 @@ class Review(db.Model):
     transaction = db.relationship('Transaction', backref='reviews')
     reviewer = db.relationship('User', foreign_keys=[reviewer_id], backref='reviews_given')
     reviewed_user = db.relationship('User', foreign_keys=[reviewed_user_id], backref='reviews_received')
+
+class AdminStat(db.Model):
+    """Rollup counter dashboard admin, dijaga oleh event User/Report di bawah"""
+    __tablename__ = 'admin_stats'
+    
+    name = db.Column(db.String(50), primary_key=True)
+    value = db.Column(db.Integer, nullable=False, default=0)
+
+ADMIN_STAT_NAMES = ('total_users', 'banned_users', 'active_sellers', 'active_buyers',
+                    'total_reports', 'pending_reports')
+
+def _user_stats(role, is_active, is_banned):
+    """Counter yang disumbang satu user (sama dengan filter di admin_stats_query)"""
+    active = is_active is True and is_banned is False
+    return {
+        'total_users': 1,
+        'banned_users': int(is_banned is True),
+        'active_sellers': int(active and role == 'penjual'),
+        'active_buyers': int(active and role == 'pembeli'),
+    }
+
+def _report_stats(status):
+    return {'total_reports': 1, 'pending_reports': int(status == 'pending')}
+
+def admin_stats_query():
+    """Semua counter dashboard dalam satu query: satu agregat per tabel sebagai scalar subquery"""
+    def count_if(condition):
+        return db.func.count(db.case((condition, 1)))
+
+    active = (User.is_active == True) & (User.is_banned == False)
+    users = db.select(
+        db.func.count(User.id).label('total_users'),
+        count_if(User.is_banned == True).label('banned_users'),
+        count_if(active & (User.role == 'penjual')).label('active_sellers'),
+        count_if(active & (User.role == 'pembeli')).label('active_buyers'),
+    ).subquery()
+    reports = db.select(
+        db.func.count(Report.id).label('total_reports'),
+        count_if(Report.status == 'pending').label('pending_reports'),
+    ).subquery()
+    return db.select(users, reports).select_from(users.join(reports, db.true()))
+
+def rebuild_admin_stats(connection):
+    """Hitung ulang rollup dari tabel sumber (migrasi / rollup belum terisi)"""
+    stats = dict(connection.execute(admin_stats_query()).mappings().one())
+    table = AdminStat.__table__
+    connection.execute(table.delete())
+    connection.execute(table.insert(), [{'name': name, 'value': stats[name]} for name in ADMIN_STAT_NAMES])
+    return stats
+
+def get_admin_stats(use_rollup=False):
+    """Counter dashboard admin: dari rollup jika diaktifkan dan lengkap, selain itu satu query agregat"""
+    if use_rollup:
+        stats = {stat.name: stat.value for stat in AdminStat.query.all()}
+        if set(ADMIN_STAT_NAMES) <= set(stats):
+            return stats
+        stats = rebuild_admin_stats(db.session.connection())
+        db.session.commit()
+        return stats
+    return dict(db.session.execute(admin_stats_query()).mappings().one())
+
+def _previous(target, attribute):
+    history = db.inspect(target).attrs[attribute].history
+    return history.deleted[0] if history.deleted else getattr(target, attribute)
+
+def _apply_stat_deltas(connection, old, new):
+    table = AdminStat.__table__
+    for name in set(old) | set(new):
+        delta = new.get(name, 0) - old.get(name, 0)
+        if delta:
+            connection.execute(table.update().where(table.c.name == name).values(value=table.c.value + delta))
+
+def _track_admin_stats(model, attributes, stats_of):
+    """Pasang event insert/update/delete yang menggeser counter rollup dalam transaksi flush yang sama"""
+    def old_stats(target):
+        return stats_of(*(_previous(target, attribute) for attribute in attributes))
+
+    def new_stats(target):
+        return stats_of(*(getattr(target, attribute) for attribute in attributes))
+
+    # active_history: nilai lama dimuat saat atribut yang sudah expired (setelah commit) diubah
+    for attribute in attributes:
+        event.listen(getattr(model, attribute), 'set', lambda target, value, oldvalue, initiator: value,
+                     active_history=True, retval=True)
+
+    @event.listens_for(model, 'after_insert')
+    def after_insert(mapper, connection, target):
+        _apply_stat_deltas(connection, {}, new_stats(target))
+
+    @event.listens_for(model, 'after_update')
+    def after_update(mapper, connection, target):
+        _apply_stat_deltas(connection, old_stats(target), new_stats(target))
+
+    @event.listens_for(model, 'after_delete')
+    def after_delete(mapper, connection, target):
+        _apply_stat_deltas(connection, old_stats(target), {})
+
+# Register, ban/unban, aktif/nonaktif, laporan baru dan resolve
+_track_admin_stats(User, ('role', 'is_active', 'is_banned'), _user_stats)
+_track_admin_stats(Report, ('status',), _report_stats)
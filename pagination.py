@@ -0,0 +1,107 @@
+from datetime import datetime
+from flask import current_app
+from itsdangerous import URLSafeSerializer, BadSignature
+from sqlalchemy import tuple_
+from models import db
+
+class CursorPagination:
+    """Hasil pagination berbasis cursor (keyset) dengan token next/prev yang opaque"""
+
+    def __init__(self, items, per_page, next_cursor=None, prev_cursor=None,
+                 total=None, total_is_approximate=False):
+        self.items = items
+        self.per_page = per_page
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+        self.total = total
+        self.total_is_approximate = total_is_approximate
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self):
+        return self.prev_cursor is not None
+
+def _serializer():
+    return URLSafeSerializer(current_app.secret_key, salt='pagination-cursor')
+
+def encode_cursor(payload):
+    return _serializer().dumps(payload)
+
+def decode_cursor(cursor):
+    """Decode token cursor; token rusak/dimanipulasi dianggap halaman pertama"""
+    if not cursor:
+        return None
+    try:
+        return _serializer().loads(cursor)
+    except BadSignature:
+        return None
+
+def approximate_count(query):
+    """Perkiraan jumlah baris: estimasi planner di PostgreSQL, COUNT biasa di database lain"""
+    query = query.order_by(None)
+    if db.engine.dialect.name == 'postgresql':
+        try:
+            compiled = query.statement.compile(dialect=db.engine.dialect)
+            # Savepoint: EXPLAIN yang gagal tidak membatalkan transaksi session,
+            # jadi fallback COUNT di bawah masih bisa jalan
+            with db.session.begin_nested():
+                result = db.session.connection().exec_driver_sql(
+                    'EXPLAIN (FORMAT JSON) ' + str(compiled), compiled.params
+                ).scalar()
+            return int(result[0]['Plan']['Plan Rows'])
+        except Exception as e:
+            print(f"Error estimating row count: {e}")
+    return query.count()
+
+def keyset_paginate(query, created_col, id_col, cursor=None, per_page=20, with_total=False):
+    """Pagination keyset pada (created_at, id) terbaru lebih dulu, tanpa OFFSET maupun COUNT(*)"""
+    state = decode_cursor(cursor)
+    total = approximate_count(query) if with_total else None
+
+    if state and state.get('d') in ('n', 'p') and 'c' in state and 'i' in state:
+        key = (datetime.fromisoformat(state['c']), state['i'])
+        if state['d'] == 'n':
+            rows = query.filter(tuple_(created_col, id_col) < key) \
+                .order_by(created_col.desc(), id_col.desc()).limit(per_page + 1).all()
+            has_more, has_before = len(rows) > per_page, True
+            rows = rows[:per_page]
+        else:
+            rows = query.filter(tuple_(created_col, id_col) > key) \
+                .order_by(created_col.asc(), id_col.asc()).limit(per_page + 1).all()
+            has_before, has_more = len(rows) > per_page, True
+            rows = list(reversed(rows[:per_page]))
+    else:
+        rows = query.order_by(created_col.desc(), id_col.desc()).limit(per_page + 1).all()
+        has_more, has_before = len(rows) > per_page, False
+        rows = rows[:per_page]
+
+    def _cursor(row, direction):
+        return encode_cursor({
+            'd': direction,
+            'c': getattr(row, created_col.key).isoformat(),
+            'i': getattr(row, id_col.key)
+        })
+
+    return CursorPagination(
+        rows, per_page,
+        next_cursor=_cursor(rows[-1], 'n') if rows and has_more else None,
+        prev_cursor=_cursor(rows[0], 'p') if rows and has_before else None,
+        total=total,
+        total_is_approximate=with_total and db.engine.dialect.name == 'postgresql'
+    )
+
+def offset_paginate(query, cursor=None, per_page=20):
+    """Pagination berbasis halaman dengan token cursor yang sama, untuk urutan non-keyset (mis. relevansi)"""
+    state = decode_cursor(cursor)
+    page = state.get('p', 1) if state else 1
+    page = page if isinstance(page, int) and page > 0 else 1
+
+    rows = query.offset((page - 1) * per_page).limit(per_page + 1).all()
+    return CursorPagination(
+        rows[:per_page], per_page,
+        next_cursor=encode_cursor({'p': page + 1}) if len(rows) > per_page else None,
+        prev_cursor=encode_cursor({'p': page - 1}) if page > 1 else None
+    )
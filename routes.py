@@ -1,13 +1,31 @@
 import os
-from datetime import datetime, timedelta
-from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, current_app
+import queue
+import time
+from functools import wraps
+from datetime import datetime
+from flask import Blueprint, Response, render_template, request, redirect, url_for, flash, jsonify, current_app, session
 from flask_login import login_user, logout_user, login_required, current_user
 from werkzeug.utils import secure_filename
-from sqlalchemy import or_, and_
+from sqlalchemy import or_, and_, func, case
+from sqlalchemy.orm import joinedload, aliased
+from sqlalchemy.orm.exc import StaleDataError
+from sqlalchemy.exc import IntegrityError
 from models import db
-from models import User, Product, Category, ProductImage, ChatRoom, ChatMessage, Transaction, TransactionOffer, Review
+from models import User, Product, Category, ProductImage, ChatRoom, ChatMessage, ChatReadState, Transaction, TransactionOffer, Review
+from models import mark_room_read, unread_messages, involved_transactions, InvalidTransition, reserve_products, ProductsUnavailable
+from models import get_admin_stats
 from forms import LoginForm, RegisterForm, ProductForm, ChatMessageForm, OfferForm, TrackingForm
 from utils import save_uploaded_file, calculate_point_balance, get_transaction_status_text, get_condition_text
+from search import apply_search, update_search_index
+from pagination import keyset_paginate, offset_paginate
+from events import get_event_broker, publish_user_event, user_channel, format_sse
+from idempotency import idempotent, new_idempotency_key
+from exports import export_response
+from storage import get_storage
+from images import RENDITIONS, rendition_key, rendition_exists, upload_key, schedule_image_processing
+from tracking import get_stored_trackings, get_breaker_states, store_tracking_events, parse_webhook_payload
+from tracking import verify_webhook_signature, detect_courier, COURIER_NAMES, TrackingError, is_delivered, normalize_tracking_number
+from sweeper import decide_auto_action, apply_auto_actions, hours_since_shipped, needs_tracking
 
 # Main blueprint
 main = Blueprint('main', __name__)
@@ -23,9 +41,9 @@ def index():
 @login_required
 def profile():
     user_products = current_user.products.filter_by(is_available=True).all()
-    user_transactions = Transaction.query.filter(
-        or_(Transaction.seller_id == current_user.id, Transaction.buyer_id == current_user.id)
-    ).order_by(Transaction.created_at.desc()).limit(10).all()
+    user_transaction = involved_transactions(current_user.id)
+    user_transactions = db.session.query(user_transaction).options(joinedload(user_transaction.product)) \
+        .order_by(user_transaction.created_at.desc(), user_transaction.id.desc()).limit(10).all()
     return render_template('profile.html', products=user_products, transactions=user_transactions)
 
 # Authentication blueprint
@@ -102,6 +120,26 @@ def logout():
     return redirect(url_for('main.index'))
 
 # API Routes for AJAX calls
+@main.route('/media/<subfolder>/<size>/<filename>')
+def media(subfolder, size, filename):
+    """Rendition WebP sebuah upload; selama rendition belum ada kirim original dan jadwalkan pemrosesan"""
+    if size not in RENDITIONS or secure_filename(subfolder) != subfolder or secure_filename(filename) != filename:
+        return jsonify({'success': False, 'error': 'Gambar tidak ditemukan'}), 404
+    storage = get_storage()
+    key = rendition_key(subfolder, size, filename)
+    if rendition_exists(key):
+        # Nama file upload = hash isinya, jadi rendition tidak pernah berubah
+        response = storage.send(key, max_age=31536000)
+        if response.status_code == 200:
+            # Redirect ke URL pre-signed punya masa berlaku, jadi tidak immutable
+            response.cache_control.immutable = True
+        return response
+    key = upload_key(subfolder, filename)
+    if not storage.exists(key):
+        return jsonify({'success': False, 'error': 'Gambar tidak ditemukan'}), 404
+    schedule_image_processing(filename, subfolder)
+    return storage.send(key, max_age=60)
+
 @main.route('/api/categories')
 def api_categories():
     """API endpoint untuk mendapatkan daftar kategori"""
@@ -127,7 +165,7 @@ products = Blueprint('products', __name__)
 
 @products.route('/')
 def list_products():
-    page = request.args.get('page', 1, type=int)
+    cursor = request.args.get('cursor')
     category_id = request.args.get('category', type=int)
     search = request.args.get('search', '')
     condition = request.args.get('condition', '')
@@ -137,18 +175,25 @@ def list_products():
     if category_id:
         query = query.filter_by(category_id=category_id)
 
-    if search:
-        query = query.filter(
-            or_(Product.title.ilike(f'%{search}%'), 
-                Product.description.ilike(f'%{search}%'))
-        )
-
     if condition:
         query = query.filter_by(condition=condition)
 
-    products_pagination = query.order_by(Product.created_at.desc()).paginate(
-        page=page, per_page=12, error_out=False
-    )
+    ranked = False
+    if search:
+        # Pakai index full-text; fallback ke ILIKE untuk database tanpa dukungan FTS
+        query, ranked = apply_search(query, search)
+        if not ranked:
+            query = query.filter(
+                or_(Product.title.ilike(f'%{search}%'),
+                    Product.description.ilike(f'%{search}%'),
+                    Product.desired_items.ilike(f'%{search}%'))
+            )
+
+    if ranked:
+        # Urutan relevansi tidak bisa di-keyset pada (created_at, id)
+        products_pagination = offset_paginate(query, cursor, per_page=12)
+    else:
+        products_pagination = keyset_paginate(query, Product.created_at, Product.id, cursor, per_page=12)
 
     categories = Category.query.all()
     conditions = ['New', 'Like New', 'Good', 'Fair', 'Poor']
@@ -214,6 +259,7 @@ def add():
                         )
                         db.session.add(image)
 
+        update_search_index(product)
         db.session.commit()
         flash('Produk berhasil ditambahkan!', 'success')
         return redirect(url_for('products.detail', id=product.id))
@@ -248,6 +294,7 @@ def edit(id):
                         )
                         db.session.add(image)
 
+        update_search_index(product)
         db.session.commit()
         flash('Produk berhasil diperbarui!', 'success')
         return redirect(url_for('products.detail', id=id))
@@ -257,14 +304,122 @@ def edit(id):
 # Chat blueprint
 chat = Blueprint('chat', __name__)
 
+def get_inbox_rows(user_id):
+    """Ambil ringkasan semua chat room user dalam satu query (pesan terakhir + jumlah belum dibaca)"""
+    user1 = aliased(User)
+    user2 = aliased(User)
+
+    # Window function per room: urutan pesan terbaru
+    room_messages = db.session.query(
+        ChatMessage.room_id.label('room_id'),
+        ChatMessage.message.label('message'),
+        ChatMessage.created_at.label('created_at'),
+        func.row_number().over(
+            partition_by=ChatMessage.room_id,
+            order_by=(ChatMessage.created_at.desc(), ChatMessage.id.desc())
+        ).label('position')
+    ).join(ChatRoom, ChatRoom.id == ChatMessage.room_id).filter(
+        or_(ChatRoom.user1_id == user_id, ChatRoom.user2_id == user_id)
+    ).subquery()
+
+    last_message = db.session.query(room_messages).filter(room_messages.c.position == 1).subquery()
+
+    unread_count = db.session.query(func.count(ChatMessage.id)).filter(
+        unread_messages(user_id), ChatMessage.room_id == ChatRoom.id
+    ).correlate(ChatRoom, ChatReadState).scalar_subquery()
+
+    return db.session.query(
+        ChatRoom.id,
+        Product.title.label('product_name'),
+        case((ChatRoom.user1_id == user_id, user2.full_name), else_=user1.full_name).label('other_user'),
+        func.coalesce(unread_count, 0).label('unread_count'),
+        last_message.c.message.label('last_message'),
+        last_message.c.created_at.label('last_message_at')
+    ).join(Product, Product.id == ChatRoom.product_id) \
+     .join(user1, user1.id == ChatRoom.user1_id) \
+     .join(user2, user2.id == ChatRoom.user2_id) \
+     .outerjoin(last_message, last_message.c.room_id == ChatRoom.id) \
+     .outerjoin(ChatReadState, and_(ChatReadState.room_id == ChatRoom.id, ChatReadState.user_id == user_id)) \
+     .filter(or_(ChatRoom.user1_id == user_id, ChatRoom.user2_id == user_id)) \
+     .order_by(ChatRoom.id).all()
+
+def count_unread(user_id):
+    """Total pesan belum dibaca milik user di semua chat room (pesan di atas watermark baca)"""
+    return db.session.query(func.count(ChatMessage.id)).join(ChatReadState, unread_messages(user_id)).scalar()
+
+def notify_new_message(chat_room, message):
+    """Push event pesan baru ke kedua peserta dan update badge unread penerima (panggil setelah commit)"""
+    data = {
+        'room_id': chat_room.id,
+        'product_id': chat_room.product_id,
+        'message_id': message.id,
+        'message_type': message.message_type,
+        'sender_id': message.sender_id
+    }
+    for user_id in (chat_room.user1_id, chat_room.user2_id):
+        publish_user_event(user_id, 'message', data)
+        if user_id != message.sender_id:
+            publish_user_event(user_id, 'unread', {'total_unread': count_unread(user_id)})
+
+def notify_offer_status(chat_room, offer_message, status, transaction_id=None):
+    """Push perubahan status penawaran (accepted/declined) ke kedua peserta"""
+    data = {
+        'room_id': chat_room.id,
+        'message_id': offer_message.id,
+        'status': status,
+        'transaction_id': transaction_id
+    }
+    for user_id in (chat_room.user1_id, chat_room.user2_id):
+        publish_user_event(user_id, 'offer_status', data)
+
+@chat.route('/stream')
+@login_required
+def stream():
+    """Server-Sent Events: pesan baru, jumlah unread dan status penawaran untuk user yang login"""
+    if not current_app.config.get('EVENT_STREAM_ENABLED', False):
+        # Worker sync: stream akan menahan worker; 204 membuat EventSource berhenti reconnect
+        return Response(status=204)
+    user_id = current_user.id
+    total_unread = count_unread(user_id)
+    # Jangan tahan koneksi database selama stream terbuka
+    db.session.remove()
+
+    broker = get_event_broker()
+    channel = user_channel(user_id)
+    heartbeat = current_app.config.get('EVENT_STREAM_HEARTBEAT', 15)
+    # Stream ditutup berkala supaya tidak menahan worker gunicorn selamanya;
+    # EventSource otomatis reconnect setelah jeda `retry`
+    deadline = time.monotonic() + current_app.config.get('EVENT_STREAM_MAX_AGE', 45)
+
+    def generate():
+        subscription = broker.subscribe(channel)
+        try:
+            yield 'retry: 2000\n\n'
+            yield format_sse('unread', {'total_unread': total_unread})
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return
+                try:
+                    event = subscription.get(timeout=min(heartbeat, remaining))
+                except queue.Empty:
+                    yield ': ping\n\n'
+                    continue
+                yield format_sse(event['event'], event['data'])
+        finally:
+            broker.unsubscribe(channel, subscription)
+
+    return Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
 @chat.route('/rooms')
 @login_required
 def get_rooms():
     """API endpoint untuk mendapatkan daftar chat rooms"""
     try:
-        rooms = ChatRoom.query.filter(
-            or_(ChatRoom.user1_id == current_user.id, ChatRoom.user2_id == current_user.id)
-        ).all()
+        rows = get_inbox_rows(current_user.id)
     except Exception as e:
         # If status column doesn't exist, return empty rooms
         print(f"Database error: {e}")
@@ -273,61 +428,77 @@ def get_rooms():
             'total_unread': 0
         })
 
-    rooms_data = []
-    total_unread = 0
+    rooms_data = [{
+        'id': row.id,
+        'product_name': row.product_name,
+        'other_user': row.other_user,
+        'unread_count': int(row.unread_count),
+        'last_message': row.last_message if row.last_message_at else 'Belum ada pesan',
+        'last_message_time': row.last_message_at.strftime('%H:%M') if row.last_message_at else '',
+        'status': 'active'  # Default status since column doesn't exist yet
+    } for row in rows]
 
-    for room in rooms:
-        # Tentukan siapa lawan chat
-        other_user = room.user2.full_name if room.user1_id == current_user.id else room.user1.full_name
-
-        # Hitung pesan yang belum dibaca
-        unread_count = ChatMessage.query.filter(
-            and_(
-                ChatMessage.room_id == room.id,
-                ChatMessage.sender_id != current_user.id,
-                ChatMessage.is_read == False
-            )
-        ).count()
+    return jsonify({
+        'rooms': rooms_data,
+        'total_unread': sum(room['unread_count'] for room in rooms_data)
+    })
 
-        total_unread += unread_count
+def serialize_message(msg):
+    return {
+        'id': msg.id,
+        'sender_id': msg.sender_id,
+        'sender_name': msg.sender.full_name,
+        'message': msg.message,
+        'message_type': msg.message_type,
+        'created_at': msg.created_at.isoformat()
+    }
 
-        # Pesan terakhir
-        last_message = ChatMessage.query.filter_by(room_id=room.id).order_by(ChatMessage.created_at.desc()).first()
+def get_message_window(chat_room, after_id=None, before_id=None, limit=50):
+    """Ambil potongan pesan room secara urut naik; kembalikan (messages, ada_pesan_lebih_lama)"""
+    query = ChatMessage.query.options(joinedload(ChatMessage.sender)).filter(
+        ChatMessage.room_id == chat_room.id
+    )
 
-        rooms_data.append({
-            'id': room.id,
-            'product_name': room.product.title,
-            'other_user': other_user,
-            'unread_count': unread_count,
-            'last_message': last_message.message if last_message else 'Belum ada pesan',
-            'last_message_time': last_message.created_at.strftime('%H:%M') if last_message else '',
-            'status': 'active'  # Default status since column doesn't exist yet
-        })
+    if after_id is not None:
+        # Delta: pesan baru setelah pesan terakhir yang sudah dimiliki client
+        messages = query.filter(ChatMessage.id > after_id).order_by(ChatMessage.id.asc()).limit(limit).all()
+        return messages, None
 
-    return jsonify({
-        'rooms': rooms_data,
-        'total_unread': total_unread
-    })
+    if before_id is not None:
+        query = query.filter(ChatMessage.id < before_id)
+    messages = query.order_by(ChatMessage.id.desc()).limit(limit + 1).all()
+    has_more = len(messages) > limit
+    return list(reversed(messages[:limit])), has_more
 
 @chat.route('/room/<int:product_id>', methods=['GET', 'POST'])
 @login_required
 def room(product_id):
     product = Product.query.get_or_404(product_id)
+    room_id = request.args.get('room', type=int)
 
     # If user is the product owner, show them existing chat rooms for this product
     if product.user_id == current_user.id:
-        # Find all chat rooms for this product
-        existing_rooms = ChatRoom.query.filter_by(product_id=product_id).all()
-
-        if not existing_rooms:
-            flash('Belum ada pembeli yang chat untuk produk ini.', 'info')
-            return redirect(url_for('products.detail', id=product_id))
-        elif len(existing_rooms) == 1:
-            # Redirect to the single existing chat room
-            chat_room = existing_rooms[0]
+        if room_id:
+            chat_room = ChatRoom.query.filter_by(id=room_id, product_id=product_id).first_or_404()
         else:
-            # If multiple rooms exist, show the most recent one or let user choose
-            chat_room = ChatRoom.query.filter_by(product_id=product_id).order_by(ChatRoom.created_at.desc()).first()
+            # Inbox penjual: semua room untuk produk ini, terbaru lebih dulu
+            rooms_query = ChatRoom.query.options(
+                joinedload(ChatRoom.user1), joinedload(ChatRoom.user2)
+            ).filter(ChatRoom.product_id == product_id)
+            cursor = request.args.get('cursor')
+            rooms_pagination = keyset_paginate(rooms_query, ChatRoom.created_at, ChatRoom.id, cursor, per_page=20)
+
+            if not rooms_pagination.items and not cursor:
+                flash('Belum ada pembeli yang chat untuk produk ini.', 'info')
+                return redirect(url_for('products.detail', id=product_id))
+            elif len(rooms_pagination.items) == 1 and not cursor and not rooms_pagination.has_next:
+                # Redirect to the single existing chat room
+                chat_room = rooms_pagination.items[0]
+            else:
+                return render_template('chat/inbox.html',
+                                     product=product,
+                                     rooms=rooms_pagination.items,
+                                     pagination=rooms_pagination)
     else:
         # Find or create chat room for buyer
         chat_room = ChatRoom.query.filter(
@@ -347,7 +518,6 @@ def room(product_id):
             db.session.add(chat_room)
             db.session.commit()
 
-    messages = chat_room.messages.order_by(ChatMessage.created_at.asc()).all()
     form = ChatMessageForm()
 
     if form.validate_on_submit():
@@ -358,15 +528,44 @@ def room(product_id):
         )
         db.session.add(message)
         db.session.commit()
+        notify_new_message(chat_room, message)
         flash('Pesan terkirim!', 'success')
+        if product.user_id == current_user.id:
+            return redirect(url_for('chat.room', product_id=product_id, room=chat_room.id))
         return redirect(url_for('chat.room', product_id=product_id))
 
+    # Hanya jendela pesan terbaru; riwayat lama dimuat saat scroll lewat get_messages
+    messages, has_older = get_message_window(chat_room, limit=current_app.config.get('CHAT_PAGE_SIZE', 50))
+
+    if current_user.id in (chat_room.user1_id, chat_room.user2_id):
+        mark_room_read(chat_room.id, current_user.id)
+        db.session.commit()
+        publish_user_event(current_user.id, 'unread', {'total_unread': count_unread(current_user.id)})
+
     return render_template('chat/room.html', 
                          chat_room=chat_room, 
                          messages=messages, 
+                         has_older=has_older,
                          form=form, 
                          product=product)
 
+@chat.route('/room/<int:room_id>/read', methods=['POST'])
+@login_required
+def mark_read(room_id):
+    """Tandai semua pesan di room sudah dibaca oleh user yang login"""
+    chat_room = ChatRoom.query.get_or_404(room_id)
+
+    if (chat_room.user1_id != current_user.id and 
+        chat_room.user2_id != current_user.id):
+        return jsonify({'success': False, 'error': 'Akses ditolak'}), 403
+
+    mark_room_read(chat_room.id, current_user.id)
+    db.session.commit()
+
+    total_unread = count_unread(current_user.id)
+    publish_user_event(current_user.id, 'unread', {'total_unread': total_unread})
+    return jsonify({'success': True, 'total_unread': total_unread})
+
 @chat.route('/room/<int:room_id>/send_negotiation', methods=['POST'])
 @login_required 
 def send_negotiation(room_id):
@@ -393,11 +592,13 @@ def send_negotiation(room_id):
 
     db.session.add(message)
     db.session.commit()
+    notify_new_message(chat_room, message)
 
     return jsonify({'success': True})
 
 @chat.route('/offer/<int:message_id>/accept', methods=['POST'])
 @login_required
+@idempotent
 def accept_offer(message_id):
     """Terima penawaran dan buat transaksi"""
     message = ChatMessage.query.get_or_404(message_id)
@@ -409,6 +610,11 @@ def accept_offer(message_id):
         message.sender_id == current_user.id):
         return jsonify({'success': False, 'error': 'Anda tidak dapat menerima penawaran sendiri'}), 403
 
+    # Satu penawaran hanya menghasilkan satu transaksi (dijamin unique offer_message_id)
+    existing = Transaction.query.filter_by(offer_message_id=message_id).first()
+    if existing:
+        return jsonify({'success': True, 'transaction_id': existing.id})
+
     # Buat transaksi baru
     # Tentukan siapa penjual dan pembeli berdasarkan produk
     product = chat_room.product
@@ -419,11 +625,19 @@ def accept_offer(message_id):
         seller_id=seller_id,
         buyer_id=buyer_id,
         product_id=chat_room.product_id,
+        offer_message_id=message_id,
         status='agreed',
         notes=f'Penawaran diterima dari chat message #{message_id}'
     )
 
     db.session.add(transaction)
+    try:
+        db.session.flush()
+    except IntegrityError:
+        # Request paralel untuk penawaran yang sama menang lebih dulu
+        db.session.rollback()
+        existing = Transaction.query.filter_by(offer_message_id=message_id).first_or_404()
+        return jsonify({'success': True, 'transaction_id': existing.id})
 
     # Tambahkan pesan sistem
     system_message = ChatMessage(
@@ -435,6 +649,8 @@ def accept_offer(message_id):
     db.session.add(system_message)
 
     db.session.commit()
+    notify_new_message(chat_room, system_message)
+    notify_offer_status(chat_room, message, 'accepted', transaction.id)
 
     return jsonify({'success': True, 'transaction_id': transaction.id})
 
@@ -467,26 +683,32 @@ def decline_offer(message_id):
     )
     db.session.add(system_message)
     db.session.commit()
+    notify_new_message(chat_room, system_message)
+    notify_offer_status(chat_room, message, 'declined')
 
     return jsonify({'success': True})
 
 @chat.route('/room/<int:product_id>/messages')
 @login_required
 def get_messages(product_id):
-    """API endpoint to get messages for a chat room"""
+    """API endpoint to get messages for a chat room (incremental via after_id / before_id)"""
     product = Product.query.get_or_404(product_id)
+    room_id = request.args.get('room_id', type=int)
 
-    # Find chat room
-    chat_room = ChatRoom.query.filter(
-        or_(
-            and_(ChatRoom.user1_id == current_user.id, ChatRoom.user2_id == product.user_id),
-            and_(ChatRoom.user1_id == product.user_id, ChatRoom.user2_id == current_user.id)
-        ),
-        ChatRoom.product_id == product_id
-    ).first()
+    if room_id:
+        chat_room = ChatRoom.query.filter_by(id=room_id, product_id=product_id).first()
+    else:
+        # Find chat room
+        chat_room = ChatRoom.query.filter(
+            or_(
+                and_(ChatRoom.user1_id == current_user.id, ChatRoom.user2_id == product.user_id),
+                and_(ChatRoom.user1_id == product.user_id, ChatRoom.user2_id == current_user.id)
+            ),
+            ChatRoom.product_id == product_id
+        ).first()
 
     if not chat_room:
-        return jsonify({'messages': []})
+        return jsonify({'messages': [], 'has_more': False})
 
     # Check access
     if (chat_room.user1_id != current_user.id and 
@@ -494,17 +716,18 @@ def get_messages(product_id):
         product.user_id != current_user.id):
         return jsonify({'error': 'Access denied'}), 403
 
-    messages = chat_room.messages.order_by(ChatMessage.created_at.asc()).all()
+    limit = min(max(request.args.get('limit', 50, type=int), 1), 100)
+    messages, has_more = get_message_window(
+        chat_room,
+        after_id=request.args.get('after_id', type=int),
+        before_id=request.args.get('before_id', type=int),
+        limit=limit
+    )
 
-    return jsonify({
-        'messages': [{
-            'id': msg.id,
-            'sender_name': msg.sender.full_name,
-            'message': msg.message,
-            'message_type': msg.message_type,
-            'created_at': msg.created_at.isoformat()
-        } for msg in messages]
-    })
+    response = {'messages': [serialize_message(msg) for msg in messages]}
+    if has_more is not None:
+        response['has_more'] = has_more
+    return jsonify(response)
 
 @products.route('/user/available')
 @login_required
@@ -582,6 +805,7 @@ def quick_add():
                     )
                     db.session.add(image)
 
+        update_search_index(product)
         db.session.commit()
 
         return jsonify({
@@ -600,16 +824,33 @@ def quick_add():
 # Transactions blueprint
 transactions = Blueprint('transactions', __name__)
 
+def retry_on_conflict(view, attempts=3):
+    """Ulangi view transaksi jika UPDATE kalah balapan versi (optimistic locking).
+
+    Setiap percobaan membaca ulang baris terbaru, jadi retry murah dan tanpa lock;
+    flash dari percobaan yang gagal dibuang supaya tidak dobel.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        for attempt in range(attempts):
+            flashes = list(session.get('_flashes', []))
+            try:
+                return view(*args, **kwargs)
+            except StaleDataError:
+                db.session.rollback()
+                session['_flashes'] = flashes
+        flash('Transaksi sedang diperbarui oleh pihak lain. Silakan coba lagi.', 'error')
+        return redirect(url_for('transactions.detail', id=kwargs.get('id')))
+    return wrapper
+
 @transactions.route('/')
 @login_required
 def list_transactions():
-    page = request.args.get('page', 1, type=int)
+    cursor = request.args.get('cursor')
 
-    user_transactions = Transaction.query.filter(
-        or_(Transaction.seller_id == current_user.id, Transaction.buyer_id == current_user.id)
-    ).order_by(Transaction.created_at.desc()).paginate(
-        page=page, per_page=10, error_out=False
-    )
+    user_transaction = involved_transactions(current_user.id)
+    query = db.session.query(user_transaction).options(joinedload(user_transaction.product))
+    user_transactions = keyset_paginate(query, user_transaction.created_at, user_transaction.id, cursor, per_page=10)
 
     return render_template('transactions/list.html', 
                          transactions=user_transactions.items,
@@ -617,6 +858,7 @@ def list_transactions():
 
 @transactions.route('/<int:id>', methods=['GET', 'POST'])
 @login_required
+@retry_on_conflict
 def detail(id):
     transaction = Transaction.query.get_or_404(id)
 
@@ -629,7 +871,7 @@ def detail(id):
     tracking_form = TrackingForm()
 
     if request.method == 'POST' and tracking_form.validate_on_submit():
-        tracking_number = tracking_form.tracking_number.data
+        tracking_number = normalize_tracking_number(tracking_form.tracking_number.data)
 
         if current_user.id == transaction.seller_id:
             transaction.seller_tracking_number = tracking_number
@@ -644,7 +886,7 @@ def detail(id):
         if (transaction.seller_tracking_number and 
             transaction.buyer_tracking_number and 
             transaction.status == 'agreed'):
-            transaction.status = 'shipped'
+            transaction.transition_to('shipped')
             flash('Status transaksi diperbarui menjadi "Dalam Pengiriman"!', 'info')
 
         # Generate confirmation codes when status changes to agreed
@@ -652,8 +894,9 @@ def detail(id):
             transaction.generate_confirmation_codes()
 
         # Mark as completed if both parties confirmed
-        if transaction.seller_received_at and transaction.buyer_received_at:
-            transaction.status = 'completed'
+        if (transaction.seller_received_at and transaction.buyer_received_at and
+                transaction.status != 'completed' and transaction.can_transition_to('completed')):
+            transaction.transition_to('completed')
             flash('🎉 Transaksi barter berhasil diselesaikan! Kedua belah pihak telah mengkonfirmasi penerimaan barang.', 'success')
 
         db.session.commit()
@@ -691,192 +934,35 @@ def tracking(id):
         flash('Anda tidak memiliki akses untuk tracking transaksi ini.', 'error')
         return redirect(url_for('transactions.list_transactions'))
 
-    # Simulasi data tracking (dalam implementasi nyata, ini akan mengintegrasikan dengan API ekspedisi)
+    # Dibaca dari event/cache tersimpan; data kadaluarsa di-refresh di background
+    results = get_stored_trackings([transaction.seller_tracking_number, transaction.buyer_tracking_number])
     tracking_data = {
-        'seller_tracking': get_tracking_info(transaction.seller_tracking_number) if transaction.seller_tracking_number else None,
-        'buyer_tracking': get_tracking_info(transaction.buyer_tracking_number) if transaction.buyer_tracking_number else None
+        'seller_tracking': results.get(transaction.seller_tracking_number),
+        'buyer_tracking': results.get(transaction.buyer_tracking_number)
     }
 
     return render_template('transactions/tracking.html', 
                          transaction=transaction, 
                          tracking_data=tracking_data)
 
-def get_tracking_info(tracking_number):
-    """Mendapatkan informasi tracking dari API ekspedisi nyata"""
-    import requests
-    import json
-
-    if not tracking_number:
-        return None
-
-    try:
-        # Deteksi kurir berdasarkan format nomor resi
-        courier = detect_courier(tracking_number)
-
-        if courier == 'JNE':
-            return get_jne_tracking(tracking_number)
-        elif courier == 'JT':
-            return get_jt_tracking(tracking_number)
-        elif courier == 'SICEPAT':
-            return get_sicepat_tracking(tracking_number)
-        elif courier == 'POS':
-            return get_pos_tracking(tracking_number)
-        else:
-            # Fallback ke simulasi jika kurir tidak dikenali
-            return get_simulated_tracking(tracking_number)
-
-    except Exception as e:
-        print(f"Error getting tracking info: {e}")
-        # Fallback ke simulasi jika API error
-        return get_simulated_tracking(tracking_number)
-
-def detect_courier(tracking_number):
-    """Deteksi kurir berdasarkan format nomor resi"""
-    tracking_number = tracking_number.upper().replace(' ', '')
+@transactions.route('/tracking/webhook/<courier>', methods=['POST'])
+def courier_webhook(courier):
+    """Terima push update tracking dari kurir (ditandatangani HMAC, tanpa login/CSRF)"""
+    courier = courier.upper()
+    if courier not in COURIER_NAMES:
+        return jsonify({'success': False, 'error': 'Kurir tidak dikenal'}), 404
+    if not verify_webhook_signature(request.get_data(), request.headers.get('X-Courier-Signature')):
+        return jsonify({'success': False, 'error': 'Signature tidak valid'}), 401
 
-    # Format resi JNE: alphanumeric 10-15 karakter
-    if len(tracking_number) >= 10 and len(tracking_number) <= 15:
-        if tracking_number.startswith('JNE') or tracking_number.startswith('CGK'):
-            return 'JNE'
-
-    # Format resi J&T: JP + 10 digit angka
-    if tracking_number.startswith('JP') and len(tracking_number) == 12:
-        return 'JT'
-
-    # Format resi SiCepat: 000 + 9-12 digit
-    if tracking_number.startswith('000') and len(tracking_number) >= 12:
-        return 'SICEPAT'
-
-    # Format resi Pos Indonesia: PC/EX/CA/CC + angka
-    if any(tracking_number.startswith(prefix) for prefix in ['PC', 'EX', 'CA', 'CC']):
-        return 'POS'
-
-    return 'UNKNOWN'
-
-def get_jne_tracking(tracking_number):
-    """Tracking JNE menggunakan API resmi (perlu API key)"""
-    # API JNE memerlukan registrasi dan API key
-    # Untuk development, gunakan simulasi
-    return get_simulated_tracking(tracking_number, 'JNE')
-
-def get_jt_tracking(tracking_number):
-    """Tracking J&T menggunakan API resmi"""
     try:
-        # API J&T Express - gratis tanpa API key
-        url = f"https://www.jet.co.id/api/track/{tracking_number}"
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        }
+        tracking_number, events = parse_webhook_payload(request.get_json(silent=True))
+    except TrackingError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    if detect_courier(tracking_number) != courier:
+        return jsonify({'success': False, 'error': 'Nomor resi tidak cocok dengan kurir'}), 400
 
-        response = requests.get(url, headers=headers, timeout=10)
-        if response.status_code == 200:
-            data = response.json()
-
-            if data.get('success') and data.get('data'):
-                tracking_data = data['data']
-
-                timeline = []
-                for item in tracking_data.get('details', []):
-                    timeline.append({
-                        'status': item.get('desc', ''),
-                        'time': item.get('date', ''),
-                        'location': item.get('city', ''),
-                        'is_current': False
-                    })
-
-                if timeline:
-                    timeline[-1]['is_current'] = True
-
-                return {
-                    'tracking_number': tracking_number,
-                    'courier': 'J&T Express',
-                    'status': tracking_data.get('last_status', 'Dalam pengiriman'),
-                    'timeline': timeline,
-                    'delivered': any('terima' in item.get('desc', '').lower() for item in tracking_data.get('details', []))
-                }
-    except Exception as e:
-        print(f"Error J&T tracking: {e}")
-
-    return get_simulated_tracking(tracking_number, 'J&T Express')
-
-def get_sicepat_tracking(tracking_number):
-    """Tracking SiCepat menggunakan API resmi"""
-    try:
-        # API SiCepat - gratis
-        url = "https://api.sicepat.com/customer/waybill"
-        payload = {'waybill': tracking_number}
-
-        response = requests.post(url, json=payload, timeout=10)
-        if response.status_code == 200:
-            data = response.json()
-
-            if data.get('sicepat') and data['sicepat'].get('result'):
-                result = data['sicepat']['result']
-
-                timeline = []
-                for item in result.get('track_history', []):
-                    timeline.append({
-                        'status': item.get('receiver_name', item.get('status', '')),
-                        'time': item.get('date_time', ''),
-                        'location': item.get('city', ''),
-                        'is_current': False
-                    })
-
-                if timeline:
-                    timeline[-1]['is_current'] = True
-
-                return {
-                    'tracking_number': tracking_number,
-                    'courier': 'SiCepat',
-                    'status': result.get('last_status', 'Dalam pengiriman'),
-                    'timeline': timeline,
-                    'delivered': result.get('status') == 'DELIVERED'
-                }
-    except Exception as e:
-        print(f"Error SiCepat tracking: {e}")
-
-    return get_simulated_tracking(tracking_number, 'SiCepat')
-
-def get_pos_tracking(tracking_number):
-    """Tracking Pos Indonesia"""
-    # API Pos Indonesia memerlukan kerjasama khusus
-    return get_simulated_tracking(tracking_number, 'Pos Indonesia')
-
-def get_simulated_tracking(tracking_number, courier='Unknown'):
-    """Simulasi tracking untuk fallback"""
-    import random
-
-    statuses = [
-        'Paket diterima oleh kurir',
-        'Paket dalam perjalanan ke hub',
-        'Paket tiba di hub asal', 
-        'Paket dalam perjalanan ke kota tujuan',
-        'Paket tiba di hub tujuan',
-        'Paket dalam perjalanan untuk pengiriman',
-        'Paket sudah dikirim ke alamat tujuan',
-        'Paket berhasil diterima'
-    ]
-
-    timeline = []
-    num_statuses = random.randint(3, len(statuses))
-    for i, status in enumerate(statuses[:num_statuses]):
-        timeline.append({
-            'status': status,
-            'time': (datetime.now() - timedelta(days=num_statuses-i, hours=random.randint(0, 23))).strftime('%d/%m/%Y %H:%M'),
-            'location': f'Hub {["Jakarta", "Bandung", "Surabaya", "Medan", "Yogyakarta"][random.randint(0, 4)]}',
-            'is_current': i == num_statuses-1
-        })
-
-    # Check if delivered (last status contains "terima")
-    is_delivered = 'terima' in timeline[-1]['status'].lower() if timeline else False
-
-    return {
-        'tracking_number': tracking_number,
-        'courier': courier,
-        'status': timeline[-1]['status'] if timeline else 'Belum ada update',
-        'timeline': timeline,
-        'delivered': is_delivered
-    }
+    accepted = store_tracking_events(courier, tracking_number, events, source='webhook')
+    return jsonify({'success': True, 'tracking_number': tracking_number, 'accepted': accepted})
 
 @transactions.route('/<int:id>/auto_confirm')
 @login_required  
@@ -887,72 +973,44 @@ def auto_confirm_check(id):
     if transaction.status != 'shipped':
         return jsonify({'auto_confirmed': False, 'message': 'Transaksi belum dalam status pengiriman'})
 
-    # Cek status pengiriman real-time
-    seller_tracking = get_tracking_info(transaction.seller_tracking_number) if transaction.seller_tracking_number else None
-    buyer_tracking = get_tracking_info(transaction.buyer_tracking_number) if transaction.buyer_tracking_number else None
-
     # Cek apakah kedua paket sudah terkirim
     if not (transaction.seller_shipped_at and transaction.buyer_shipped_at):
         return jsonify({'auto_confirmed': False, 'message': 'Belum semua paket dikirim'})
 
-    # Hitung waktu sejak pengiriman terakhir
-    last_shipped = max(transaction.seller_shipped_at, transaction.buyer_shipped_at)
-    hours_since_shipped = (datetime.utcnow() - last_shipped).total_seconds() / 3600
-
-    # Auto-konfirmasi jika paket sudah delivered menurut tracking
-    seller_delivered = seller_tracking and seller_tracking.get('delivered', False)
-    buyer_delivered = buyer_tracking and buyer_tracking.get('delivered', False)
-
-    if seller_delivered and buyer_delivered:
-        # Kedua paket sudah sampai, auto konfirmasi setelah 6 jam
-        if hours_since_shipped >= 6:
-            if not transaction.seller_received_at:
-                transaction.seller_received_at = datetime.utcnow()
-            if not transaction.buyer_received_at:
-                transaction.buyer_received_at = datetime.utcnow()
-
-            transaction.status = 'completed'
-            db.session.commit()
-
-            return jsonify({
-                'auto_confirmed': True,
-                'message': 'Transaksi otomatis selesai karena kedua paket sudah terkirim dan tidak ada konfirmasi dalam 6 jam'
-            })
-
-    # Auto-cancel jika sudah lebih dari 7 hari dan belum ada konfirmasi
-    elif hours_since_shipped >= (7 * 24):  # 7 hari
-        # Cek jika tidak ada konfirmasi sama sekali
-        if not transaction.seller_received_at and not transaction.buyer_received_at:
-            transaction.status = 'cancelled'
-            transaction.notes = f"{transaction.notes}\n\nTransaksi dibatalkan otomatis karena tidak ada konfirmasi penerimaan dalam 7 hari."
-            db.session.commit()
-
-            return jsonify({
-                'auto_cancelled': True,
-                'message': 'Transaksi dibatalkan otomatis karena tidak ada konfirmasi penerimaan dalam 7 hari'
-            })
-
-    # Auto-konfirmasi normal setelah 24 jam jika belum dikonfirmasi manual
-    elif hours_since_shipped >= 24:
-        if not transaction.seller_received_at:
-            transaction.seller_received_at = datetime.utcnow()
-        if not transaction.buyer_received_at:
-            transaction.buyer_received_at = datetime.utcnow()
-
-        transaction.status = 'completed'
-        db.session.commit()
+    # Tracking (dari database) hanya dibaca jika bisa mengubah hasil
+    hours_since = hours_since_shipped(transaction)
+    results = {}
+    if needs_tracking(hours_since):
+        results = get_stored_trackings([transaction.seller_tracking_number, transaction.buyer_tracking_number])
+    seller_tracking = results.get(transaction.seller_tracking_number)
+    buyer_tracking = results.get(transaction.buyer_tracking_number)
+
+    # Aturan yang sama dengan sweeper background
+    seller_delivered = is_delivered(seller_tracking)
+    buyer_delivered = is_delivered(buyer_tracking)
+    action = decide_auto_action(transaction, seller_tracking, buyer_tracking)
+
+    if action == 'completed':
+        apply_auto_actions([transaction.id], [])
+        if seller_delivered and buyer_delivered:
+            message = 'Transaksi otomatis selesai karena kedua paket sudah terkirim dan tidak ada konfirmasi dalam 6 jam'
+        else:
+            message = 'Transaksi otomatis selesai karena tidak ada konfirmasi dalam 24 jam'
+        return jsonify({'auto_confirmed': True, 'message': message})
 
+    if action == 'cancelled':
+        apply_auto_actions([], [transaction.id])
         return jsonify({
-            'auto_confirmed': True,
-            'message': 'Transaksi otomatis selesai karena tidak ada konfirmasi dalam 24 jam'
+            'auto_cancelled': True,
+            'message': 'Transaksi dibatalkan otomatis karena tidak ada konfirmasi penerimaan dalam 7 hari'
         })
 
     return jsonify({
         'auto_confirmed': False, 
-        'message': f'Menunggu konfirmasi. {24 - int(hours_since_shipped)} jam tersisa untuk auto-konfirmasi',
+        'message': f'Menunggu konfirmasi. {24 - int(hours_since)} jam tersisa untuk auto-konfirmasi',
         'seller_delivered': seller_delivered,
         'buyer_delivered': buyer_delivered,
-        'hours_remaining': int(24 - hours_since_shipped)
+        'hours_remaining': int(24 - hours_since)
     })
 
 @transactions.route('/<int:id>/review', methods=['GET', 'POST'])
@@ -1025,6 +1083,7 @@ def add_review(id):
 
 @transactions.route('/<int:id>/dispute', methods=['GET', 'POST'])
 @login_required
+@retry_on_conflict
 def dispute(id):
     """Buat atau lihat sengketa transaksi"""
     transaction = Transaction.query.get_or_404(id)
@@ -1039,7 +1098,11 @@ def dispute(id):
         description = request.form.get('description')
 
         # Update status transaksi menjadi dispute
-        transaction.status = 'dispute'
+        try:
+            transaction.transition_to('dispute')
+        except InvalidTransition:
+            flash('Sengketa tidak dapat diajukan untuk transaksi dengan status ini.', 'error')
+            return redirect(url_for('transactions.detail', id=id))
         transaction.notes = f"Sengketa: {reason}\nDeskripsi: {description}\nDilaporkan oleh: {current_user.full_name}"
         db.session.commit()
 
@@ -1050,6 +1113,7 @@ def dispute(id):
 
 @transactions.route('/<int:id>/confirm_received', methods=['POST'])
 @login_required
+@retry_on_conflict
 def confirm_received(id):
     transaction = Transaction.query.get_or_404(id)
     
@@ -1059,6 +1123,10 @@ def confirm_received(id):
         flash('Anda tidak memiliki akses untuk mengkonfirmasi transaksi ini.', 'error')
         return redirect(url_for('transactions.detail', id=id))
 
+    if not transaction.can_transition_to('completed'):
+        flash('Transaksi ini sudah tidak dapat dikonfirmasi.', 'error')
+        return redirect(url_for('transactions.detail', id=id))
+
     # Get confirmation code from form
     confirmation_code = request.form.get('confirmation_code', '').strip().upper()
     
@@ -1099,8 +1167,9 @@ def confirm_received(id):
             flash('Anda sudah mengkonfirmasi penerimaan barang sebelumnya.', 'info')
 
     # Check if transaction is completed
-    if transaction.seller_received_at and transaction.buyer_received_at:
-        transaction.status = 'completed'
+    system_message = None
+    if transaction.seller_received_at and transaction.buyer_received_at and transaction.status != 'completed':
+        transaction.transition_to('completed')
         flash('🎉 Transaksi barter berhasil diselesaikan! Kedua belah pihak telah mengkonfirmasi penerimaan barang.', 'success')
 
         # Add system message to chat room
@@ -1124,10 +1193,13 @@ def confirm_received(id):
             db.session.add(system_message)
 
     db.session.commit()
+    if system_message:
+        notify_new_message(chat_room, system_message)
     return redirect(url_for('transactions.detail', id=id))
 
 @transactions.route('/create/<int:product_id>', methods=['GET', 'POST'])
 @login_required
+@idempotent
 def create_offer(product_id):
     product = Product.query.get_or_404(product_id)
 
@@ -1135,42 +1207,42 @@ def create_offer(product_id):
         flash('Anda tidak dapat menawar produk sendiri.', 'error')
         return redirect(url_for('products.detail', id=product_id))
 
-    # Get user's products for offering
-    user_products = current_user.products.filter_by(is_available=True).all()
+    # Get user's products for offering (yang belum ditawarkan di transaksi lain)
+    user_products = current_user.products.filter_by(is_available=True, is_reserved=False).all()
 
     if request.method == 'POST':
-        offered_product_ids = request.form.getlist('offered_products')
+        offered_product_ids = {int(value) for value in request.form.getlist('offered_products') if value.isdigit()}
 
         if not offered_product_ids:
             flash('Pilih minimal satu produk untuk ditawarkan.', 'error')
             return redirect(url_for('transactions.create_offer', product_id=product_id))
 
+        # Satu query IN yang sekaligus mengunci dan me-reserve produk yang ditawarkan
+        try:
+            offered_products = reserve_products(offered_product_ids, current_user.id)
+        except ProductsUnavailable:
+            db.session.rollback()
+            flash('Sebagian produk yang dipilih sudah ditawarkan di transaksi lain. Silakan pilih ulang.', 'error')
+            return redirect(url_for('transactions.create_offer', product_id=product_id))
+
         # Create transaction
         transaction = Transaction(
             seller_id=product.user_id,
             buyer_id=current_user.id,
             product_id=product_id,
-            total_seller_points=product.total_points
+            total_seller_points=product.total_points,
+            total_buyer_points=sum(offered.total_points for offered in offered_products)
         )
+        transaction.offers = [
+            TransactionOffer(
+                product_id=offered.id,
+                offered_by_id=current_user.id,
+                points=offered.total_points
+            )
+            for offered in offered_products
+        ]
 
         db.session.add(transaction)
-        db.session.flush()
-
-        # Add offered products
-        total_buyer_points = 0
-        for product_id_str in offered_product_ids:
-            offered_product = Product.query.get(int(product_id_str))
-            if offered_product and offered_product.user_id == current_user.id:
-                offer = TransactionOffer(
-                    transaction_id=transaction.id,
-                    product_id=offered_product.id,
-                    offered_by_id=current_user.id,
-                    points=offered_product.total_points
-                )
-                db.session.add(offer)
-                total_buyer_points += offered_product.total_points
-
-        transaction.total_buyer_points = total_buyer_points
         db.session.commit()
 
         flash('Penawaran berhasil dikirim!', 'success')
@@ -1178,7 +1250,8 @@ def create_offer(product_id):
 
     return render_template('transactions/create_offer.html', 
                          product=product, 
-                         user_products=user_products)
+                         user_products=user_products,
+                         idempotency_key=new_idempotency_key())
 
 # Admin blueprint
 admin = Blueprint('admin', __name__)
@@ -1194,40 +1267,34 @@ def require_admin():
 def dashboard():
     from models import Report
 
-    # User Management Statistics
-    total_users = User.query.count()
-    banned_users = User.query.filter_by(is_banned=True).count()
-    active_sellers = User.query.filter_by(role='penjual', is_active=True, is_banned=False).count()
-    active_buyers = User.query.filter_by(role='pembeli', is_active=True, is_banned=False).count()
+    # Counter user dan laporan: satu query agregat, atau rollup admin_stats jika diaktifkan
+    stats = get_admin_stats(current_app.config.get('ADMIN_STATS_ROLLUP', False))
 
-    # Report Statistics
-    pending_reports = Report.query.filter_by(status='pending').count()
-    total_reports = Report.query.count()
-    recent_violations = User.query.filter(User.violation_count > 0).order_by(User.violation_count.desc()).limit(5).all()
+    # Top pelanggar; user berisiko tinggi adalah bagian dari top 5 yang sama (violation_count >= 3)
+    recent_violations = User.query.filter(User.violation_count > 0) \
+        .order_by(User.violation_count.desc(), User.id.desc()).limit(5).all()
+    high_risk_users = [user for user in recent_violations if user.violation_count >= 3]
 
     # Recent Reports
-    recent_reports = Report.query.order_by(Report.created_at.desc()).limit(5).all()
-
-    # High-risk users (with multiple violations)
-    high_risk_users = User.query.filter(User.violation_count >= 3).order_by(User.violation_count.desc()).limit(5).all()
+    recent_reports = Report.query.options(joinedload(Report.reporter), joinedload(Report.reported_user)) \
+        .order_by(Report.created_at.desc(), Report.id.desc()).limit(5).all()
 
     return render_template('admin/dashboard.html',
-                         total_users=total_users,
-                         banned_users=banned_users,
-                         active_sellers=active_sellers,
-                         active_buyers=active_buyers,
-                         pending_reports=pending_reports,
-                         total_reports=total_reports,
+                         total_users=stats['total_users'],
+                         banned_users=stats['banned_users'],
+                         active_sellers=stats['active_sellers'],
+                         active_buyers=stats['active_buyers'],
+                         pending_reports=stats['pending_reports'],
+                         total_reports=stats['total_reports'],
                          recent_reports=recent_reports,
                          recent_violations=recent_violations,
                          high_risk_users=high_risk_users)
 
 @admin.route('/users')
 def users():
-    page = request.args.get('page', 1, type=int)
-    users_pagination = User.query.order_by(User.created_at.desc()).paginate(
-        page=page, per_page=20, error_out=False
-    )
+    cursor = request.args.get('cursor')
+    users_pagination = keyset_paginate(User.query, User.created_at, User.id, cursor,
+                                       per_page=20, with_total=True)
     return render_template('admin/users.html', 
                          users=users_pagination.items,
                          pagination=users_pagination)
@@ -1272,7 +1339,7 @@ def unban_user(id):
 @admin.route('/reports')
 def reports():
     from models import Report
-    page = request.args.get('page', 1, type=int)
+    cursor = request.args.get('cursor')
     status_filter = request.args.get('status', '')
     type_filter = request.args.get('type', '')
 
@@ -1282,9 +1349,8 @@ def reports():
     if type_filter:
         query = query.filter_by(report_type=type_filter)
 
-    reports_pagination = query.order_by(Report.created_at.desc()).paginate(
-        page=page, per_page=20, error_out=False
-    )
+    reports_pagination = keyset_paginate(query, Report.created_at, Report.id, cursor,
+                                         per_page=20, with_total=True)
 
     return render_template('admin/reports.html', 
                          reports=reports_pagination.items,
@@ -1320,32 +1386,44 @@ def resolve_report(id):
 
 @admin.route('/products')
 def admin_products():
-    page = request.args.get('page', 1, type=int)
-    products_pagination = Product.query.order_by(Product.created_at.desc()).paginate(
-        page=page, per_page=20, error_out=False
-    )
+    cursor = request.args.get('cursor')
+    products_pagination = keyset_paginate(Product.query, Product.created_at, Product.id, cursor,
+                                          per_page=20, with_total=True)
     return render_template('admin/products.html', 
                          products=products_pagination.items,
                          pagination=products_pagination)
 
 @admin.route('/transactions')
 def admin_transactions():
-    page = request.args.get('page', 1, type=int)
+    cursor = request.args.get('cursor')
     status_filter = request.args.get('status', '')
 
-    query = Transaction.query
+    query = Transaction.query.options(joinedload(Transaction.product))
     if status_filter:
         query = query.filter_by(status=status_filter)
 
-    transactions_pagination = query.order_by(Transaction.created_at.desc()).paginate(
-        page=page, per_page=20, error_out=False
-    )
+    transactions_pagination = keyset_paginate(query, Transaction.created_at, Transaction.id, cursor,
+                                              per_page=20, with_total=True)
 
     return render_template('admin/transactions.html', 
                          transactions=transactions_pagination.items,
                          pagination=transactions_pagination,
                          current_status=status_filter)
 
+@admin.route('/export/<name>')
+def export(name):
+    """Export streaming CSV/NDJSON untuk users, reports dan transactions dengan filter yang sama"""
+    filters = {key: request.args.get(key, '') for key in ('status', 'type')}
+    response = export_response(name, request.args.get('format', 'csv'), filters)
+    if response is None:
+        return jsonify({'success': False, 'error': 'Export atau format tidak dikenal'}), 404
+    return response
+
+@admin.route('/courier-health')
+def courier_health():
+    """Status circuit breaker API kurir (JSON) untuk monitoring"""
+    return jsonify({'couriers': get_breaker_states()})
+
 # Initialize default data function (removed before_app_first_request decorator)
 def init_db():
     try:
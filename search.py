@@ -0,0 +1,122 @@
+import re
+from flask import current_app
+from sqlalchemy import text
+from models import db, Product
+
+# Partikel/enklitik bahasa Indonesia yang sering menempel di kata pencarian
+# (contoh: "bukunya", "murahkah"). Dipotong dari kata kunci supaya prefix match
+# tetap mengenai kata dasarnya.
+INDONESIAN_PARTICLES = ('nya', 'lah', 'kah', 'pun')
+
+def _dialect():
+    return db.engine.dialect.name
+
+def init_search_index():
+    """Siapkan index full-text produk (tsvector + GIN di PostgreSQL, FTS5 di SQLite)"""
+    try:
+        if _dialect() == 'postgresql':
+            _init_postgres_index()
+        elif _dialect() == 'sqlite':
+            _init_sqlite_index()
+        db.session.commit()
+    except Exception as e:
+        print(f"Error initializing search index: {e}")
+        db.session.rollback()
+
+def _init_postgres_index():
+    # Pakai konfigurasi 'indonesian' (stemmer Snowball, PostgreSQL 12+) jika tersedia
+    config = current_app.config.get('SEARCH_TS_CONFIG', 'indonesian')
+    exists = db.session.execute(
+        text("SELECT 1 FROM pg_ts_config WHERE cfgname = :cfg"), {'cfg': config}
+    ).first()
+    if not exists:
+        print(f"Text search config '{config}' not found, falling back to 'simple'")
+        current_app.config['SEARCH_TS_CONFIG'] = 'simple'
+
+    db.session.execute(text("ALTER TABLE products ADD COLUMN IF NOT EXISTS search_vector tsvector"))
+    db.session.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_products_search_vector ON products USING GIN (search_vector)"
+    ))
+    # Backfill produk yang belum pernah diindex
+    db.session.execute(text(_postgres_update_sql("search_vector IS NULL")),
+                       {'cfg': current_app.config['SEARCH_TS_CONFIG']})
+
+def _init_sqlite_index():
+    db.session.execute(text(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5("
+        "title, description, desired_items, tokenize='unicode61 remove_diacritics 2')"
+    ))
+    db.session.execute(text(
+        "INSERT INTO products_fts (rowid, title, description, desired_items) "
+        "SELECT id, title, description, desired_items FROM products "
+        "WHERE id NOT IN (SELECT rowid FROM products_fts)"
+    ))
+
+def _postgres_update_sql(where):
+    # Bobot: judul (A) > barang yang dicari (B) > deskripsi (C)
+    return (
+        "UPDATE products SET search_vector = "
+        "setweight(to_tsvector(CAST(:cfg AS regconfig), coalesce(title, '')), 'A') || "
+        "setweight(to_tsvector(CAST(:cfg AS regconfig), coalesce(desired_items, '')), 'B') || "
+        "setweight(to_tsvector(CAST(:cfg AS regconfig), coalesce(description, '')), 'C') "
+        f"WHERE {where}"
+    )
+
+def update_search_index(product):
+    """Sinkronkan entri index pencarian untuk satu produk (panggil sebelum commit)"""
+    db.session.flush()
+    if _dialect() == 'postgresql':
+        db.session.execute(text(_postgres_update_sql("id = :id")),
+                           {'cfg': current_app.config.get('SEARCH_TS_CONFIG', 'simple'), 'id': product.id})
+    elif _dialect() == 'sqlite':
+        db.session.execute(text("DELETE FROM products_fts WHERE rowid = :id"), {'id': product.id})
+        db.session.execute(text(
+            "INSERT INTO products_fts (rowid, title, description, desired_items) "
+            "VALUES (:id, :title, :description, :desired_items)"
+        ), {
+            'id': product.id,
+            'title': product.title,
+            'description': product.description,
+            'desired_items': product.desired_items
+        })
+
+def tokenize_search(search):
+    """Pecah kata kunci menjadi token yang aman dipakai di tsquery/FTS5 MATCH"""
+    tokens = []
+    for token in re.findall(r'\w+', search.lower()):
+        for particle in INDONESIAN_PARTICLES:
+            if token.endswith(particle) and len(token) - len(particle) >= 4:
+                token = token[:-len(particle)]
+                break
+        tokens.append(token)
+    return tokens
+
+def apply_search(query, search):
+    """Filter dan urutkan query Product berdasarkan relevansi pencarian full-text"""
+    tokens = tokenize_search(search)
+    if not tokens:
+        return query, False
+
+    if _dialect() == 'postgresql':
+        tsquery = ' & '.join(f'{token}:*' for token in tokens)
+        ranked = text(
+            "SELECT id AS product_id, "
+            "ts_rank_cd(search_vector, to_tsquery(CAST(:cfg AS regconfig), :q)) AS rank "
+            "FROM products WHERE search_vector @@ to_tsquery(CAST(:cfg AS regconfig), :q)"
+        ).bindparams(q=tsquery, cfg=current_app.config.get('SEARCH_TS_CONFIG', 'simple'))
+        ranked = ranked.columns(product_id=db.Integer, rank=db.Float).subquery()
+        query = query.join(ranked, Product.id == ranked.c.product_id)
+        return query.order_by(ranked.c.rank.desc(), Product.created_at.desc()), True
+
+    if _dialect() == 'sqlite':
+        match = ' '.join(f'"{token}"*' for token in tokens)
+        # bm25: nilai lebih kecil = lebih relevan; bobot kolom title, description, desired_items
+        ranked = text(
+            "SELECT rowid AS product_id, bm25(products_fts, 10.0, 1.0, 5.0) AS rank "
+            "FROM products_fts WHERE products_fts MATCH :q"
+        ).bindparams(q=match)
+        ranked = ranked.columns(product_id=db.Integer, rank=db.Float).subquery()
+        query = query.join(ranked, Product.id == ranked.c.product_id)
+        return query.order_by(ranked.c.rank.asc(), Product.created_at.desc()), True
+
+    return query, False
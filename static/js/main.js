@@ -234,12 +234,8 @@ function initializeChatAutoRefresh() {
             messagesContainer.scrollTop = messagesContainer.scrollHeight;
         }
         
-        // Auto-refresh every 30 seconds
-        setInterval(function() {
-            if (document.visibilityState === 'visible') {
-                location.reload();
-            }
-        }, 30000);
+        // New messages arrive through the chat event stream (see base.html),
+        // so the page no longer reloads itself on a timer.
     }
 }
 
@@ -0,0 +1,307 @@
+import hashlib
+import hmac
+import mimetypes
+import os
+import shutil
+import tempfile
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import quote, urlsplit
+from xml.etree import ElementTree
+import requests
+from requests.adapters import HTTPAdapter
+from flask import Response, current_app, redirect, send_from_directory
+
+class StorageError(Exception):
+    """Backend penyimpanan upload gagal (selain objek tidak ditemukan)"""
+
+class FilesystemStorage:
+    """Upload di disk lokal (UPLOAD_FOLDER); satu node atau disk bersama"""
+
+    def __init__(self, root, sendfile='', accel_prefix='/_uploads/'):
+        self.root = root
+        self.sendfile = sendfile
+        self.accel_prefix = accel_prefix
+
+    def path(self, key):
+        return os.path.join(self.root, *key.split('/'))
+
+    def save(self, key, fileobj):
+        """Tulis streaming ke file sementara lalu os.replace (pembaca tidak pernah melihat file setengah jadi)"""
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+        try:
+            with open(tmp_path, 'wb') as out:
+                shutil.copyfileobj(fileobj, out)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def open(self, key):
+        return open(self.path(key), 'rb')
+
+    def exists(self, key):
+        return os.path.isfile(self.path(key))
+
+    def delete(self, key):
+        try:
+            os.remove(self.path(key))
+        except FileNotFoundError:
+            pass
+
+    def modified_at(self, key):
+        try:
+            return os.path.getmtime(self.path(key))
+        except FileNotFoundError:
+            return None
+
+    def touch(self, key):
+        os.utime(self.path(key))
+
+    def url(self, key, expires=None):
+        """Tidak ada URL langsung; file dikirim lewat send()"""
+        return None
+
+    def send(self, key, max_age):
+        """Kirim file; dengan UPLOAD_SENDFILE byte file dikirim web server, bukan worker Python.
+
+        x-accel-redirect (nginx): location internal UPLOAD_ACCEL_PREFIX harus alias ke UPLOAD_FOLDER.
+        x-sendfile (Apache mod_xsendfile / lighttpd): header berisi path absolut.
+        """
+        path = self.path(key)
+        if not self.sendfile:
+            return send_from_directory(os.path.abspath(os.path.dirname(path)), os.path.basename(path),
+                                       max_age=max_age)
+        if not os.path.isfile(path):
+            return Response(status=404)
+        response = Response(mimetype=mimetypes.guess_type(key)[0] or 'application/octet-stream')
+        if self.sendfile == 'x-accel-redirect':
+            response.headers['X-Accel-Redirect'] = self.accel_prefix.rstrip('/') + '/' + key
+        else:
+            response.headers['X-Sendfile'] = os.path.abspath(path)
+        response.cache_control.public = True
+        response.cache_control.max_age = max_age
+        return response
+
+class S3Storage:
+    """Object store S3-compatible (AWS S3, MinIO, R2, fake_s3.py) lewat REST + SigV4, tanpa SDK.
+
+    Path-style addressing: <endpoint>/<bucket>/<prefix><key>. File di atas part_size ditulis
+    dengan multipart upload, part-nya dikirim paralel (maksimal `workers` part di memori).
+    """
+
+    ALGORITHM = 'AWS4-HMAC-SHA256'
+    EMPTY_SHA256 = hashlib.sha256(b'').hexdigest()
+    TIMEOUT = (3, 30)
+
+    def __init__(self, endpoint, bucket, access_key, secret_key, region='us-east-1', prefix='',
+                 part_size=8 * 1024 * 1024, workers=4, url_expires=3600):
+        self.endpoint = endpoint.rstrip('/')
+        self.host = urlsplit(self.endpoint).netloc
+        self.bucket = bucket
+        self.access_key = access_key
+        self.secret_key = secret_key
+        self.region = region
+        self.prefix = prefix
+        self.part_size = max(part_size, 5 * 1024 * 1024)  # batas minimum part S3
+        self.workers = workers
+        self.url_expires = url_expires
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=workers * 2, max_retries=2)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self._executor = None
+        self._executor_lock = threading.Lock()
+
+    # --- SigV4 ---
+
+    def _path(self, key):
+        return '/' + self.bucket + '/' + quote(self.prefix + key, safe='/~')
+
+    @staticmethod
+    def _query_string(query):
+        return '&'.join(f"{quote(k, safe='-_.~')}={quote(str(v), safe='-_.~')}" for k, v in sorted(query.items()))
+
+    def _signature(self, method, path, query, headers, payload_hash, now):
+        signed = sorted(name.lower() for name in headers)
+        lowered = {name.lower(): str(value).strip() for name, value in headers.items()}
+        canonical_request = '\n'.join([
+            method, path, self._query_string(query),
+            ''.join(f'{name}:{lowered[name]}\n' for name in signed),
+            ';'.join(signed), payload_hash
+        ])
+        date = now.strftime('%Y%m%d')
+        scope = f'{date}/{self.region}/s3/aws4_request'
+        string_to_sign = '\n'.join([
+            self.ALGORITHM, now.strftime('%Y%m%dT%H%M%SZ'), scope,
+            hashlib.sha256(canonical_request.encode('utf-8')).hexdigest()
+        ])
+        key = ('AWS4' + self.secret_key).encode('utf-8')
+        for part in (date, self.region, 's3', 'aws4_request'):
+            key = hmac.new(key, part.encode('utf-8'), hashlib.sha256).digest()
+        signature = hmac.new(key, string_to_sign.encode('utf-8'), hashlib.sha256).hexdigest()
+        return signature, scope, ';'.join(signed)
+
+    def _request(self, method, key, query=None, headers=None, data=b'', expected=(200,)):
+        query = query or {}
+        now = datetime.now(timezone.utc)
+        payload_hash = hashlib.sha256(data).hexdigest() if data else self.EMPTY_SHA256
+        headers = dict(headers or {}, **{
+            'Host': self.host,
+            'x-amz-date': now.strftime('%Y%m%dT%H%M%SZ'),
+            'x-amz-content-sha256': payload_hash,
+        })
+        path = self._path(key)
+        signature, scope, signed = self._signature(method, path, query, headers, payload_hash, now)
+        headers['Authorization'] = (f'{self.ALGORITHM} Credential={self.access_key}/{scope}, '
+                                    f'SignedHeaders={signed}, Signature={signature}')
+        url = self.endpoint + path + ('?' + self._query_string(query) if query else '')
+        try:
+            response = self.session.request(method, url, headers=headers, data=data or None,
+                                            timeout=self.TIMEOUT, stream=method == 'GET')
+        except requests.RequestException as e:
+            raise StorageError(f"{method} {key}: {e}")
+        if response.status_code == 404 and 404 not in expected:
+            raise FileNotFoundError(key)
+        if response.status_code not in expected:
+            raise StorageError(f"{method} {key}: HTTP {response.status_code} {response.text[:200]}")
+        return response
+
+    def presign(self, method, key, expires=None):
+        """URL ber-tanda tangan (query string) untuk akses langsung tanpa kredensial"""
+        now = datetime.now(timezone.utc)
+        query = {
+            'X-Amz-Algorithm': self.ALGORITHM,
+            'X-Amz-Credential': f"{self.access_key}/{now.strftime('%Y%m%d')}/{self.region}/s3/aws4_request",
+            'X-Amz-Date': now.strftime('%Y%m%dT%H%M%SZ'),
+            'X-Amz-Expires': str(expires or self.url_expires),
+            'X-Amz-SignedHeaders': 'host',
+        }
+        path = self._path(key)
+        signature, _, _ = self._signature(method, path, query, {'Host': self.host}, 'UNSIGNED-PAYLOAD', now)
+        query['X-Amz-Signature'] = signature
+        return f'{self.endpoint}{path}?{self._query_string(query)}'
+
+    # --- operasi storage ---
+
+    def _get_executor(self):
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='s3-upload')
+            return self._executor
+
+    def save(self, key, fileobj):
+        content_type = mimetypes.guess_type(key)[0] or 'application/octet-stream'
+        first = fileobj.read(self.part_size)
+        if len(first) < self.part_size:
+            self._request('PUT', key, headers={'Content-Type': content_type}, data=first)
+            return
+        self._save_multipart(key, fileobj, first, content_type)
+
+    def _save_multipart(self, key, fileobj, first, content_type):
+        response = self._request('POST', key, query={'uploads': ''}, headers={'Content-Type': content_type})
+        upload_id = _xml_text(response.content, 'UploadId')
+        # Maksimal `workers` part di memori/di jaringan sekaligus
+        slots = threading.BoundedSemaphore(self.workers)
+
+        def upload_part(number, data):
+            try:
+                part = self._request('PUT', key, query={'partNumber': number, 'uploadId': upload_id}, data=data)
+                return number, part.headers['ETag']
+            finally:
+                slots.release()
+
+        futures = []
+        try:
+            number, data = 1, first
+            while data:
+                slots.acquire()
+                futures.append(self._get_executor().submit(upload_part, number, data))
+                number, data = number + 1, fileobj.read(self.part_size)
+            parts = sorted(future.result() for future in futures)
+            body = '<CompleteMultipartUpload>' + ''.join(
+                f'<Part><PartNumber>{number}</PartNumber><ETag>{etag}</ETag></Part>' for number, etag in parts
+            ) + '</CompleteMultipartUpload>'
+            response = self._request('POST', key, query={'uploadId': upload_id}, data=body.encode('utf-8'))
+            # S3 bisa menjawab 200 dengan <Error> di body untuk CompleteMultipartUpload
+            if b'<Error>' in response.content:
+                raise StorageError(f"complete {key}: {response.text[:200]}")
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            try:
+                self._request('DELETE', key, query={'uploadId': upload_id}, expected=(204, 200, 404))
+            except StorageError as e:
+                print(f"Error aborting multipart upload {key}: {e}")
+            raise
+
+    def open(self, key):
+        """Unduh streaming ke file sementara (di memori sampai part_size, sisanya di disk)"""
+        response = self._request('GET', key)
+        spooled = tempfile.SpooledTemporaryFile(max_size=self.part_size)
+        for chunk in response.iter_content(64 * 1024):
+            spooled.write(chunk)
+        spooled.seek(0)
+        return spooled
+
+    def exists(self, key):
+        return self._request('HEAD', key, expected=(200, 404)).status_code == 200
+
+    def delete(self, key):
+        self._request('DELETE', key, expected=(204, 200, 404))
+
+    def modified_at(self, key):
+        response = self._request('HEAD', key, expected=(200, 404))
+        if response.status_code == 404:
+            return None
+        return parsedate_to_datetime(response.headers['Last-Modified']).timestamp()
+
+    def touch(self, key):
+        """Perbarui Last-Modified dengan copy objek ke dirinya sendiri"""
+        self._request('PUT', key, headers={
+            'x-amz-copy-source': quote(f'/{self.bucket}/{self.prefix}{key}', safe='/~'),
+            'x-amz-metadata-directive': 'REPLACE',
+            'Content-Type': mimetypes.guess_type(key)[0] or 'application/octet-stream',
+        })
+
+    def url(self, key, expires=None):
+        return self.presign('GET', key, expires)
+
+    def send(self, key, max_age):
+        """Redirect ke URL pre-signed; byte gambar langsung dari object store, bukan dari worker"""
+        response = redirect(self.url(key), code=302)
+        # Redirect boleh di-cache selama URL tujuannya masih berlaku
+        if max_age is not None:
+            response.cache_control.max_age = min(max_age, self.url_expires // 2)
+        return response
+
+def _xml_text(content, tag):
+    for element in ElementTree.fromstring(content).iter():
+        if element.tag.rsplit('}', 1)[-1] == tag:
+            return element.text
+    raise StorageError(f"{tag} tidak ada di respons")
+
+def create_storage(config):
+    backend = config.get('UPLOAD_STORAGE', 'filesystem')
+    if backend == 's3':
+        return S3Storage(
+            config['S3_ENDPOINT_URL'], config['S3_BUCKET'],
+            config['S3_ACCESS_KEY_ID'], config['S3_SECRET_ACCESS_KEY'],
+            region=config.get('S3_REGION', 'us-east-1'), prefix=config.get('S3_PREFIX', ''),
+            part_size=config.get('S3_PART_SIZE', 8 * 1024 * 1024), workers=config.get('S3_UPLOAD_WORKERS', 4),
+            url_expires=config.get('S3_URL_EXPIRES', 3600)
+        )
+    return FilesystemStorage(config['UPLOAD_FOLDER'], config.get('UPLOAD_SENDFILE', ''),
+                             config.get('UPLOAD_ACCEL_PREFIX', '/_uploads/'))
+
+def get_storage():
+    """Backend upload aplikasi ini (UPLOAD_STORAGE), dibuat sekali per app"""
+    app = current_app._get_current_object()
+    if 'upload_storage' not in app.extensions:
+        app.extensions['upload_storage'] = create_storage(app.config)
+    return app.extensions['upload_storage']
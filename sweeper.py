@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Sweeper background untuk auto-konfirmasi / auto-pembatalan transaksi yang sedang dikirim.
+
+Jalankan sekali (mis. dari cron):   python sweeper.py
+Jalankan terus-menerus:             python sweeper.py --loop --interval 600
+Atau aktifkan di dalam proses web dengan SWEEPER_INTERVAL > 0.
+"""
+
+import argparse
+import threading
+import time
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import func, text, update
+from models import db, Transaction, release_offered_products
+from tracking import get_tracking_infos, is_delivered
+from idempotency import purge_idempotency_keys
+
+# Batas waktu aturan auto-konfirmasi (jam sejak paket terakhir dikirim)
+DELIVERED_CONFIRM_HOURS = 6
+AUTO_CONFIRM_HOURS = 24
+AUTO_CANCEL_HOURS = 7 * 24
+
+AUTO_CANCEL_NOTE = "Transaksi dibatalkan otomatis karena tidak ada konfirmasi penerimaan dalam 7 hari."
+
+# Kunci advisory PostgreSQL supaya hanya satu worker yang menyapu dalam satu waktu
+SWEEP_LOCK_ID = 724011
+
+def hours_since_shipped(transaction, now=None):
+    last_shipped = max(transaction.seller_shipped_at, transaction.buyer_shipped_at)
+    return ((now or datetime.utcnow()) - last_shipped).total_seconds() / 3600
+
+def needs_tracking(hours):
+    """Tracking hanya menentukan hasil sebelum 24 jam dan setelah 7 hari; di antaranya selalu selesai"""
+    return DELIVERED_CONFIRM_HOURS <= hours < AUTO_CONFIRM_HOURS or hours >= AUTO_CANCEL_HOURS
+
+def decide_auto_action(transaction, seller_tracking, buyer_tracking, now=None):
+    """Tentukan aksi otomatis untuk transaksi 'shipped': 'completed', 'cancelled' atau None"""
+    hours = hours_since_shipped(transaction, now)
+    seller_delivered = is_delivered(seller_tracking)
+    buyer_delivered = is_delivered(buyer_tracking)
+
+    if seller_delivered and buyer_delivered:
+        # Kedua paket sudah sampai, auto konfirmasi setelah 6 jam
+        if hours >= DELIVERED_CONFIRM_HOURS:
+            return 'completed'
+    elif hours >= AUTO_CANCEL_HOURS:
+        # Batal jika tidak ada konfirmasi sama sekali dalam 7 hari
+        if not transaction.seller_received_at and not transaction.buyer_received_at:
+            return 'cancelled'
+    elif hours >= AUTO_CONFIRM_HOURS:
+        return 'completed'
+    return None
+
+def apply_auto_actions(completed_ids, cancelled_ids, now=None):
+    """Terapkan hasil sweep dengan UPDATE massal; hanya baris yang masih 'shipped' yang berubah.
+
+    Filter status berfungsi sebagai compare-and-swap untuk seluruh batch.
+    """
+    now = now or datetime.utcnow()
+    completed = cancelled = 0
+
+    if completed_ids:
+        completed = Transaction.query.filter(
+            Transaction.id.in_(completed_ids), Transaction.status == 'shipped'
+        ).update({
+            Transaction.status: 'completed',
+            Transaction.seller_received_at: func.coalesce(Transaction.seller_received_at, now),
+            Transaction.buyer_received_at: func.coalesce(Transaction.buyer_received_at, now),
+            Transaction.updated_at: now,
+            # Naikkan versi supaya request yang membaca versi lama gagal CAS dan membaca ulang
+            Transaction.version: Transaction.version + 1
+        }, synchronize_session=False)
+
+    if cancelled_ids:
+        # RETURNING: hanya transaksi yang benar-benar dibatalkan sweep ini yang produknya dilepas,
+        # bukan kandidat yang sementara itu di-dispute/selesai
+        result = db.session.execute(
+            update(Transaction).where(
+                Transaction.id.in_(cancelled_ids), Transaction.status == 'shipped',
+                Transaction.seller_received_at.is_(None), Transaction.buyer_received_at.is_(None)
+            ).values({
+                Transaction.status: 'cancelled',
+                Transaction.notes: func.coalesce(Transaction.notes, '') + f"\n\n{AUTO_CANCEL_NOTE}",
+                Transaction.updated_at: now,
+                Transaction.version: Transaction.version + 1
+            }).returning(Transaction.id).execution_options(synchronize_session=False)
+        )
+        cancelled_rows = [transaction_id for transaction_id, in result]
+        cancelled = len(cancelled_rows)
+        if cancelled_rows:
+            release_offered_products(cancelled_rows)
+
+    db.session.commit()
+    return completed, cancelled
+
+def sweep_shipped_transactions(chunk_size=None, tracking_deadline=None):
+    """Sapu semua transaksi 'shipped' per chunk: refresh tracking paralel lalu update massal"""
+    config = current_app.config
+    chunk_size = chunk_size or config.get('SWEEPER_CHUNK_SIZE', 200)
+    if tracking_deadline is None:
+        tracking_deadline = config.get('SWEEPER_TRACKING_DEADLINE', 30)
+
+    now = datetime.utcnow()
+    # Transaksi yang paket terakhirnya dikirim < 6 jam lalu belum mungkin berubah status
+    shipped_before = now - timedelta(hours=DELIVERED_CONFIRM_HOURS)
+    base_query = Transaction.query.filter(
+        Transaction.status == 'shipped',
+        Transaction.seller_shipped_at <= shipped_before,
+        Transaction.buyer_shipped_at <= shipped_before
+    )
+
+    stats = {'scanned': 0, 'completed': 0, 'cancelled': 0}
+    last_id = 0
+    while True:
+        chunk = base_query.filter(Transaction.id > last_id).order_by(Transaction.id).limit(chunk_size).all()
+        if not chunk:
+            break
+        last_id = chunk[-1].id
+        stats['scanned'] += len(chunk)
+
+        numbers = []
+        for transaction in chunk:
+            if needs_tracking(hours_since_shipped(transaction, now)):
+                numbers += [transaction.seller_tracking_number, transaction.buyer_tracking_number]
+        tracking = get_tracking_infos(numbers, deadline=tracking_deadline) if numbers else {}
+
+        completed_ids, cancelled_ids = [], []
+        for transaction in chunk:
+            action = decide_auto_action(transaction,
+                                        tracking.get(transaction.seller_tracking_number),
+                                        tracking.get(transaction.buyer_tracking_number), now)
+            if action == 'completed':
+                completed_ids.append(transaction.id)
+            elif action == 'cancelled':
+                cancelled_ids.append(transaction.id)
+
+        completed, cancelled = apply_auto_actions(completed_ids, cancelled_ids, now)
+        stats['completed'] += completed
+        stats['cancelled'] += cancelled
+        # Lepaskan objek chunk dari identity map supaya memori tetap rata
+        db.session.expunge_all()
+
+    return stats
+
+def run_sweep():
+    """Satu putaran sweep; di PostgreSQL dilewati jika worker lain sedang menyapu"""
+    if db.engine.dialect.name != 'postgresql':
+        return sweep_shipped_transactions()
+
+    with db.engine.connect() as lock_conn:
+        if not lock_conn.execute(text("SELECT pg_try_advisory_lock(:id)"), {'id': SWEEP_LOCK_ID}).scalar():
+            return None
+        try:
+            return sweep_shipped_transactions()
+        finally:
+            lock_conn.execute(text("SELECT pg_advisory_unlock(:id)"), {'id': SWEEP_LOCK_ID})
+
+def _sweep_loop(app, interval):
+    while True:
+        try:
+            with app.app_context():
+                stats = run_sweep()
+                if stats and (stats['completed'] or stats['cancelled']):
+                    print(f"Transaction sweep: {stats}")
+                purge_idempotency_keys()
+                db.session.remove()
+        except Exception as e:
+            print(f"Error sweeping transactions: {e}")
+        time.sleep(interval)
+
+def start_sweeper(app):
+    """Jalankan sweeper sebagai thread daemon jika SWEEPER_INTERVAL > 0"""
+    interval = app.config.get('SWEEPER_INTERVAL', 0)
+    if interval <= 0 or 'transaction_sweeper' in app.extensions:
+        return None
+    thread = threading.Thread(target=_sweep_loop, args=(app, interval), daemon=True,
+                              name='transaction-sweeper')
+    thread.start()
+    app.extensions['transaction_sweeper'] = thread
+    return thread
+
+def main():
+    parser = argparse.ArgumentParser(description='Auto-konfirmasi / auto-pembatalan transaksi yang sedang dikirim')
+    parser.add_argument('--loop', action='store_true', help='jalankan terus-menerus')
+    parser.add_argument('--interval', type=int, default=600, help='jeda antar sweep dalam detik (dengan --loop)')
+    args = parser.parse_args()
+
+    from app import app
+    if args.loop:
+        _sweep_loop(app, args.interval)
+    else:
+        with app.app_context():
+            stats = run_sweep()
+            purge_idempotency_keys()
+            print(f"Transaction sweep: {stats if stats else 'skipped, another sweep is running'}")
+
+if __name__ == '__main__':
+    main()
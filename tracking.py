@@ -0,0 +1,697 @@
+import hashlib
+import hmac
+import json
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime, timedelta, timezone
+import requests
+from requests.adapters import HTTPAdapter
+from flask import current_app
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from models import db, TrackingCache, TrackingEvent
+
+# Nama kurir untuk tampilan, per kode hasil detect_courier
+COURIER_NAMES = {
+    'JNE': 'JNE',
+    'JT': 'J&T Express',
+    'SICEPAT': 'SiCepat',
+    'POS': 'Pos Indonesia',
+    'UNKNOWN': 'Unknown'
+}
+
+# Kurir yang datanya diambil dari API sungguhan (sisanya simulasi)
+API_COURIERS = ('JT', 'SICEPAT')
+
+# Base URL API per kurir; bisa diarahkan ke fake_courier.py lewat COURIER_<KODE>_BASE_URL
+DEFAULT_COURIER_BASE_URLS = {
+    'JT': 'https://www.jet.co.id',
+    'SICEPAT': 'https://api.sicepat.com',
+}
+
+# Format waktu yang dipakai API kurir untuk tanggal event
+EVENT_TIME_FORMATS = ('%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M', '%d/%m/%Y %H:%M:%S', '%d/%m/%Y %H:%M', '%d-%m-%Y %H:%M')
+
+class TrackingError(Exception):
+    """API ekspedisi gagal atau mengembalikan data yang tidak bisa dipakai"""
+
+class CourierUnavailable(TrackingError):
+    """Circuit breaker kurir sedang terbuka; request tidak dikirim sama sekali"""
+
+# Status HTTP yang dianggap gangguan sementara di sisi kurir (boleh di-retry)
+RETRYABLE_STATUSES = (500, 502, 503, 504)
+
+class CircuitBreaker:
+    """Circuit breaker sederhana per kurir: closed -> open setelah N kegagalan beruntun,
+    half-open setelah cooldown (satu request percobaan), lalu closed lagi jika berhasil."""
+
+    def __init__(self, name, failure_threshold=5, cooldown=60):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.state = 'closed'
+        self.failures = 0
+        self.opened_at = None
+        self.last_error = None
+        self.last_failure_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow_request(self):
+        with self._lock:
+            if self.state == 'closed':
+                return True
+            if self.state == 'open' and time.monotonic() - self.opened_at >= self.cooldown:
+                self.state = 'half_open'
+            if self.state == 'half_open' and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = 'closed'
+            self.failures = 0
+            self.opened_at = None
+            self._probing = False
+
+    def record_failure(self, error):
+        with self._lock:
+            self.failures += 1
+            self.last_error = str(error)
+            self.last_failure_at = datetime.utcnow()
+            self._probing = False
+            if self.state == 'half_open' or self.failures >= self.failure_threshold:
+                if self.state != 'open':
+                    print(f"Circuit breaker for {self.name} opened: {error}")
+                self.state = 'open'
+                self.opened_at = time.monotonic()
+
+    def snapshot(self):
+        with self._lock:
+            retry_in = None
+            if self.state == 'open':
+                retry_in = max(0, round(self.cooldown - (time.monotonic() - self.opened_at), 1))
+            return {
+                'courier': self.name,
+                'state': self.state,
+                'failures': self.failures,
+                'last_error': self.last_error,
+                'last_failure_at': self.last_failure_at.isoformat() if self.last_failure_at else None,
+                'retry_in': retry_in
+            }
+
+_executors = {}
+_executor_lock = threading.Lock()
+_refreshing = set()
+_refresh_lock = threading.Lock()
+_inflight_lookups = {}
+_sessions = {}
+_breakers = {}
+_courier_lock = threading.Lock()
+
+def _get_executor(name, config_key, default_workers):
+    """Thread pool per jenis pekerjaan, dibuat saat pertama dipakai (setelah fork gunicorn)"""
+    with _executor_lock:
+        if name not in _executors:
+            _executors[name] = ThreadPoolExecutor(
+                max_workers=current_app.config.get(config_key, default_workers),
+                thread_name_prefix=f'tracking-{name}'
+            )
+        return _executors[name]
+
+def _get_session(courier):
+    """Session HTTP keep-alive per kurir, dipakai bersama oleh semua thread lookup"""
+    with _courier_lock:
+        if courier not in _sessions:
+            pool_size = current_app.config.get('COURIER_POOL_SIZE', 10)
+            session = requests.Session()
+            # Retry ditangani courier_request (dengan jitter), bukan oleh urllib3
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            session.headers['User-Agent'] = 'BarterHub/1.0 (+tracking)'
+            _sessions[courier] = session
+        return _sessions[courier]
+
+def courier_base_url(courier):
+    return current_app.config.get(f'COURIER_{courier}_BASE_URL', DEFAULT_COURIER_BASE_URLS[courier]).rstrip('/')
+
+def get_breaker(courier):
+    with _courier_lock:
+        if courier not in _breakers:
+            _breakers[courier] = CircuitBreaker(
+                courier,
+                failure_threshold=current_app.config.get('COURIER_BREAKER_THRESHOLD', 5),
+                cooldown=current_app.config.get('COURIER_BREAKER_COOLDOWN', 60)
+            )
+        return _breakers[courier]
+
+def get_breaker_states():
+    """Status circuit breaker semua kurir ber-API, untuk monitoring"""
+    return [get_breaker(courier).snapshot() for courier in API_COURIERS]
+
+def courier_request(courier, method, url, **kwargs):
+    """Request ke API kurir lewat session pool, dengan retry terbatas + jitter dan circuit breaker.
+
+    Melempar CourierUnavailable tanpa menyentuh jaringan selama breaker terbuka,
+    sehingga pemanggil langsung jatuh ke data cache/simulasi.
+    """
+    breaker = get_breaker(courier)
+    if not breaker.allow_request():
+        raise CourierUnavailable(f"{COURIER_NAMES.get(courier, courier)} sedang tidak tersedia")
+
+    config = current_app.config
+    kwargs.setdefault('timeout', (config.get('COURIER_CONNECT_TIMEOUT', 3), config.get('COURIER_READ_TIMEOUT', 5)))
+    max_retries = config.get('COURIER_MAX_RETRIES', 2)
+    backoff = config.get('COURIER_RETRY_BACKOFF', 0.2)
+    session = _get_session(courier)
+
+    error, recorded = None, False
+    try:
+        for attempt in range(max_retries + 1):
+            try:
+                response = session.request(method, url, **kwargs)
+                if response.status_code not in RETRYABLE_STATUSES:
+                    breaker.record_success()
+                    recorded = True
+                    return response
+                error = TrackingError(f"HTTP {response.status_code}")
+            except requests.RequestException as e:
+                error = e
+            if attempt < max_retries:
+                # Exponential backoff dengan full jitter supaya retry antar worker tidak serempak
+                time.sleep(random.uniform(0, backoff * (2 ** attempt)))
+
+        breaker.record_failure(error)
+        recorded = True
+        raise TrackingError(f"{COURIER_NAMES.get(courier, courier)} API failed after {max_retries + 1} attempts: {error}")
+    finally:
+        if not recorded:
+            # Exception di luar dugaan tetap dicatat sebagai gagal supaya probe half-open tidak menggantung
+            breaker.record_failure(sys.exc_info()[1] or error)
+
+def get_stored_trackings(tracking_numbers, schedule_refresh=True):
+    """Data tracking untuk halaman web, hanya dibaca dari database (event tersimpan, lalu cache).
+
+    Tidak ada panggilan ke API kurir di jalur request: resi yang datanya kadaluarsa
+    atau belum ada dijadwalkan refresh di background.
+    """
+    requested = {number: normalize_tracking_number(number) for number in tracking_numbers if number}
+    numbers = list(dict.fromkeys(requested.values()))
+    if not numbers:
+        return {}
+
+    couriers, events, cache = _load_stored_tracking(numbers)
+    now = datetime.utcnow()
+    results = {}
+    for number in numbers:
+        courier = couriers[number]
+        number_events, entry = events.get(number), cache.get(number)
+
+        if number_events:
+            results[number] = build_tracking_from_events(courier, number, number_events)
+        elif entry and entry.data:
+            # Status "sampai" hanya dipercaya dari event kurir (webhook/polling API); cache tanpa
+            # event berisi simulasi atau placeholder, termasuk entri lama tanpa flag simulated
+            results[number] = dict(json.loads(entry.data), delivered=False)
+        elif courier not in API_COURIERS:
+            # Kurir tanpa API: data simulasi dibuat lokal, tidak ada panggilan jaringan
+            results[number] = refresh_tracking(courier, number)
+            continue
+        else:
+            results[number] = pending_tracking(number, courier)
+
+        if schedule_refresh and _needs_refresh(number_events, entry, now):
+            schedule_tracking_refresh(courier, number)
+    # Hasil dikembalikan dengan nomor resi seperti yang diminta pemanggil
+    return {number: results[canonical] for number, canonical in requested.items()}
+
+def get_tracking_infos(tracking_numbers, deadline=None):
+    """Refresh resi yang kadaluarsa secara paralel dengan satu batas waktu, lalu baca hasilnya dari database.
+
+    Dipakai job background (sweeper). Lookup yang belum selesai saat deadline tetap
+    berjalan dan hasilnya tersimpan untuk pembacaan berikutnya.
+    """
+    numbers = list(dict.fromkeys(normalize_tracking_number(number) for number in tracking_numbers if number))
+    if not numbers:
+        return {}
+    if deadline is None:
+        deadline = current_app.config.get('TRACKING_REQUEST_DEADLINE', 3)
+
+    couriers, events, cache = _load_stored_tracking(numbers)
+    now = datetime.utcnow()
+    stale = [number for number in numbers
+             if _needs_refresh(events.get(number), cache.get(number), now)]
+
+    if stale:
+        app = current_app._get_current_object()
+        executor = _get_executor('lookup', 'TRACKING_LOOKUP_WORKERS', 8)
+        futures = []
+        with _refresh_lock:
+            for number in stale:
+                # Lookup yang masih berjalan (mis. dari sweep sebelumnya yang timeout) dipakai ulang
+                future = _inflight_lookups.get(number)
+                if future is None or future.done():
+                    future = executor.submit(_lookup_in_context, app, couriers[number], number)
+                    _inflight_lookups[number] = future
+                    future.add_done_callback(lambda f, number=number: _forget_lookup(number, f))
+                futures.append(future)
+        wait(futures, timeout=deadline)
+
+    return get_stored_trackings(tracking_numbers, schedule_refresh=False)
+
+def _load_stored_tracking(numbers):
+    """Muat event dan entri cache untuk sekumpulan resi dalam dua query"""
+    couriers = {number: detect_courier(number) for number in numbers}
+
+    events = {}
+    rows = TrackingEvent.query.filter(TrackingEvent.tracking_number.in_(numbers)) \
+        .order_by(TrackingEvent.tracking_number, TrackingEvent.occurred_at, TrackingEvent.id) \
+        .execution_options(populate_existing=True).all()
+    for event in rows:
+        if event.courier == couriers[event.tracking_number]:
+            events.setdefault(event.tracking_number, []).append(event)
+
+    cache = {}
+    rows = TrackingCache.query.filter(TrackingCache.tracking_number.in_(numbers)) \
+        .execution_options(populate_existing=True).all()
+    for entry in rows:
+        if entry.courier == couriers[entry.tracking_number]:
+            cache[entry.tracking_number] = entry
+
+    return couriers, events, cache
+
+def _needs_refresh(events, entry, now):
+    if events and any(event.is_delivered for event in events):
+        # Paket sudah diterima, status tidak akan berubah lagi
+        return False
+    if entry and entry.expires_at > now:
+        return False
+    if events:
+        # Webhook yang baru masuk sama segarnya dengan hasil polling
+        ttl = current_app.config.get('TRACKING_CACHE_TTL', 900)
+        if max(event.received_at for event in events) > now - timedelta(seconds=ttl):
+            return False
+    return True
+
+def _forget_lookup(tracking_number, future):
+    with _refresh_lock:
+        if _inflight_lookups.get(tracking_number) is future:
+            del _inflight_lookups[tracking_number]
+
+def _lookup_in_context(app, courier, tracking_number):
+    with app.app_context():
+        try:
+            return refresh_tracking(courier, tracking_number)
+        finally:
+            db.session.remove()
+
+def build_tracking_from_events(courier, tracking_number, events):
+    """Susun data tracking (format yang sama dengan hasil API) dari event tersimpan"""
+    timeline = [{
+        'status': event.status,
+        'time': event.occurred_at.strftime('%d/%m/%Y %H:%M'),
+        'location': event.location or '',
+        'is_current': False
+    } for event in events]
+    timeline[-1]['is_current'] = True
+
+    return {
+        'tracking_number': tracking_number,
+        'courier': COURIER_NAMES.get(courier, 'Unknown'),
+        'status': timeline[-1]['status'],
+        'timeline': timeline,
+        'delivered': any(event.is_delivered for event in events)
+    }
+
+def is_delivered(tracking):
+    """Paket dianggap sampai hanya berdasarkan data kurir sungguhan, tidak pernah dari simulasi"""
+    return bool(tracking and tracking.get('delivered') and not tracking.get('simulated'))
+
+def pending_tracking(tracking_number, courier):
+    """Placeholder saat data kurir belum pernah diterima"""
+    return {
+        'tracking_number': tracking_number,
+        'courier': COURIER_NAMES.get(courier, 'Unknown'),
+        'status': 'Menunggu update dari kurir',
+        'timeline': [],
+        'delivered': False
+    }
+
+def parse_event_time(value):
+    """Parse waktu event dari kurir; None jika formatnya tidak dikenali"""
+    if isinstance(value, datetime):
+        return value
+    if not value:
+        return None
+    value = str(value).strip()
+    try:
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        if parsed.tzinfo is not None:
+            parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+        return parsed
+    except ValueError:
+        pass
+    for fmt in EVENT_TIME_FORMATS:
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+    return None
+
+def store_tracking_events(courier, tracking_number, events, source='webhook'):
+    """Simpan event tracking ternormalisasi; event yang sudah pernah disimpan diabaikan.
+
+    Setiap event berupa dict dengan key status, time, location, delivered dan (opsional) id.
+    """
+    tracking_number = normalize_tracking_number(tracking_number)
+    now = datetime.utcnow()
+    rows = []
+    for event in events:
+        status = (event.get('status') or '').strip()[:255]
+        if not status:
+            continue
+        raw_time = event.get('time')
+        location = (event.get('location') or '').strip()[:255]
+        if event.get('id'):
+            event_key = str(event['id'])[:64]
+        else:
+            event_key = hashlib.sha1(f"{status}|{raw_time}|{location}".encode('utf-8')).hexdigest()
+        rows.append({
+            'courier': courier,
+            'tracking_number': tracking_number,
+            'event_key': event_key,
+            'status': status,
+            'location': location,
+            'occurred_at': parse_event_time(raw_time) or now,
+            'is_delivered': bool(event.get('delivered')),
+            'source': source,
+            'received_at': now
+        })
+    if not rows:
+        return 0
+
+    table = TrackingEvent.__table__
+    dialect = db.engine.dialect.name
+    if dialect == 'postgresql':
+        statement = postgresql.insert(table).on_conflict_do_nothing()
+    elif dialect == 'sqlite':
+        statement = sqlite.insert(table).on_conflict_do_nothing()
+    else:
+        statement = table.insert()
+
+    # Transaksi terpisah supaya tidak ikut commit/rollback session request
+    with db.engine.begin() as conn:
+        conn.execute(statement, rows)
+    return len(rows)
+
+def parse_webhook_payload(payload):
+    """Normalisasi payload webhook kurir menjadi (nomor resi, daftar event).
+
+    Format: {"tracking_number": ..., "events": [{"id", "status", "time", "location", "delivered"}]}
+    atau satu event langsung di level atas. Nama field J&T/SiCepat (desc, date, date_time, city) juga diterima.
+    """
+    if not isinstance(payload, dict):
+        raise TrackingError("Payload harus berupa objek JSON")
+
+    tracking_number = payload.get('tracking_number') or payload.get('waybill') or payload.get('awb')
+    if not tracking_number:
+        raise TrackingError("tracking_number wajib diisi")
+    tracking_number = normalize_tracking_number(str(tracking_number))
+
+    raw_events = payload.get('events')
+    if raw_events is None:
+        raw_events = [payload]
+    if not isinstance(raw_events, list):
+        raise TrackingError("events harus berupa list")
+
+    events = []
+    for item in raw_events:
+        if not isinstance(item, dict):
+            raise TrackingError("Setiap event harus berupa objek JSON")
+        status = item.get('status') or item.get('desc') or item.get('description')
+        if not status:
+            raise TrackingError("Setiap event wajib punya status")
+        events.append({
+            'id': item.get('id') or item.get('event_id'),
+            'status': str(status),
+            'time': item.get('time') or item.get('date') or item.get('date_time'),
+            'location': item.get('location') or item.get('city'),
+            'delivered': bool(item.get('delivered')) or str(item.get('code', '')).upper() == 'DELIVERED'
+        })
+    return tracking_number, events
+
+def webhook_signature(body, secret):
+    return 'sha256=' + hmac.new(secret.encode('utf-8'), body, hashlib.sha256).hexdigest()
+
+def verify_webhook_signature(body, signature):
+    """Cek header X-Courier-Signature (HMAC-SHA256 dari body dengan COURIER_WEBHOOK_SECRET)"""
+    secret = current_app.config.get('COURIER_WEBHOOK_SECRET')
+    if not secret or not signature:
+        return False
+    return hmac.compare_digest(webhook_signature(body, secret), signature)
+
+def refresh_tracking(courier, tracking_number):
+    """Ambil tracking dari ekspedisi dan simpan ke cache; gagal = negative cache dengan data terakhir"""
+    try:
+        result, error = fetch_tracking(courier, tracking_number), None
+    except Exception as e:
+        print(f"Error getting tracking info ({courier} {tracking_number}): {e}")
+        result, error = None, str(e)
+
+    if result is not None and courier in API_COURIERS:
+        # Hasil API sungguhan disimpan sebagai event, sama seperti push dari webhook
+        timeline = result.get('timeline', [])
+        events = [{
+            'status': item.get('status'),
+            'time': item.get('time'),
+            'location': item.get('location'),
+            'delivered': result.get('delivered') and i == len(timeline) - 1
+        } for i, item in enumerate(timeline)]
+        if result.get('delivered') and not events:
+            # API menyatakan sampai tanpa timeline: simpan satu event sintetis supaya status sampai tidak hilang
+            events.append({
+                'status': result.get('status') or 'Paket diterima',
+                'time': result.get('time'),
+                'location': None,
+                'delivered': True
+            })
+        try:
+            store_tracking_events(courier, tracking_number, events, source='poll')
+        except Exception as e:
+            print(f"Error storing tracking events ({courier} {tracking_number}): {e}")
+    return store_tracking_result(courier, tracking_number, result, error)
+
+def fetch_tracking(courier, tracking_number):
+    """Panggil API ekspedisi sesuai kurir; kurir tanpa API memakai simulasi"""
+    if courier == 'JT':
+        return get_jt_tracking(tracking_number)
+    elif courier == 'SICEPAT':
+        return get_sicepat_tracking(tracking_number)
+    # API JNE dan Pos Indonesia memerlukan kerjasama khusus / API key,
+    # kurir tidak dikenali juga fallback ke simulasi
+    return get_simulated_tracking(tracking_number, COURIER_NAMES.get(courier, 'Unknown'))
+
+def store_tracking_result(courier, tracking_number, result, error=None):
+    """Simpan hasil tracking (atau kegagalan) ke tabel cache dan kembalikan data yang harus ditampilkan"""
+    now = datetime.utcnow()
+    table = TrackingCache.__table__
+    key = (table.c.courier == courier, table.c.tracking_number == tracking_number)
+
+    try:
+        # Transaksi terpisah supaya tidak ikut commit/rollback session request
+        with db.engine.begin() as conn:
+            existing = conn.execute(db.select(table.c.data, table.c.fetched_at).where(*key)).first()
+
+            if result is not None:
+                ttl = current_app.config.get('TRACKING_CACHE_TTL', 900)
+                fetched_at = now
+            else:
+                # Negative cache: pertahankan data terakhir, coba lagi setelah TTL pendek.
+                # Tanpa data lama simpan placeholder, bukan simulasi: simulasi bisa berakhir
+                # "diterima" dan tidak boleh menjadi dasar auto-konfirmasi
+                ttl = current_app.config.get('TRACKING_NEGATIVE_TTL', 120)
+                if existing and existing.data:
+                    result = json.loads(existing.data)
+                else:
+                    result = pending_tracking(tracking_number, courier)
+                fetched_at = existing.fetched_at if existing else None
+
+            values = {
+                'data': json.dumps(result),
+                'last_error': error,
+                'fetched_at': fetched_at,
+                'expires_at': now + timedelta(seconds=ttl),
+                'updated_at': now
+            }
+            if existing:
+                conn.execute(table.update().where(*key).values(**values))
+            else:
+                conn.execute(table.insert().values(courier=courier, tracking_number=tracking_number, **values))
+    except IntegrityError:
+        # Worker lain menyimpan entri yang sama lebih dulu
+        pass
+
+    return result
+
+def schedule_tracking_refresh(courier, tracking_number):
+    """Jadwalkan refresh di background; satu refresh per resi dalam satu waktu"""
+    key = (courier, tracking_number)
+    with _refresh_lock:
+        if key in _refreshing:
+            return
+        _refreshing.add(key)
+
+    app = current_app._get_current_object()
+    executor = _get_executor('refresh', 'TRACKING_REFRESH_WORKERS', 4)
+    executor.submit(_background_refresh, app, courier, tracking_number)
+
+def _background_refresh(app, courier, tracking_number):
+    try:
+        with app.app_context():
+            refresh_tracking(courier, tracking_number)
+            db.session.remove()
+    except Exception as e:
+        print(f"Error refreshing tracking in background: {e}")
+    finally:
+        with _refresh_lock:
+            _refreshing.discard((courier, tracking_number))
+
+def normalize_tracking_number(tracking_number):
+    """Bentuk kanonik nomor resi (huruf besar, tanpa spasi): kunci simpan dan lookup event/cache"""
+    return tracking_number.strip().upper().replace(' ', '')
+
+def detect_courier(tracking_number):
+    """Deteksi kurir berdasarkan format nomor resi"""
+    tracking_number = normalize_tracking_number(tracking_number)
+
+    # Format resi JNE: alphanumeric 10-15 karakter
+    if len(tracking_number) >= 10 and len(tracking_number) <= 15:
+        if tracking_number.startswith('JNE') or tracking_number.startswith('CGK'):
+            return 'JNE'
+
+    # Format resi J&T: JP + 10 digit angka
+    if tracking_number.startswith('JP') and len(tracking_number) == 12:
+        return 'JT'
+
+    # Format resi SiCepat: 000 + 9-12 digit
+    if tracking_number.startswith('000') and len(tracking_number) >= 12:
+        return 'SICEPAT'
+
+    # Format resi Pos Indonesia: PC/EX/CA/CC + angka
+    if any(tracking_number.startswith(prefix) for prefix in ['PC', 'EX', 'CA', 'CC']):
+        return 'POS'
+
+    return 'UNKNOWN'
+
+def get_jt_tracking(tracking_number):
+    """Tracking J&T menggunakan API resmi"""
+    # API J&T Express - gratis tanpa API key
+    url = f"{courier_base_url('JT')}/api/track/{tracking_number}"
+    headers = {
+        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+    }
+
+    response = courier_request('JT', 'GET', url, headers=headers)
+    if response.status_code != 200:
+        raise TrackingError(f"J&T API returned HTTP {response.status_code}")
+
+    data = response.json()
+    if not (data.get('success') and data.get('data')):
+        raise TrackingError("J&T API returned no tracking data")
+
+    tracking_data = data['data']
+
+    timeline = []
+    for item in tracking_data.get('details', []):
+        timeline.append({
+            'status': item.get('desc', ''),
+            'time': item.get('date', ''),
+            'location': item.get('city', ''),
+            'is_current': False
+        })
+
+    if timeline:
+        timeline[-1]['is_current'] = True
+
+    return {
+        'tracking_number': tracking_number,
+        'courier': 'J&T Express',
+        'status': tracking_data.get('last_status', 'Dalam pengiriman'),
+        'timeline': timeline,
+        'delivered': any('terima' in item.get('desc', '').lower() for item in tracking_data.get('details', []))
+    }
+
+def get_sicepat_tracking(tracking_number):
+    """Tracking SiCepat menggunakan API resmi"""
+    # API SiCepat - gratis
+    url = f"{courier_base_url('SICEPAT')}/customer/waybill"
+    payload = {'waybill': tracking_number}
+
+    response = courier_request('SICEPAT', 'POST', url, json=payload)
+    if response.status_code != 200:
+        raise TrackingError(f"SiCepat API returned HTTP {response.status_code}")
+
+    data = response.json()
+    if not (data.get('sicepat') and data['sicepat'].get('result')):
+        raise TrackingError("SiCepat API returned no tracking data")
+
+    result = data['sicepat']['result']
+
+    timeline = []
+    for item in result.get('track_history', []):
+        timeline.append({
+            'status': item.get('receiver_name', item.get('status', '')),
+            'time': item.get('date_time', ''),
+            'location': item.get('city', ''),
+            'is_current': False
+        })
+
+    if timeline:
+        timeline[-1]['is_current'] = True
+
+    return {
+        'tracking_number': tracking_number,
+        'courier': 'SiCepat',
+        'status': result.get('last_status', 'Dalam pengiriman'),
+        'timeline': timeline,
+        'delivered': result.get('status') == 'DELIVERED'
+    }
+
+def get_simulated_tracking(tracking_number, courier='Unknown'):
+    """Simulasi tracking untuk fallback; deterministik per nomor resi supaya tidak berubah tiap refresh"""
+    rng = random.Random(tracking_number)
+    statuses = [
+        'Paket diterima oleh kurir',
+        'Paket dalam perjalanan ke hub',
+        'Paket tiba di hub asal',
+        'Paket dalam perjalanan ke kota tujuan',
+        'Paket tiba di hub tujuan',
+        'Paket dalam perjalanan untuk pengiriman',
+        'Paket sudah dikirim ke alamat tujuan',
+        'Paket berhasil diterima'
+    ]
+
+    timeline = []
+    num_statuses = rng.randint(3, len(statuses))
+    for i, status in enumerate(statuses[:num_statuses]):
+        timeline.append({
+            'status': status,
+            'time': (datetime.now() - timedelta(days=num_statuses-i, hours=rng.randint(0, 23))).strftime('%d/%m/%Y %H:%M'),
+            'location': f'Hub {["Jakarta", "Bandung", "Surabaya", "Medan", "Yogyakarta"][rng.randint(0, 4)]}',
+            'is_current': i == num_statuses-1
+        })
+
+    return {
+        'tracking_number': tracking_number,
+        'courier': courier,
+        'status': timeline[-1]['status'] if timeline else 'Belum ada update',
+        'timeline': timeline,
+        # Timeline karangan: tidak pernah dihitung sebagai paket sampai
+        'delivered': False,
+        'simulated': True
+    }
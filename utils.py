@@ -1,8 +1,9 @@
+import hashlib
 import os
-import uuid
-from PIL import Image
-from werkzeug.utils import secure_filename
+import tempfile
 from flask import current_app
+from images import schedule_image_processing, renditions_ready, inspect_image, strip_metadata, ImageRejected, UPLOAD_FORMATS, upload_key
+from storage import get_storage
 
 def allowed_file(filename):
     """Check if file extension is allowed"""
@@ -10,30 +11,58 @@ def allowed_file(filename):
     return '.' in filename and \
            filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+# Ekstensi dengan isi sama disamakan supaya hash-nya jatuh ke nama file yang sama
+EXTENSION_ALIASES = {'jpeg': 'jpg'}
+HASH_CHUNK_SIZE = 64 * 1024
+
+def content_filename(digest, ext):
+    """Nama file content-addressed: <sha256 isi>.<ekstensi ternormalisasi>"""
+    ext = ext.lower()
+    return f"{digest}.{EXTENSION_ALIASES.get(ext, ext)}"
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
 def save_uploaded_file(file, subfolder='products'):
-    """Save uploaded file and return filename"""
+    """Save uploaded file under its content hash and return filename.
+
+    Hanya header gambar yang dibaca di request: format asli, jumlah piksel (decompression
+    bomb ditolak) dan orientasi. Metadata EXIF dibuang tanpa decode, lalu isi di-hash;
+    jika isi yang sama sudah ada tidak ada decode/resize ulang.
+    """
     if file and allowed_file(file.filename):
-        # Generate unique filename
-        filename = secure_filename(file.filename)
-        name, ext = os.path.splitext(filename)
-        unique_filename = f"{name}_{uuid.uuid4().hex[:8]}{ext}"
-        
-        # Create directory if it doesn't exist
-        upload_path = os.path.join(current_app.config['UPLOAD_FOLDER'], subfolder)
-        os.makedirs(upload_path, exist_ok=True)
-        
-        # Save file
-        file_path = os.path.join(upload_path, unique_filename)
-        file.save(file_path)
-        
-        # Resize image if it's too large
+        # Save file (streaming ke disk lokal, tidak ditahan di memori); pemeriksaan dan hash
+        # dikerjakan di file sementara sebelum apa pun dikirim ke storage
+        fd, tmp_path = tempfile.mkstemp(prefix='.upload-', suffix='.tmp')
+        os.close(fd)
         try:
-            with Image.open(file_path) as img:
-                if img.width > 800 or img.height > 800:
-                    img.thumbnail((800, 800), Image.Resampling.LANCZOS)
-                    img.save(file_path, optimize=True, quality=85)
-        except Exception as e:
-            print(f"Error resizing image: {e}")
+            file.save(tmp_path)
+            try:
+                fmt, orientation = inspect_image(tmp_path, current_app.config.get('IMAGE_MAX_PIXELS', 50_000_000))
+                strip_metadata(tmp_path, fmt, orientation)
+            except ImageRejected as e:
+                print(f"Upload {file.filename} ditolak: {e}")
+                return None
+            
+            unique_filename = content_filename(file_digest(tmp_path), UPLOAD_FORMATS[fmt])
+            storage = get_storage()
+            key = upload_key(subfolder, unique_filename)
+            if storage.exists(key):
+                # Duplikat: pakai file yang ada, perbarui mtime supaya tidak ikut dibersihkan
+                storage.touch(key)
+            else:
+                with open(tmp_path, 'rb') as f:
+                    storage.save(key, f)
+        finally:
+            os.remove(tmp_path)
+        
+        # Rendition thumb/card/detail dibuat di background, bukan di request upload
+        if not renditions_ready(subfolder, unique_filename):
+            schedule_image_processing(unique_filename, subfolder)
         
         return unique_filename
     return None